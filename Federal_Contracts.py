@@ -13,12 +13,34 @@ from google.generativeai.types import HarmCategory, HarmBlockThreshold
 import random
 import re
 from html_template import get_html_template, get_ai_prompt_template
+from price_store import get_price_store
+from event_study import compute_event_windows
+from usaspending import (
+    iter_award_pages, stream_awards_to_csv, AwardCsvWriter, usaspending_request,
+    fetch_award_details_bulk, AWARD_DETAILS_PATH
+)
+from bulk_download import get_bulk_download_manager, load_award_store
+from contracts_store import get_contracts_store
+from ticker_resolver import get_ticker_resolver
+from llm_cache import get_llm_cache
 import urllib.parse
 
+# Model and sampling settings for the contract dashboards; both are part of the LLM cache key
+GEMINI_MODEL_NAME = 'gemini-2.0-flash'
+GEMINI_GENERATION_CONFIG = {
+    'temperature': 0.7,
+    'top_p': 0.8,
+    'top_k': 40,
+    'max_output_tokens': 2048,
+}
+
 class ContractTracker:
     def __init__(self):
         # Add a print statement to confirm this class is being used
         print("ContractTracker from Federal_Contracts.py is being initialized")
+        # Contract events are fetched lazily, the first time the timeline needs them
+        self._events = None
+        self._refresh_events = False
         self.contract_data = {
             'id': 'LMT2024001',
             'company': 'Lockheed Martin',
@@ -26,7 +48,6 @@ class ContractTracker:
             'amount': 156000000,
             'awarded_date': '2024-01-15',
             'completion_date': '2025-12-31',
-            'events': self.fetch_initial_contract_events(),  # Now fetching real contract events
             'stakeholders': {
                 'politicians': [
                     {
@@ -48,23 +69,34 @@ class ContractTracker:
             }
         }
 
+    @property
+    def events(self):
+        """Real contract events for the timeline, fetched on first access and then reused"""
+        if self._events is None:
+            self._events = self.fetch_initial_contract_events(refresh=self._refresh_events)
+            self._refresh_events = False
+        return self._events
+
+    def invalidate_events(self, refresh=False):
+        """
+        Drop the memoized contract events so the next access refetches them.
+        With refresh=True that fetch goes to the API even if the local store covers the range.
+        """
+        self._events = None
+        self._refresh_events = refresh
+
     def fetch_stock_data(self):
-        """Fetch stock data from yfinance starting from 1985"""
+        """Fetch stock data from the local price store starting from 1985"""
         start_date = '1985-01-01'  # Changed to start from 1985
-        try:
-            ticker = yf.Ticker(self.contract_data['symbol'])
-            df = ticker.history(start=start_date)
-            
-            if df.empty:
-                print(f"No data available for {self.contract_data['symbol']} from {start_date}")
-                # Fallback to more recent data if historical data is not available
-                df = ticker.history(period="max")
-            
-            return df
-        except Exception as e:
-            print(f"Error fetching stock data: {e}")
-            # Return last year's data as fallback
-            return ticker.history(period="1y")
+        price_store = get_price_store()
+        df = price_store.get_history(self.contract_data['symbol'], start=start_date)
+        
+        if df.empty:
+            print(f"No data available for {self.contract_data['symbol']} from {start_date}")
+            # Fallback to the full available history
+            df = price_store.get_history(self.contract_data['symbol'])
+        
+        return df
 
     def create_timeline_visualization(self, stock_data):
         """Create interactive timeline visualization with dark theme and white text"""
@@ -113,7 +145,7 @@ class ContractTracker:
         volume_labels = [f"{int(v/100 * max_volume/1000000)}M" for v in volume_ticks]
 
         # Add event markers with hover information
-        if self.contract_data['events']:
+        if self.events:
             events_df = pd.DataFrame([
                 {
                     'date': event['date'],
@@ -122,7 +154,7 @@ class ContractTracker:
                     'amount': event.get('amount', 'N/A'),
                     'award_id': event.get('award_id', 'N/A')
                 }
-                for event in self.contract_data['events']
+                for event in self.events
                 if event['price'] > 0
             ])
             
@@ -455,14 +487,12 @@ class ContractTracker:
         try:
             # Use POST instead of GET for advanced filtering
             payload = query_params if query_params is not None else {}
-            response = requests.post(endpoint, json=payload)
-            if response.status_code == 200:
-                json_data = response.json()
-                self._save_json_to_csv(json_data, "USA Spending - Recipient Data") # Save to CSV with specific filename
-                return json_data
-            else:
-                print("Error fetching recipient data:", response.text)
-                return None
+            json_data = usaspending_request('POST', endpoint, payload)
+            self._save_json_to_csv(json_data, "USA Spending - Recipient Data") # Save to CSV with specific filename
+            return json_data
+        except requests.HTTPError as e:
+            print("Error fetching recipient data:", e.response.text)
+            return None
         except Exception as e:
             print("Exception fetching recipient data:", e)
             return None
@@ -473,22 +503,21 @@ class ContractTracker:
         # Using a default toptier agency code "012" as an example
         endpoint = f"{base_url}/agency/012/sub_agency/"
         try:
-            response = requests.get(endpoint)
-            if response.status_code == 200:
-                json_data = response.json()
-                self._save_json_to_csv(json_data, "USA Spending - Agency References") # Save to CSV with specific filename
-                return json_data
-            else:
-                print("Error fetching agency references:", response.text)
-                return None
+            json_data = usaspending_request('GET', endpoint)
+            self._save_json_to_csv(json_data, "USA Spending - Agency References") # Save to CSV with specific filename
+            return json_data
+        except requests.HTTPError as e:
+            print("Error fetching agency references:", e.response.text)
+            return None
         except Exception as e:
             print("Exception fetching agency references:", e)
             return None
 
     def download_bulk_historical_data(self, query_params=None):
-        """Retrieve bulk historical data via USA Spending API (/api/v2/download/awards/)"""
-        base_url = "https://api.usaspending.gov/api/v2"
-        endpoint = f"{base_url}/download/awards/"  # Changed endpoint to correct one
+        """
+        Retrieve bulk historical data via USA Spending API (/api/v2/download/awards/).
+        Returns the background BulkDownloadJob handling the download and ingestion.
+        """
         try:
             # Default payload based on documentation
             default_payload = {
@@ -524,22 +553,59 @@ class ContractTracker:
                 if "file_format" in query_params:
                     default_payload["file_format"] = query_params["file_format"]
 
-            response = requests.post(endpoint, json=default_payload)
-            
-            if response.status_code == 200:
-                json_data = response.json()
-                # Store download information
-                if "file_url" in json_data:
-                    st.success("Download link generated successfully!")
-                    st.markdown(f"[Download CSV]({json_data['file_url']})")
-                return json_data
-            else:
-                print(f"Error downloading bulk historical data: {response.text}")
-                return None
+            # Submit as a background job: it polls the download status, streams the file
+            # to disk and ingests it into the local fiscal-year award store
+            job = get_bulk_download_manager().submit(default_payload)
+            st.session_state.bulk_download_job_id = job.job_id
+            st.success(f"Bulk download job {job.job_id} started; data will be ingested into {job.store_dir}")
+            return job
         except Exception as e:
             print(f"Exception downloading bulk historical data: {e}")
             return None
 
+    def get_bulk_download_status(self, job_id=None):
+        """Return the status of a bulk download job (defaults to the one started in this session)."""
+        job_id = job_id or st.session_state.get('bulk_download_job_id')
+        job = get_bulk_download_manager().get(job_id) if job_id else None
+        if job is None:
+            return None
+        return {
+            'job_id': job.job_id,
+            'status': job.status,
+            'message': job.message,
+            'file_url': job.file_url,
+            'bytes_downloaded': job.bytes_downloaded,
+            'rows_ingested': job.rows_ingested,
+            'fiscal_years': sorted(job.fiscal_years),
+            'done': job.done
+        }
+
+    def load_bulk_contracts(self, company_name, fiscal_years=None):
+        """
+        Read a company's awards from the bulk download award store, renamed to the
+        Contract Data columns so they can go through the same market impact analysis.
+        """
+        df = load_award_store(fiscal_years=fiscal_years)
+        if df.empty or 'recipient_name' not in df.columns:
+            return pd.DataFrame()
+        df = df[df['recipient_name'].str.contains(company_name, case=False, na=False, regex=False)]
+
+        # Download files name the amount column differently depending on the file type
+        column_candidates = {
+            'Award ID': ['award_id_piid', 'award_id_fain', 'contract_award_unique_key'],
+            'Recipient Name': ['recipient_name'],
+            'Start Date': ['period_of_performance_start_date', 'action_date'],
+            'End Date': ['period_of_performance_current_end_date'],
+            'Award Amount': ['total_obligation', 'total_obligated_amount', 'federal_action_obligation'],
+            'Awarding Agency': ['awarding_agency_name']
+        }
+        contracts = pd.DataFrame(index=df.index)
+        for target, candidates in column_candidates.items():
+            source = next((col for col in candidates if col in df.columns), None)
+            contracts[target] = df[source] if source else None
+        contracts['Award Amount'] = pd.to_numeric(contracts['Award Amount'], errors='coerce')
+        return contracts.dropna(subset=['Start Date']).reset_index(drop=True)
+
     def fetch_award_details(self, award_id):
         """
         Fetch details for a specific award using multiple USA Spending API endpoints.
@@ -559,14 +625,12 @@ class ContractTracker:
                 "order": "desc"
             }
             print(f"Payload being sent to /api/v2/awards/accounts/: {json.dumps(payload_award_accounts)}") # Print payload for debugging
-            response_award_accounts = requests.post(url_award_accounts, json=payload_award_accounts)
-            if response_award_accounts.status_code == 200:
-                award_accounts_data = response_award_accounts.json() # Store the json response
+            try:
+                award_accounts_data = usaspending_request('POST', url_award_accounts, payload_award_accounts)
                 self._save_json_to_csv(award_accounts_data, "USA Spending - Award Federal Accounts") # Save to CSV
                 results['award_accounts'] = award_accounts_data
-
-            else:
-                print("Error fetching award accounts:", response_award_accounts.text)
+            except requests.HTTPError as e:
+                print("Error fetching award accounts:", e.response.text)
                 results['award_accounts'] = None
 
 
@@ -578,15 +642,14 @@ class ContractTracker:
 
             # 3. Last updated info: GET /api/v2/awards/last_updated/
             url_last_updated = f"{base_url}/awards/last_updated/"
-            response_last_updated = requests.get(url_last_updated)
-            if response_last_updated.status_code == 200:
-                last_updated_data = response_last_updated.json()
+            try:
+                last_updated_data = usaspending_request('GET', url_last_updated)
                 # Last updated endpoint response is not in 'results' format, save directly if needed.
                 # pd.DataFrame([last_updated_data], index=[0]).to_csv("award_last_updated.csv", index=False)
                 print("Award last updated info received, CSV saving for this endpoint might need specific handling if required.")
                 results['last_updated'] = last_updated_data
-            else:
-                print("Error fetching last updated info:", response_last_updated.text)
+            except requests.HTTPError as e:
+                print("Error fetching last updated info:", e.response.text)
                 results['last_updated'] = None
 
             return results
@@ -604,22 +667,33 @@ class ContractTracker:
         base_url = "https://api.usaspending.gov/api/v2"
         endpoint = f"{base_url}/awards/{award_id}/" # Using generated_internal_id as award_id
         try:
-            response = requests.get(endpoint)
-            if response.status_code == 200:
-                award_details_by_id_data = response.json()
-                print(f"Award details fetched for generated_internal_id (used as Award ID): {award_id}")
-                return award_details_by_id # Return data, don't save here
-            else:
-                print(f"Error fetching award details for award ID {award_id} from /api/v2/awards/<AWARD_ID>/: {response.text}")
-                return None
+            award_details_by_id_data = usaspending_request('GET', endpoint)
+            print(f"Award details fetched for generated_internal_id (used as Award ID): {award_id}")
+            return award_details_by_id_data # Return data, don't save here
+        except requests.HTTPError as e:
+            print(f"Error fetching award details for award ID {award_id} from /api/v2/awards/<AWARD_ID>/: {e.response.text}")
+            return None
         except Exception as e:
             print(f"Exception fetching award details for award ID {award_id} from /api/v2/awards/<AWARD_ID>/: {e}")
             return None
 
-    def fetch_generated_internal_ids_from_transaction_search(self, payload=None):
+    def fetch_award_details_bulk(self, award_ids, max_workers=8, requests_per_second=10, flush_every=25):
+        """
+        Enrich many awards (generated_internal_id values) concurrently and write them to
+        "USA Spending - All Award Details.parquet". Returns the list of enriched rows.
+        """
+        return fetch_award_details_bulk(
+            award_ids, output_path=AWARD_DETAILS_PATH, max_workers=max_workers,
+            requests_per_second=requests_per_second, flush_every=flush_every
+        )
+
+    def fetch_generated_internal_ids_from_transaction_search(self, payload=None, max_pages=None):
         """
         Fetches award data using the /api/v2/search/spending_by_award/ endpoint.
         Specifically filtered for Lockheed Martin contracts.
+        Follows page_metadata.hasNext across all pages unless max_pages is given and streams
+        every row to CSV; only the first page (the top of the requested sort) is returned,
+        with csv_path and row_count pointing at the full result.
         """
         base_url = "https://api.usaspending.gov/api/v2"
         endpoint = f"{base_url}/search/spending_by_award/"  # Changed endpoint
@@ -657,35 +731,48 @@ class ContractTracker:
                         "Place of Performance Country Code"
                     ],
                     "page": 1,
-                    "limit": 10,
+                    "limit": 100,
                     "sort": "Award Amount",  # Changed to match available sort fields
                     "order": "desc",
                     "subawards": False
                 }
 
             print(f"Fetching Lockheed Martin contracts from {endpoint}")
-            response = requests.post(endpoint, json=payload)
-
-            if response.status_code == 200:
-                award_data = response.json()
-                
-                # Save to CSV with Lockheed Martin specific name
-                self._save_json_to_csv(
-                    award_data, 
-                    "USA Spending - Lockheed Martin Awards"
-                )
-                
-                return award_data
-            else:
-                print(f"Error fetching Lockheed Martin awards: {response.text}")
+            first_page = int(payload.get('page', 1))
+            results = []
+            csv_filename = os.path.join('data', "USA Spending - Lockheed Martin Awards.csv")
+            
+            # Stream each page to CSV with Lockheed Martin specific name as it arrives;
+            # pages complete out of order, so only the first page is kept in memory
+            with AwardCsvWriter(csv_filename, fieldnames=payload.get('fields')) as writer:
+                for page, page_results in iter_award_pages(payload, max_pages=max_pages):
+                    writer.write_rows(page_results)
+                    if page == first_page:
+                        results = page_results
+
+            if not writer.row_count:
+                print("No Lockheed Martin awards returned")
                 return None
+            
+            print(f"Data saved to {csv_filename}")
+            return {'results': results, 'csv_path': csv_filename, 'row_count': writer.row_count}
         except Exception as e:
             print(f"Exception in fetch_award_data: {e}")
             return None
 
-    def fetch_initial_contract_events(self):
-        """Fetch recent Lockheed Martin contract awards and convert them to events"""
+    def fetch_initial_contract_events(self, refresh=False):
+        """Fetch recent Lockheed Martin contract awards and convert them to events (refresh skips the local store)"""
         try:
+            start_date = "2023-01-01"
+            end_date = datetime.now().strftime("%Y-%m-%d")
+            store = get_contracts_store()
+            
+            awards = None if refresh else store.fetched_awards("Lockheed Martin", start_date, end_date, limit=10)
+            if awards is not None:
+                # Top awards of a complete fetch of this search are already in the local store
+                award_data = {'results': awards.where(awards.notna(), None).to_dict('records')}
+                return self._awards_to_events(award_data)
+            
             # Set up the payload for recent Lockheed Martin awards
             payload = {
                 "filters": {
@@ -693,17 +780,19 @@ class ContractTracker:
                     "recipient_search_text": ["Lockheed Martin"],
                     "time_period": [
                         {
-                            "start_date": "2023-01-01",
-                            "end_date": datetime.now().strftime("%Y-%m-%d")
+                            "start_date": start_date,
+                            "end_date": end_date
                         }
                     ]
                 },
                 "fields": [
                     "Award ID",
+                    "Recipient Name",
                     "Start Date",
                     "Award Amount",
                     "Description",
-                    "Awarding Agency"
+                    "Awarding Agency",
+                    "generated_internal_id"
                 ],
                 "page": 1,
                 "limit": 10,
@@ -712,34 +801,35 @@ class ContractTracker:
                 "subawards": False
             }
 
-            # Fetch the award data
-            award_data = self.fetch_generated_internal_ids_from_transaction_search(payload)
-            
+            # Fetch the award data (only the top page is needed for the timeline)
+            award_data = self.fetch_generated_internal_ids_from_transaction_search(payload, max_pages=1)
             if award_data and 'results' in award_data:
+                store.upsert_awards(award_data['results'])
+            return self._awards_to_events(award_data)
+        
+        except Exception as e:
+            print(f"Error fetching contract events: {str(e)}")
+            return [{'date': '2024-01-15', 'event': 'Error', 'price': 0}]
+
+    def _awards_to_events(self, award_data):
+        """Convert award rows to timeline events priced with LMT closes"""
+        try:
+            if award_data and award_data.get('results'):
                 events = []
-                ticker = yf.Ticker('LMT')
                 
-                # Process all awards in batches to avoid rate limiting
+                # Load LMT history once from the earliest award date and look up closes in memory
+                award_dates = [award['Start Date'] for award in award_data['results'] if award.get('Start Date')]
+                stock_data = get_price_store().get_history('LMT', start=min(award_dates)) if award_dates else pd.DataFrame()
+                
                 for award in award_data['results']:
                     try:
                         date = award['Start Date']
-                        # Use a single API call for each date to avoid rate limiting
-                        if not hasattr(self, '_stock_prices') or date not in self._stock_prices:
-                            stock_data = ticker.history(
-                                start=date,
-                                end=(datetime.strptime(date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
-                            )
-                            if not hasattr(self, '_stock_prices'):
-                                self._stock_prices = {}
-                            if not stock_data.empty:
-                                # FIX: Use iloc instead of [] to access by position
-                                self._stock_prices[date] = float(stock_data['Close'].iloc[0])
-                        
-                        price = self._stock_prices.get(date)
+                        award_ts = pd.Timestamp(date)
+                        price = float(stock_data['Close'].loc[award_ts]) if award_ts in stock_data.index else None
                         
                         if price:
                             # Get description, truncate if too long
-                            description = award.get('Description', 'No description available')
+                            description = award.get('Description') or 'No description available'
                             if len(description) > 50:  # Truncate long descriptions
                                 description = description[:47] + "..."
                             
@@ -765,17 +855,15 @@ class ContractTracker:
 # Market Impact Analysis Functions
     def get_pre_award_data(self, symbol, award_date, days_before=30):
         """Fetches stock data for a specified period before the award date."""
-        start_date = (datetime.strptime(award_date, '%Y-%m-%d') - timedelta(days=days_before)).strftime('%Y-%m-%d')
-        ticker = yf.Ticker(symbol)
-        df = ticker.history(start=start_date, end=award_date)
-        return df
+        start_date = datetime.strptime(award_date, '%Y-%m-%d') - timedelta(days=days_before)
+        # Award date itself is excluded, matching the exclusive yfinance `end`
+        end_date = datetime.strptime(award_date, '%Y-%m-%d') - timedelta(days=1)
+        return get_price_store().get_history(symbol, start=start_date, end=end_date)
 
     def get_post_award_data(self, symbol, award_date, days_after=90):
         """Fetches stock data for a specified period after the award date."""
-        end_date = (datetime.strptime(award_date, '%Y-%m-%d') + timedelta(days=days_after)).strftime('%Y-%m-%d')
-        ticker = yf.Ticker(symbol)
-        df = ticker.history(start=award_date, end=end_date)
-        return df
+        end_date = datetime.strptime(award_date, '%Y-%m-%d') + timedelta(days=days_after - 1)
+        return get_price_store().get_history(symbol, start=award_date, end=end_date)
     
     def analyze_market_impact(self, symbol, award_date):
         """Analyzes market impact by comparing pre- and post-award stock data."""
@@ -834,12 +922,7 @@ class ContractTracker:
             genai.configure(api_key=GEMINI_API_KEY)
             
             # Create generation config
-            generation_config = genai.types.GenerationConfig(
-                temperature=0.7,
-                top_p=0.8,
-                top_k=40,
-                max_output_tokens=2048,
-            )
+            generation_config = genai.types.GenerationConfig(**GEMINI_GENERATION_CONFIG)
             
             # Create safety settings
             safety_settings = [
@@ -861,9 +944,9 @@ class ContractTracker:
                 }
             ]
             
-            # Create model with configurations - using gemini-2.0-flash
+            # Create model with configurations
             model = genai.GenerativeModel(
-                model_name='gemini-2.0-flash',  # Updated to use gemini-2.0-flash
+                model_name=GEMINI_MODEL_NAME,
                 generation_config=generation_config,
                 safety_settings=safety_settings
             )
@@ -917,9 +1000,11 @@ class ContractTracker:
             prompt = prompt.replace("{{PRE_VOLUME_AVG}}", f"{market_impact.get('pre_volume_avg', 0):,.0f}")
             prompt = prompt.replace("{{POST_VOLUME_AVG}}", f"{market_impact.get('post_volume_avg', 0):,.0f}")
             
-            # Generate analysis with Gemini
-            response = model.generate_content(prompt)
-            analysis_text = response.text
+            # Generate analysis with Gemini, reusing the cached analysis for an identical prompt
+            analysis_text = get_llm_cache().cached(
+                GEMINI_MODEL_NAME, prompt, lambda: model.generate_content(prompt).text,
+                config=GEMINI_GENERATION_CONFIG
+            )
             
             # Parse the analysis text into sections
             sections = self._parse_analysis_sections(analysis_text)
@@ -1458,18 +1543,20 @@ class ContractTracker:
             print(f"Error saving dashboard: {e}")
             return None
 
-    def fetch_and_save_contract_data(self):
-        """Fetch contract data from USA Spending API and save to CSV"""
+    def fetch_and_save_contract_data(self, company_name=None, start_date=None, end_date=None, refresh=False):
+        """Fetch contract data from the local award store, or from USA Spending API when the range isn't covered yet"""
+        # Fall back to session state, then defaults
+        company_name = company_name or st.session_state.get('company_name', 'Lockheed Martin')
+        start_date = str(start_date or st.session_state.get('start_date', '2020-01-01'))
+        end_date = str(end_date or st.session_state.get('end_date', datetime.now().strftime('%Y-%m-%d')))
+        
         try:
-            # Create base URL for USA Spending API
-            base_url = "https://api.usaspending.gov/api/v2/search/spending_by_award/"
-            
-            # Get company name from session state or use default
-            company_name = st.session_state.get('company_name', 'Lockheed Martin')
-            
-            # Get date range from session state or use default
-            start_date = st.session_state.get('start_date', '2020-01-01')
-            end_date = st.session_state.get('end_date', datetime.now().strftime('%Y-%m-%d'))
+            store = get_contracts_store()
+            df = None if refresh else store.fetched_awards(company_name, start_date, end_date)
+            if df is not None and not df.empty:
+                # The same search was fetched recently: answer with exactly the rows it returned
+                print(f"Loaded {len(df)} contracts for {company_name} from the local store")
+                return df
             
             # Create payload for API request
             payload = {
@@ -1501,31 +1588,18 @@ class ContractTracker:
                 "order": "desc"
             }
             
-            # Make API request
-            response = requests.post(base_url, json=payload)
+            # Stream every page of results to CSV, then load the combined file
+            file_path = 'data/federal_contracts.csv'
+            row_count = stream_awards_to_csv(payload, file_path)
             
-            # Check if request was successful
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Check if results were returned
-                if 'results' in data and data['results']:
-                    # Convert to DataFrame
-                    df = pd.DataFrame(data['results'])
-                    
-                    # Save to CSV
-                    os.makedirs('data', exist_ok=True)
-                    file_path = 'data/federal_contracts.csv'
-                    df.to_csv(file_path, index=False)
-                    print(f"Contract data saved to {file_path}")
-                    
-                    return df
-                else:
-                    print("No contract data found for the specified criteria")
-                    # Return sample data for demonstration
-                    return self._generate_sample_contract_data(company_name)
+            if row_count:
+                # Upsert into the award store and remember which awards this search returned
+                store.ingest_fetch(file_path, company_name, start_date, end_date,
+                                   award_types=payload['filters']['award_type_codes'])
+                print(f"Contract data saved to {file_path}")
+                return pd.read_csv(file_path).sort_values('Award Amount', ascending=False, ignore_index=True)
             else:
-                print(f"API request failed with status code {response.status_code}")
+                print("No contract data found for the specified criteria")
                 # Return sample data for demonstration
                 return self._generate_sample_contract_data(company_name)
                 
@@ -1627,55 +1701,69 @@ class ContractTracker:
         
         return df
 
-    def analyze_stock_market_impact(self, contract_df):
-        """Analyze stock market impact of contracts"""
+    def analyze_stock_market_impact(self, contract_df, days_before=30, days_after=90):
+        """
+        Analyze stock market impact of contracts.
+        Awards are grouped by ticker so each symbol's history is loaded once, and all
+        of that symbol's pre/post award windows are computed in a single vectorized pass.
+        """
         try:
-            # Create DataFrame to store market impact data
-            market_impact_df = pd.DataFrame(columns=[
-                'contract_id', 
+            columns = [
+                'contract_id',
+                'symbol',
+                'symbol_confidence',
                 'price_change_pct', 
                 'volume_change_pct',
                 'pre_price_avg',
                 'post_price_avg',
                 'pre_volume_avg',
                 'post_volume_avg'
-            ])
+            ]
+            market_impact_df = pd.DataFrame(columns=columns)
             
-            # Process each contract
-            impact_data = []  # Collect all impacts first
-            for _, contract in contract_df.iterrows():
-                # Get contract ID
-                contract_id = contract['Award ID']
-                
-                # Get company symbol
-                company_name = contract.get('Recipient Name', 'Unknown')
-                symbol = self._get_company_symbol(company_name)
+            if contract_df is not None and not contract_df.empty:
+                contracts = pd.DataFrame({
+                    'contract_id': contract_df['Award ID'].to_numpy(),
+                    'award_date': pd.to_datetime(contract_df['Start Date'], errors='coerce').to_numpy()
+                })
+                # Resolve each distinct recipient name once rather than once per row
+                recipients = contract_df.get('Recipient Name', pd.Series('Unknown', index=contract_df.index)).fillna('Unknown')
+                resolutions = get_ticker_resolver().resolve_many(recipients)
+                contracts['symbol'] = recipients.map(lambda name: resolutions[name].symbol).to_numpy()
+                contracts['symbol_confidence'] = recipients.map(lambda name: resolutions[name].confidence).to_numpy()
                 
-                # Get contract date
-                try:
-                    award_date = contract['Start Date']
-                except:
-                    # Use current date if parsing fails
-                    award_date = datetime.now().strftime('%Y-%m-%d')
+                unresolved = contracts['symbol'].isna()
+                if unresolved.any():
+                    print(f"No ticker found for {recipients[unresolved.to_numpy()].nunique()} recipients; their impact is left empty")
                 
-                # Calculate market impact (this would normally involve stock price analysis)
-                # For now, we'll use placeholder values
-                impact = {
-                    'contract_id': contract_id,
-                    'price_change_pct': random.uniform(0.5, 2.5),
-                    'volume_change_pct': random.uniform(5.0, 20.0),
-                    'pre_price_avg': random.uniform(80.0, 200.0),
-                    'post_price_avg': random.uniform(85.0, 210.0),
-                    'pre_volume_avg': random.uniform(500000, 2000000),
-                    'post_volume_avg': random.uniform(600000, 2500000)
-                }
+                impact_frames = []
+                for symbol, group in contracts.groupby('symbol', sort=False):
+                    valid_dates = group['award_date'].dropna()
+                    stock_data = pd.DataFrame()
+                    if not valid_dates.empty:
+                        stock_data = get_price_store().get_history(
+                            symbol,
+                            start=valid_dates.min() - timedelta(days=days_before),
+                            end=min(valid_dates.max() + timedelta(days=days_after), pd.Timestamp(datetime.now().date()))
+                        )
+                    
+                    windows = compute_event_windows(
+                        stock_data,
+                        group['award_date'],
+                        pre_window=days_before,
+                        post_window=days_after,
+                        calendar_days=True
+                    )
+                    windows.index = group.index
+                    impact_frames.append(pd.concat([group[['contract_id', 'symbol', 'symbol_confidence']], windows], axis=1))
                 
-                # Add to our collection
-                impact_data.append(impact)
-            
-            # Create DataFrame from all impacts at once instead of concatenating
-            if impact_data:
-                market_impact_df = pd.DataFrame(impact_data)
+                # Restore the original contract order; unresolved recipients keep NaN statistics
+                market_impact_df = contracts[['contract_id', 'symbol', 'symbol_confidence']].copy()
+                if impact_frames:
+                    market_impact_df = market_impact_df.join(
+                        pd.concat(impact_frames).drop(columns=['contract_id', 'symbol', 'symbol_confidence'])
+                    )
+                market_impact_df = market_impact_df.reindex(columns=columns)
             
             # Save to CSV file
             os.makedirs('data', exist_ok=True)
@@ -1689,53 +1777,18 @@ class ContractTracker:
             print(f"Error analyzing stock market impact: {e}")
             return None
 
-    def _get_company_symbol(self, company_name):
-        """
-        Map company name to stock symbol.
-        Returns a default symbol if the company is not in the mapping.
-        """
-        # Common defense contractors and their symbols
-        company_symbols = {
-            'Lockheed Martin': 'LMT',
-            'Boeing': 'BA',
-            'Raytheon': 'RTX',
-            'Northrop Grumman': 'NOC',
-            'General Dynamics': 'GD',
-            'L3Harris Technologies': 'LHX',
-            'Huntington Ingalls Industries': 'HII',
-            'Leidos': 'LDOS',
-            'CACI International': 'CACI',
-            'Booz Allen Hamilton': 'BAH',
-            'Science Applications International': 'SAIC',
-            'TransDigm Group': 'TDG',
-            'Textron': 'TXT',
-            'Spirit AeroSystems': 'SPR',
-            'Howmet Aerospace': 'HWM',
-            'Curtiss-Wright': 'CW',
-            'Hexcel': 'HXL',
-            'Kratos Defense & Security': 'KTOS',
-            'Aerojet Rocketdyne': 'AJRD',
-            'Mercury Systems': 'MRCY'
-        }
-        
-        # Check for exact match
-        if company_name in company_symbols:
-            return company_symbols[company_name]
-        
-        # Check for partial match
-        for known_company, symbol in company_symbols.items():
-            if known_company.lower() in company_name.lower() or company_name.lower() in known_company.lower():
-                return symbol
-        
-        # Default to LMT if no match found
-        return 'LMT'
-
 
 # ------------------------------------------------------------------
+@st.cache_resource(show_spinner=False)
+def get_contract_tracker():
+    """Build the ContractTracker once and share it across Streamlit reruns"""
+    return ContractTracker()
+
+
 def render_federal_contracts_tab():
     # Remove this title line since we already have it in the standalone code
     # st.title("Federal Contracts Analysis")
-    tracker = ContractTracker()
+    tracker = get_contract_tracker()
 
     # Create tabs for different analysis steps
     tabs = st.tabs([
@@ -1769,43 +1822,24 @@ def render_federal_contracts_tab():
                 max_value=datetime.now()
             )
 
+        refresh_contracts = st.checkbox(
+            "Refresh from USAspending",
+            value=False,
+            help="Ignore the local award store and fetch this range from the API again"
+        )
+
         if st.button("Fetch Contract Data"):
             if not company_name:
                 st.error("Please enter a company name")
             else:
                 with st.spinner(f"Fetching contract data for {company_name}..."):
-                    # Update payload with company name and date range
-                    payload = {
-                        "filters": {
-                            "award_type_codes": ["A", "B", "C", "D"],
-                            "recipient_search_text": [company_name],
-                            "time_period": [
-                                {
-                                    "start_date": start_date.strftime("%Y-%m-%d"),
-                                    "end_date": end_date.strftime("%Y-%m-%d")
-                                }
-                            ]
-                        },
-                        "fields": [
-                            "Award ID",
-                            "Recipient Name",
-                            "Start Date",
-                            "End Date",
-                            "Award Amount",
-                            "Description",
-                            "Awarding Agency",
-                            "Awarding Sub Agency",
-                            "Contract Award Type",
-                            "generated_internal_id"
-                        ],
-                        "page": 1,
-                        "limit": 100,
-                        "sort": "Award Amount",
-                        "order": "desc"
-                    }
-                    
                     # Step 1: Fetch contract data
-                    contract_df = tracker.fetch_and_save_contract_data()
+                    contract_df = tracker.fetch_and_save_contract_data(
+                        company_name,
+                        start_date.strftime("%Y-%m-%d"),
+                        end_date.strftime("%Y-%m-%d"),
+                        refresh=refresh_contracts
+                    )
                     if contract_df is not None:
                         st.success("Contract data fetched successfully!")
                         
@@ -1860,6 +1894,64 @@ def render_federal_contracts_tab():
                 }
             )
 
+            # Step 3 (optional): pull full award details and federal accounts for these awards
+            if st.button("Enrich Award Details", key="enrich_award_details"):
+                award_ids = st.session_state.contract_df.get('generated_internal_id', pd.Series(dtype=str)).dropna().tolist()
+                if not award_ids:
+                    st.warning("No generated_internal_id values in the current results to enrich")
+                else:
+                    with st.spinner(f"Fetching details for {len(award_ids)} awards..."):
+                        award_details = tracker.fetch_award_details_bulk(award_ids)
+                    if award_details:
+                        st.success(f"Saved details for {len(award_details)} of {len(award_ids)} awards to {AWARD_DETAILS_PATH}")
+                    else:
+                        st.error("Failed to fetch award details")
+
+        # Bulk historical data: runs as a background job, so its progress is polled on each rerun
+        with st.expander("Bulk Historical Data"):
+            if st.button("Start Bulk Download", key="start_bulk_download"):
+                tracker.download_bulk_historical_data({
+                    "filters": {
+                        "time_period": [{
+                            "start_date": start_date.strftime('%Y-%m-%d'),
+                            "end_date": end_date.strftime('%Y-%m-%d'),
+                            "date_type": "action_date"
+                        }]
+                    }
+                })
+
+            job_status = tracker.get_bulk_download_status()
+            if job_status is None:
+                st.info("No bulk download job started in this session")
+            else:
+                st.write(f"Job {job_status['job_id']}: **{job_status['status']}**")
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Downloaded", f"{job_status['bytes_downloaded'] / 1e6:,.1f} MB")
+                col2.metric("Rows Ingested", f"{job_status['rows_ingested']:,}")
+                col3.metric("Fiscal Years", ", ".join(map(str, job_status['fiscal_years'])) or "-")
+
+                if job_status['status'] == 'failed':
+                    st.error(f"Bulk download failed: {job_status['message']}")
+                elif job_status['status'] == 'finished':
+                    st.success(job_status['message'])
+                    if st.button("Analyze Downloaded Awards", key="analyze_bulk_awards"):
+                        with st.spinner("Loading awards from the local award store..."):
+                            bulk_df = tracker.load_bulk_contracts(company_name, job_status['fiscal_years'])
+                        if bulk_df.empty:
+                            st.warning(f"No downloaded awards found for {company_name}")
+                        else:
+                            st.session_state.contract_df = bulk_df
+                            st.session_state.company_name = company_name
+                            with st.spinner("Analyzing market impact..."):
+                                market_impact_df = tracker.analyze_stock_market_impact(bulk_df)
+                            if market_impact_df is not None:
+                                st.session_state.market_impact_df = market_impact_df
+                                st.success(f"Market impact analysis completed for {len(bulk_df)} downloaded awards!")
+                            else:
+                                st.error("Failed to analyze market impact")
+                else:
+                    st.button("Refresh Status", key="refresh_bulk_download_status")
+
     with tabs[1]:
         st.header("Stock Market Impact Analysis")
         
@@ -2024,15 +2116,24 @@ def render_federal_contracts_tab():
         st.header("Timeline Visualization")
         
         if 'contract_df' in st.session_state:
-            stock_data = tracker.fetch_stock_data()
-            fig1, fig2 = tracker.create_timeline_visualization(stock_data)
+            # st.tabs renders every tab on each rerun, so only build the timeline once it is opened
+            show_timeline = st.checkbox("Show timeline", key="show_contract_timeline")
             
-            # Display stock price and volume chart
-            st.plotly_chart(fig1)
+            if st.button("🔄 Refresh Timeline Data", key="refresh_contract_timeline"):
+                # Refetch from the API on the next access rather than from the local store
+                tracker.invalidate_events(refresh=True)
             
-            # Display contract timeline chart
-            st.subheader("Contract Timeline")
-            st.plotly_chart(fig2)
+            if show_timeline:
+                with st.spinner("Loading contract events..."):
+                    stock_data = tracker.fetch_stock_data()
+                    fig1, fig2 = tracker.create_timeline_visualization(stock_data)
+                
+                # Display stock price and volume chart
+                st.plotly_chart(fig1)
+                
+                # Display contract timeline chart
+                st.subheader("Contract Timeline")
+                st.plotly_chart(fig2)
         else:
             st.info("Please fetch contract data first in the Contract Data tab")
 
@@ -0,0 +1,178 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import namedtuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+ARTICLE_CACHE_PATH = os.path.join('data', 'article_cache.sqlite')
+ARTICLE_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Cached text is served without any request for this long, then revalidated with ETag/Last-Modified
+ARTICLE_FRESH_FOR = 6 * 60 * 60
+# Pages that yielded no text are retried after this long
+ARTICLE_FAILURE_TTL = 60 * 60
+
+# Query parameters that only track the click and never change the article
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'ref', 'ref_src', 'cmpid', 'taid', 'yptr'}
+
+CachedArticle = namedtuple(
+    'CachedArticle', ['url', 'content', 'method', 'content_hash', 'etag', 'last_modified', 'fetched_at']
+)
+
+
+def normalize_article_url(url):
+    """Canonical cache key: lower-case scheme and host, no fragment, default port or tracking parameters."""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or 'https').lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+def content_hash(text):
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+
+class ArticleCache:
+    """
+    Persistent cache of extracted article text keyed by normalized URL.
+
+    Each entry keeps the extraction method, a hash of the text and the page's
+    ETag/Last-Modified validators. Entries younger than fresh_for are served as is;
+    older ones should be revalidated with a conditional request (validators()) and
+    either touched on 304 or replaced. The total size is kept under max_bytes by
+    evicting the least recently used entries.
+    """
+
+    def __init__(self, path=ARTICLE_CACHE_PATH, max_bytes=ARTICLE_CACHE_MAX_BYTES, fresh_for=ARTICLE_FRESH_FOR):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.fresh_for = fresh_for
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                url TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                method TEXT,
+                content_hash TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_articles_accessed ON articles (accessed_at);
+        """)
+        self._conn.commit()
+
+    def get(self, url):
+        """The cached entry for url (fresh or not), or None."""
+        key = normalize_article_url(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, content, method, content_hash, etag, last_modified, fetched_at "
+                "FROM articles WHERE url = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE articles SET accessed_at = ? WHERE url = ?", (time.time(), key))
+            self._conn.commit()
+        return CachedArticle(*row)
+
+    def is_fresh(self, entry):
+        """True if entry can be served without asking the server."""
+        max_age = self.fresh_for if entry.content else ARTICLE_FAILURE_TTL
+        fresh = time.time() - entry.fetched_at < max_age
+        if fresh:
+            self.hits += 1
+        return fresh
+
+    @staticmethod
+    def validators(entry):
+        """Conditional request headers for revalidating entry."""
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def touch(self, url):
+        """Mark the entry for url as revalidated (the server answered 304 Not Modified)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE articles SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+                (now, now, normalize_article_url(url))
+            )
+            self._conn.commit()
+            self.revalidated += 1
+
+    def put(self, url, content, method=None, etag=None, last_modified=None):
+        content = content or ''
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO articles "
+                "(url, content, method, content_hash, etag, last_modified, size, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (normalize_article_url(url), content, method, content_hash(content), etag, last_modified,
+                 len(content.encode('utf-8')), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._conn.execute("SELECT url, size FROM articles ORDER BY accessed_at").fetchall():
+            self._conn.execute("DELETE FROM articles WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM articles"
+            ).fetchone()
+        return {
+            'hits': self.hits,
+            'revalidated': self.revalidated,
+            'misses': self.misses,
+            'entries': entries,
+            'bytes': size,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM articles")
+            self._conn.commit()
+
+
+_article_cache = None
+_article_cache_lock = threading.Lock()
+
+
+def get_article_cache():
+    """Return the process-wide shared ArticleCache."""
+    global _article_cache
+    with _article_cache_lock:
+        if _article_cache is None:
+            _article_cache = ArticleCache()
+    return _article_cache
@@ -0,0 +1,197 @@
+import os
+import re
+import json
+import threading
+import importlib
+from urllib.parse import urlsplit
+from html_parsing import make_soup, select_first, paragraph_text, remove_elements, DEFAULT_PARSER
+
+EXTRACTOR_PREFERENCES_PATH = os.path.join('data', 'extractor_preferences.json')
+
+# Extractors in the order they are tried when a domain has no learned preference
+DEFAULT_EXTRACTOR_ORDER = ['reuters', 'trafilatura', 'newspaper', 'html']
+# Only these are learned as a domain's preference; the generic html fallback returns text
+# for almost any page, so letting it win would stop the better extractors being tried
+PREFERABLE_EXTRACTORS = {'reuters', 'trafilatura', 'newspaper'}
+
+# Main-content containers tried by the BeautifulSoup fallback
+CONTENT_SELECTORS = [
+    'article', 'main', '.article-content', '.post-content',
+    '#article-content', '#main-content', '.story-content',
+    '[role="main"]', '.entry-content', '.content-body',
+    '.article-body', '.article__body', '.story__body',
+    '.post__content', '.post-body', '.entry__content',
+    '[data-testid="article-body"]'
+]
+
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+def _optional_import(name):
+    """Import an optional extraction backend once, or None if it is missing or broken."""
+    try:
+        return importlib.import_module(name)
+    except Exception:
+        return None
+
+
+# Optional backends are resolved once at import so the per-article path never imports anything
+_trafilatura = _optional_import('trafilatura')
+_newspaper = _optional_import('newspaper')
+
+# What this environment can do; extractors whose backend is missing are left out of EXTRACTORS
+EXTRACTOR_CAPABILITIES = {
+    'reuters': True,
+    'trafilatura': _trafilatura is not None,
+    'newspaper': _newspaper is not None and hasattr(_newspaper, 'Article'),
+    'html': True,
+    'lxml': DEFAULT_PARSER == 'lxml',
+}
+
+
+def article_domain(url):
+    """Host of url without a leading www., used to learn extractor preferences."""
+    host = (urlsplit(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def decode_html(response):
+    """
+    Text of an HTML response: the header charset, else a <meta charset>, else UTF-8.
+    Avoids requests' ISO-8859-1 default and its slow encoding detection.
+    """
+    content_type = response.headers.get('Content-Type', '')
+    match = re.search(r'charset=([\w-]+)', content_type, re.IGNORECASE)
+    encoding = match.group(1) if match else None
+    if not encoding:
+        meta = _META_CHARSET.search(response.content[:4096])
+        encoding = meta.group(1).decode('ascii') if meta else 'utf-8'
+    try:
+        return response.content.decode(encoding, errors='replace')
+    except LookupError:
+        return response.content.decode('utf-8', errors='replace')
+
+
+def _extract_reuters(html, url):
+    # Special handling for known paywalled sites
+    if 'reuters.com' not in article_domain(url):
+        return ""
+    article_body = select_first(make_soup(html), 'div.article-body, div.article-text, div.paywall')
+    return paragraph_text(article_body) if article_body else ""
+
+
+def _extract_trafilatura(html, url):
+    return _trafilatura.extract(html,
+                                url=url,
+                                include_comments=False,
+                                include_tables=True,
+                                include_links=True,
+                                include_images=False) or ""
+
+
+def _extract_newspaper(html, url):
+    config = _newspaper.Config()
+    config.fetch_images = False
+    article = _newspaper.Article(url, config=config)
+    # Parse the page we already downloaded instead of fetching it again
+    article.download(input_html=html)
+    article.parse()
+    return article.text
+
+
+def _extract_html(html, url):
+    soup = make_soup(html)
+
+    # Remove unwanted elements
+    remove_elements(soup, ['script', 'style', 'nav', 'header', 'footer', 'iframe', 'aside'])
+
+    # Try to find the main content
+    main_content = select_first(soup, CONTENT_SELECTORS)
+    return paragraph_text(main_content if main_content else soup)
+
+
+EXTRACTORS = {
+    name: extract for name, extract in [
+        ('reuters', _extract_reuters),
+        ('trafilatura', _extract_trafilatura),
+        ('newspaper', _extract_newspaper),
+        ('html', _extract_html),
+    ]
+    if EXTRACTOR_CAPABILITIES[name]
+}
+
+_missing = [name for name in DEFAULT_EXTRACTOR_ORDER if name not in EXTRACTORS]
+if _missing:
+    print(f"Article extractors unavailable: {', '.join(_missing)} (install them with pip install -r requirements.txt)")
+
+
+class ExtractorPreferences:
+    """Which extractor last succeeded for each domain, persisted as JSON."""
+
+    def __init__(self, path=EXTRACTOR_PREFERENCES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r') as f:
+                self._preferences = json.load(f)
+        except (OSError, ValueError):
+            self._preferences = {}
+
+    def get(self, domain):
+        return self._preferences.get(domain)
+
+    def record(self, domain, extractor):
+        """Remember extractor for domain, writing the file only when the choice changes."""
+        with self._lock:
+            if not domain or self._preferences.get(domain) == extractor:
+                return
+            self._preferences[domain] = extractor
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(self._preferences, f, indent=2, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Error saving extractor preferences: {str(e)}")
+
+
+_extractor_preferences = None
+_extractor_preferences_lock = threading.Lock()
+
+
+def get_extractor_preferences():
+    """Return the process-wide shared ExtractorPreferences."""
+    global _extractor_preferences
+    with _extractor_preferences_lock:
+        if _extractor_preferences is None:
+            _extractor_preferences = ExtractorPreferences()
+    return _extractor_preferences
+
+
+def extraction_order(url):
+    """Extractor names to try for url: the domain's last successful primary extractor first."""
+    order = [name for name in DEFAULT_EXTRACTOR_ORDER if name in EXTRACTORS]
+    preferred = get_extractor_preferences().get(article_domain(url))
+    if preferred not in EXTRACTORS or preferred not in PREFERABLE_EXTRACTORS:
+        return order
+    return [preferred] + [name for name in order if name != preferred]
+
+
+def extract_article(html, url):
+    """
+    Run the extractors over already downloaded HTML until one yields text.
+    Returns (content, extractor_name), or ("", None) if none did.
+    """
+    if not html:
+        return "", None
+    for name in extraction_order(url):
+        try:
+            content = EXTRACTORS[name](html, url)
+        except Exception:
+            continue  # Silently continue to next method
+        if content and content.strip():
+            if name in PREFERABLE_EXTRACTORS:
+                get_extractor_preferences().record(article_domain(url), name)
+            return content, name
+    return "", None
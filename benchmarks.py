@@ -0,0 +1,222 @@
+"""
+Micro-benchmarks for hot paths in the scraping pipeline.
+
+Usage:
+    python benchmarks.py parsers [--files data/page1.html data/page2.html] [--repeat 5]
+    python benchmarks.py financial-filter [--files data/market_news_*.csv] [--repeat 5]
+    python benchmarks.py imports [--repeat 3]
+"""
+import os
+import re
+import sys
+import glob
+import time
+import argparse
+import subprocess
+import importlib.util
+
+DATA_DIR = 'data'
+
+
+def _time_call(func, repeat):
+    """Best wall-clock time of func() over repeat runs, in milliseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def _synthetic_page(sections=200):
+    """A nested news-style page, used when no saved pages are available."""
+    section = (
+        '<section><div class="story"><h2>Defense stocks rally</h2>'
+        '<p>Lockheed Martin (LMT) rose 2.4% to $451.20 after a $1.2 billion contract award.</p>'
+        '<ul><li>Volume: 1,250,000 shares</li><li><a href="/markets/lmt">LMT quote</a></li></ul>'
+        '<table><tr><th>Ticker</th><th>Price</th></tr><tr><td>LMT</td><td>451.20</td></tr></table>'
+        '</div></section>'
+    )
+    return f"<html><head><title>Markets</title></head><body><main>{section * sections}</main></body></html>"
+
+
+def _load_pages(files):
+    if not files:
+        files = sorted(glob.glob(os.path.join(DATA_DIR, '*.html')) + glob.glob(os.path.join(DATA_DIR, '*.htm')))
+    pages = {}
+    for path in files:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            pages[os.path.basename(path)] = f.read()
+    if not pages:
+        print(f"No saved pages found in {DATA_DIR}/, using a synthetic page")
+        pages['synthetic'] = _synthetic_page()
+    return pages
+
+
+def bench_parsers(args):
+    """Compare BeautifulSoup tree builders and raw lxml on parse + text extraction."""
+    from bs4 import BeautifulSoup
+    from html_parsing import available_parsers, DEFAULT_PARSER
+
+    backends = {}
+    for parser in available_parsers():
+        backends[f"bs4[{parser}]"] = lambda html, parser=parser: BeautifulSoup(html, parser).get_text(' ', strip=True)
+    if importlib.util.find_spec('lxml') is not None:
+        import lxml.html
+        backends['lxml.html'] = lambda html: lxml.html.fromstring(html).text_content()
+
+    print(f"Default parser: {DEFAULT_PARSER}")
+    for name, html in _load_pages(args.files).items():
+        print(f"\n{name} ({len(html) / 1024:.0f} KB)")
+        results = {backend: _time_call(lambda: func(html), args.repeat) for backend, func in backends.items()}
+        fastest = min(results.values())
+        for backend, ms in sorted(results.items(), key=lambda item: item[1]):
+            print(f"  {backend:<20} {ms:9.2f} ms  x{ms / fastest:5.1f}")
+
+
+def _legacy_is_financial_line(line):
+    """The original clean_body_content filter, kept as the benchmark baseline."""
+    financial_indicators = [
+        r'\$\d+',
+        r'\d+\.\d{2}',
+        r'[A-Z]{2,5}',
+        r'(buy|sell|trade)',
+        r'(million|billion)',
+        r'(\d+\s*shares)',
+        r'(stock|market|trading)'
+    ]
+    return (
+        len(line.strip()) > 20 or
+        any(re.search(pattern, line.lower()) for pattern in financial_indicators)
+    )
+
+
+def _legacy_has_indicator(line):
+    """The legacy pattern check without the length shortcut."""
+    return any(re.search(pattern, line.lower()) for pattern in [
+        r'\$\d+', r'\d+\.\d{2}', r'[A-Z]{2,5}', r'(buy|sell|trade)',
+        r'(million|billion)', r'(\d+\s*shares)', r'(stock|market|trading)'
+    ])
+
+
+def _load_news_lines(files):
+    import pandas as pd
+    if not files:
+        files = sorted(glob.glob(os.path.join(DATA_DIR, '*news*.csv')))
+    lines = []
+    for path in files:
+        df = pd.read_csv(path)
+        for column in ('title', 'description', 'full_content'):
+            if column in df.columns:
+                for text in df[column].dropna().astype(str):
+                    # Short fragments are what the filter actually has to classify
+                    lines.extend(part.strip() for part in re.split(r'[\n.;:]', text) if part.strip())
+    return files, lines
+
+
+def bench_financial_filter(args):
+    """Compare the legacy seven-pattern line filter with the precompiled classifier."""
+    from financial_text import is_financial_line, has_financial_indicator
+
+    files, lines = _load_news_lines(args.files)
+    if not lines:
+        print(f"No news CSVs found in {DATA_DIR}/")
+        return
+    short = [line for line in lines if len(line) <= 20]
+    print(f"{len(lines):,} lines from {len(files)} files ({len(short):,} of 20 characters or fewer)")
+
+    cases = [
+        ('filter, all lines', lines, _legacy_is_financial_line, is_financial_line),
+        ('filter, short lines', short, _legacy_is_financial_line, is_financial_line),
+        ('indicators, all lines', lines, _legacy_has_indicator, has_financial_indicator),
+    ]
+    for name, sample, legacy, current in cases:
+        legacy_ms = _time_call(lambda: [legacy(line) for line in sample], args.repeat)
+        current_ms = _time_call(lambda: [current(line) for line in sample], args.repeat)
+        print(f"  {name:<22} legacy {legacy_ms:9.2f} ms   new {current_ms:9.2f} ms   x{legacy_ms / max(current_ms, 1e-9):5.1f}")
+
+    kept_legacy = sum(map(_legacy_is_financial_line, short))
+    kept_new = sum(map(is_financial_line, short))
+    print(f"  short lines kept: legacy {kept_legacy:,}, new {kept_new:,}")
+
+
+# Modules whose cold import cost is measured by the imports benchmark
+IMPORT_MODULES = ['bs4', 'lxml.html', 'trafilatura', 'newspaper', 'article_extractors']
+
+_IMPORT_SNIPPET = (
+    "import time, importlib; start = time.perf_counter(); importlib.import_module({name!r}); "
+    "print(time.perf_counter() - start)"
+)
+
+
+def _cold_import_ms(name, repeat):
+    """Best import time of name in a fresh interpreter, in milliseconds, or None if it fails."""
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-c', _IMPORT_SNIPPET.format(name=name)],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        if result.returncode != 0:
+            return None
+        elapsed = float(result.stdout.strip().splitlines()[-1]) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _legacy_backend_checks():
+    """What the old fetch_article_content did per article before extracting anything."""
+    importlib.util.find_spec("trafilatura")
+    try:
+        import trafilatura  # noqa: F401
+    except ImportError:
+        pass
+    try:
+        from newspaper import Article, Config  # noqa: F401
+    except ImportError:
+        pass
+
+
+def bench_imports(args):
+    """Cold import cost of the extraction backends, and per-article backend lookup before/after the registry."""
+    print("Cold import (fresh interpreter):")
+    for name in IMPORT_MODULES:
+        ms = _cold_import_ms(name, args.repeat)
+        print(f"  {name:<20} " + ("not installed" if ms is None else f"{ms:9.1f} ms"))
+
+    from article_extractors import EXTRACTOR_CAPABILITIES, extraction_order
+    print(f"\nCapabilities: {', '.join(name for name, ok in EXTRACTOR_CAPABILITIES.items() if ok)}")
+
+    calls = 1000
+    url = 'https://www.example.com/markets/story'
+    legacy_ms = _time_call(lambda: [_legacy_backend_checks() for _ in range(calls)], args.repeat)
+    registry_ms = _time_call(lambda: [extraction_order(url) for _ in range(calls)], args.repeat)
+    print(f"\nPer-article backend resolution ({calls:,} articles):")
+    print(f"  legacy find_spec + imports {legacy_ms:9.2f} ms")
+    print(f"  registry lookup            {registry_ms:9.2f} ms   x{legacy_ms / max(registry_ms, 1e-9):5.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parsers_cmd = subparsers.add_parser('parsers', help='HTML parser backends on saved pages')
+    parsers_cmd.add_argument('--files', nargs='*', help=f'HTML files (default: {DATA_DIR}/*.html)')
+    parsers_cmd.add_argument('--repeat', type=int, default=5)
+    parsers_cmd.set_defaults(func=bench_parsers)
+
+    filter_cmd = subparsers.add_parser('financial-filter', help='financial line filter on saved news CSVs')
+    filter_cmd.add_argument('--files', nargs='*', help=f'news CSV files (default: {DATA_DIR}/*news*.csv)')
+    filter_cmd.add_argument('--repeat', type=int, default=5)
+    filter_cmd.set_defaults(func=bench_financial_filter)
+
+    imports_cmd = subparsers.add_parser('imports', help='import cost of the article extraction backends')
+    imports_cmd.add_argument('--repeat', type=int, default=3)
+    imports_cmd.set_defaults(func=bench_imports)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
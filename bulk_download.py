@@ -0,0 +1,246 @@
+import os
+import time
+import uuid
+import zipfile
+import threading
+from datetime import datetime
+import pandas as pd
+import pyarrow.parquet as pq
+from usaspending import USASPENDING_BASE_URL, get_session, usaspending_request
+
+DOWNLOAD_DIR = os.path.join('data', 'bulk_downloads')
+AWARD_STORE_DIR = os.path.join('data', 'award_store')
+
+POLL_INTERVAL_SECONDS = 10
+POLL_TIMEOUT_SECONDS = 60 * 60
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+INGEST_CHUNK_ROWS = 100_000
+
+# Date columns used to assign rows to a fiscal-year partition, in order of preference
+FISCAL_YEAR_DATE_COLUMNS = [
+    'action_date',
+    'period_of_performance_start_date',
+    'award_base_action_date'
+]
+
+# Unique row keys of the download files (transaction files first, then award summaries);
+# the first one present identifies a row when overlapping downloads are read back
+AWARD_KEY_COLUMNS = [
+    'contract_transaction_unique_key',
+    'assistance_transaction_unique_key',
+    'contract_award_unique_key',
+    'assistance_award_unique_key'
+]
+
+
+def fiscal_year(dates):
+    """Federal fiscal year for a Series of dates (FY N runs from October N-1 through September N)."""
+    dates = pd.to_datetime(dates, errors='coerce')
+    return (dates.dt.year + (dates.dt.month >= 10).astype('Int64')).astype('Int64')
+
+
+class BulkDownloadJob:
+    """
+    One USAspending /download/awards/ request, run on a background thread.
+
+    The job submits the request, polls /download/status/ until the file is ready,
+    streams the zip to disk in chunks, and then ingests each CSV member chunk by
+    chunk into Parquet files partitioned by fiscal year under AWARD_STORE_DIR.
+    Part files are prefixed with the ingest time, so the latest copy of a row sorts last.
+    """
+
+    def __init__(self, payload, download_dir=DOWNLOAD_DIR, store_dir=AWARD_STORE_DIR,
+                 poll_interval=POLL_INTERVAL_SECONDS, poll_timeout=POLL_TIMEOUT_SECONDS):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.payload = payload
+        self.download_dir = download_dir
+        self.store_dir = store_dir
+        self.poll_interval = poll_interval
+        self.poll_timeout = poll_timeout
+
+        self.status = 'pending'
+        self.message = ''
+        self.file_name = None
+        self.file_url = None
+        self.local_path = None
+        self.bytes_downloaded = 0
+        self.rows_ingested = 0
+        self.fiscal_years = set()
+        self.started_at = None
+        self.finished_at = None
+        self._ingest_stamp = None
+        self._thread = None
+
+    @property
+    def done(self):
+        return self.status in ('finished', 'failed')
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name=f"bulk-download-{self.job_id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.done
+
+    def run(self):
+        self.started_at = datetime.now()
+        try:
+            self._submit()
+            self._poll()
+            self._download()
+            self._ingest()
+            self.status = 'finished'
+            self.message = f"Ingested {self.rows_ingested:,} rows into fiscal years {sorted(self.fiscal_years)}"
+        except Exception as e:
+            self.status = 'failed'
+            self.message = str(e)
+            print(f"Bulk download job {self.job_id} failed: {e}")
+        finally:
+            self.finished_at = datetime.now()
+
+    def _submit(self):
+        self.status = 'submitting'
+        response = usaspending_request('POST', f"{USASPENDING_BASE_URL}/download/awards/", self.payload)
+        self.file_name = response.get('file_name')
+        self.file_url = response.get('file_url')
+        if not self.file_name:
+            raise ValueError(f"Download request was not accepted: {response}")
+
+    def _poll(self):
+        self.status = 'running'
+        deadline = time.monotonic() + self.poll_timeout
+        while True:
+            status = usaspending_request(
+                'GET', f"{USASPENDING_BASE_URL}/download/status/", {'file_name': self.file_name}
+            )
+            state = status.get('status')
+            self.message = status.get('message') or state or ''
+            if state == 'finished':
+                self.file_url = status.get('file_url') or self.file_url
+                return
+            if state == 'failed':
+                raise RuntimeError(f"USAspending download failed: {self.message}")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Download {self.file_name} not ready after {self.poll_timeout}s")
+            time.sleep(self.poll_interval)
+
+    def _download(self):
+        """Stream the generated file to disk without holding it in memory."""
+        self.status = 'downloading'
+        os.makedirs(self.download_dir, exist_ok=True)
+        self.local_path = os.path.join(self.download_dir, self.file_name)
+        tmp_path = f"{self.local_path}.part"
+        with get_session().get(self.file_url, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                    if chunk:
+                        f.write(chunk)
+                        self.bytes_downloaded += len(chunk)
+        os.replace(tmp_path, self.local_path)
+
+    def _ingest(self):
+        """Decompress CSV members incrementally and append them to fiscal-year partitions."""
+        self.status = 'ingesting'
+        self._ingest_stamp = f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{self.job_id}"
+        if zipfile.is_zipfile(self.local_path):
+            with zipfile.ZipFile(self.local_path) as archive:
+                for member in archive.namelist():
+                    if member.lower().endswith('.csv'):
+                        with archive.open(member) as f:
+                            self._ingest_csv(f, os.path.splitext(os.path.basename(member))[0])
+        else:
+            with open(self.local_path, 'rb') as f:
+                self._ingest_csv(f, os.path.splitext(self.file_name)[0])
+
+    def _ingest_csv(self, file_obj, part_prefix):
+        for chunk_number, chunk in enumerate(pd.read_csv(file_obj, chunksize=INGEST_CHUNK_ROWS, dtype=str)):
+            date_column = next((col for col in FISCAL_YEAR_DATE_COLUMNS if col in chunk.columns), None)
+            years = fiscal_year(chunk[date_column]) if date_column else pd.Series(pd.NA, index=chunk.index, dtype='Int64')
+
+            for year, rows in chunk.groupby(years.fillna(0), sort=False):
+                partition = f"fiscal_year={int(year)}" if year else "fiscal_year=unknown"
+                partition_dir = os.path.join(self.store_dir, partition)
+                os.makedirs(partition_dir, exist_ok=True)
+                rows.to_parquet(
+                    os.path.join(partition_dir, f"{self._ingest_stamp}-{part_prefix}-{chunk_number:05d}.parquet"),
+                    index=False
+                )
+                if year:
+                    self.fiscal_years.add(int(year))
+            self.rows_ingested += len(chunk)
+
+
+class BulkDownloadManager:
+    """Keeps track of background bulk download jobs for the lifetime of the process."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, payload, **job_options):
+        job = BulkDownloadJob(payload, **job_options)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        return job.start()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+
+def award_key_column(columns):
+    """The column that uniquely identifies a row of a download file, or None."""
+    return next((col for col in AWARD_KEY_COLUMNS if col in columns), None)
+
+
+def load_award_store(fiscal_years=None, store_dir=AWARD_STORE_DIR, columns=None):
+    """
+    Load ingested bulk award rows, optionally restricted to some fiscal years.
+    Rows ingested more than once by overlapping downloads are returned once, from the latest download.
+    """
+    if not os.path.isdir(store_dir):
+        return pd.DataFrame()
+    frames = []
+    key_column = None
+    for partition in sorted(os.listdir(store_dir)):
+        year = partition.split('=', 1)[-1]
+        if fiscal_years is not None and year not in {str(y) for y in fiscal_years}:
+            continue
+        partition_dir = os.path.join(store_dir, partition)
+        for part in sorted(os.listdir(partition_dir)):
+            if part.endswith('.parquet'):
+                path = os.path.join(partition_dir, part)
+                key_column = key_column or award_key_column(pq.read_schema(path).names)
+                read_columns = columns
+                if columns is not None and key_column and key_column not in columns:
+                    read_columns = list(columns) + [key_column]
+                frames.append(pd.read_parquet(path, columns=read_columns))
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    if key_column in df.columns:
+        keyed = df[key_column].notna()
+        df = pd.concat([df[keyed].drop_duplicates(subset=key_column, keep='last'), df[~keyed]]).sort_index()
+        df = df.reset_index(drop=True)
+    if columns is not None:
+        df = df[list(columns)]
+    return df
+
+
+_bulk_download_manager = None
+
+
+def get_bulk_download_manager():
+    """Return the process-wide shared BulkDownloadManager."""
+    global _bulk_download_manager
+    if _bulk_download_manager is None:
+        _bulk_download_manager = BulkDownloadManager()
+    return _bulk_download_manager
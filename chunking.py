@@ -0,0 +1,163 @@
+import re
+from typing import Iterator, List
+
+# Rough characters-per-token ratio for English text with Gemini/GPT-style tokenizers
+CHARS_PER_TOKEN = 4
+
+# Default chunk size in tokens (about the old 1000-character chunks)
+DEFAULT_CHUNK_TOKENS = 250
+
+_BLANK_LINES = re.compile(r'\n[ \t]*\n+')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_TABLE_ROW = re.compile(r'^\s*\|.*\|\s*$|\S\s\|\s\S')
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of text without calling the model's tokenizer."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _is_heading(block: str) -> bool:
+    return block.startswith(('Heading:', 'Title:', '#'))
+
+
+def _is_table_row(block: str) -> bool:
+    return all(_TABLE_ROW.search(line) for line in block.split('\n'))
+
+
+def iter_blocks(content: str) -> Iterator[str]:
+    """
+    Yield structural blocks: blank-line separated paragraphs, with a "Table content:"
+    marker and the table rows after it (or consecutive markdown rows) kept together.
+    """
+    table = []
+    for block in _BLANK_LINES.split(content):
+        block = block.strip('\n')
+        if not block.strip():
+            continue
+        if block == 'Table content:' or (table and _is_table_row(block)):
+            if block == 'Table content:' and table:
+                yield '\n'.join(table)
+                table = []
+            table.append(block)
+            continue
+        if table:
+            yield '\n'.join(table)
+            table = []
+        if _is_table_row(block):
+            table.append(block)
+        else:
+            yield block
+    if table:
+        yield '\n'.join(table)
+
+
+def _split_oversized(block: str, max_tokens: int) -> Iterator[str]:
+    """Split a block that exceeds the budget at line, then sentence, then word boundaries."""
+    lines = block.split('\n')
+    # Tables repeat their header line(s) in every piece
+    header = []
+    if len(lines) > 1 and (lines[0] == 'Table content:' or _TABLE_ROW.search(lines[0])):
+        header_size = 2 if lines[0] == 'Table content:' and len(lines) > 2 else 1
+        header, lines = lines[:header_size], lines[header_size:]
+    if len(lines) == 1 and not header:
+        pieces = _SENTENCE_END.split(block)
+        if len(pieces) == 1:
+            pieces = block.split(' ')
+        joiner = ' '
+    else:
+        pieces, joiner = lines, '\n'
+
+    header_text = '\n'.join(header)
+    budget = max_tokens - estimate_tokens(header_text)
+    current, current_tokens = [], 0
+    for piece in pieces:
+        piece_tokens = estimate_tokens(piece) + 1
+        if piece_tokens > budget and not header:
+            # A single line or sentence that is still too large
+            if current:
+                yield joiner.join(current)
+                current, current_tokens = [], 0
+            yield from _split_oversized(piece, max_tokens) if piece != block else _hard_split(piece, max_tokens)
+            continue
+        if current and current_tokens + piece_tokens > budget:
+            yield '\n'.join(header + [joiner.join(current)]) if header else joiner.join(current)
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        yield '\n'.join(header + [joiner.join(current)]) if header else joiner.join(current)
+
+
+def _hard_split(text: str, max_tokens: int) -> Iterator[str]:
+    """Last resort for text without any usable boundaries."""
+    size = max_tokens * CHARS_PER_TOKEN
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+def iter_dom_chunks(content: str, max_tokens: int = DEFAULT_CHUNK_TOKENS,
+                    overlap_tokens: int = 0) -> Iterator[str]:
+    """
+    Split scraped content into chunks of at most max_tokens estimated tokens.
+
+    Headings, paragraphs and tables are kept whole whenever they fit; a heading is
+    never left as the last block of a chunk, so it travels with the text it
+    introduces. Blocks larger than the budget are split at line, sentence and
+    finally word boundaries, with table headers repeated. With overlap_tokens,
+    each chunk starts with the trailing blocks of the previous one, up to that many
+    tokens.
+    """
+    if not content:
+        return
+    current: List[str] = []
+    current_tokens = 0
+
+    def pieces():
+        for block in iter_blocks(content):
+            if estimate_tokens(block) > max_tokens:
+                yield from _split_oversized(block, max_tokens)
+            else:
+                yield block
+
+    for block in pieces():
+        block_tokens = estimate_tokens(block) + 1
+        if current and current_tokens + block_tokens > max_tokens:
+            # Move a trailing heading into the next chunk
+            carried = []
+            while current and _is_heading(current[-1]) and len(current) > 1:
+                carried.insert(0, current.pop())
+            yield '\n\n'.join(current)
+
+            overlap, overlap_size = [], 0
+            for previous in reversed(current):
+                size = estimate_tokens(previous) + 1
+                if overlap_size + size > overlap_tokens:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += size
+            current = overlap + carried
+            current_tokens = sum(estimate_tokens(b) + 1 for b in current)
+            # Drop the overlap again if it leaves no room for the new block
+            while current and current_tokens + block_tokens > max_tokens and overlap:
+                current_tokens -= estimate_tokens(overlap.pop(0)) + 1
+                current.pop(0)
+        current.append(block)
+        current_tokens += block_tokens
+    if current:
+        yield '\n\n'.join(current)
+
+
+def pack_chunks(chunks, max_tokens: int) -> List[str]:
+    """Greedily combine whole chunks into contexts of at most max_tokens each."""
+    contexts, current, current_tokens = [], [], 0
+    for chunk in chunks:
+        chunk_tokens = estimate_tokens(chunk) + 1
+        if current and current_tokens + chunk_tokens > max_tokens:
+            contexts.append('\n\n'.join(current))
+            current, current_tokens = [], 0
+        current.append(chunk)
+        current_tokens += chunk_tokens
+    if current:
+        contexts.append('\n\n'.join(current))
+    return contexts
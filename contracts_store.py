@@ -0,0 +1,270 @@
+import os
+import csv
+import time
+import sqlite3
+import threading
+import pandas as pd
+
+CONTRACTS_DB_PATH = os.path.join('data', 'contracts.sqlite')
+
+# spending_by_award field name -> awards table column
+FIELD_COLUMNS = {
+    'generated_internal_id': 'generated_internal_id',
+    'Award ID': 'award_id',
+    'Recipient Name': 'recipient_name',
+    'Start Date': 'start_date',
+    'End Date': 'end_date',
+    'Award Amount': 'award_amount',
+    'Description': 'description',
+    'Awarding Agency': 'awarding_agency',
+    'Awarding Sub Agency': 'awarding_sub_agency',
+    'Contract Award Type': 'contract_award_type',
+}
+COLUMN_FIELDS = {column: field for field, column in FIELD_COLUMNS.items()}
+
+# A fetched (recipient, date range) is served locally for this long before refetching
+DEFAULT_MAX_FETCH_AGE = 24 * 60 * 60
+
+# award_type_codes of the contract searches (definitive contracts, purchase and delivery orders, BPA calls)
+CONTRACT_AWARD_TYPES = ('A', 'B', 'C', 'D')
+
+
+def fetch_key(recipient, start_date, end_date, award_types=CONTRACT_AWARD_TYPES):
+    """Normalized parameters of a spending_by_award search, identifying its fetch log entry."""
+    return '|'.join([
+        (recipient or '').strip().lower(),
+        ','.join(sorted(award_types or ())),
+        str(start_date),
+        str(end_date)
+    ])
+
+
+class ContractsStore:
+    """
+    Embedded SQLite warehouse of contract awards.
+
+    Awards are upserted by generated_internal_id (falling back to Award ID), with
+    indexes on recipient, start date, agency and amount so the Contract Data tab,
+    ContractAnalysis and the timeline can filter locally. A fetch log records which
+    searches (recipient text, award types and dates) have already been pulled from the
+    API and exactly which awards each returned, so a repeated search is answered with
+    the same rows the API gave rather than by re-filtering the table.
+    """
+
+    def __init__(self, path=CONTRACTS_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS awards (
+                generated_internal_id TEXT PRIMARY KEY,
+                award_id TEXT,
+                recipient_name TEXT COLLATE NOCASE,
+                start_date TEXT,
+                end_date TEXT,
+                award_amount REAL,
+                description TEXT,
+                awarding_agency TEXT COLLATE NOCASE,
+                awarding_sub_agency TEXT,
+                contract_award_type TEXT,
+                updated_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_awards_recipient ON awards (recipient_name);
+            CREATE INDEX IF NOT EXISTS idx_awards_start_date ON awards (start_date);
+            CREATE INDEX IF NOT EXISTS idx_awards_agency ON awards (awarding_agency);
+            CREATE INDEX IF NOT EXISTS idx_awards_amount ON awards (award_amount);
+
+            CREATE TABLE IF NOT EXISTS fetches (
+                fetch_key TEXT PRIMARY KEY,
+                recipient_query TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_fetches_recipient ON fetches (recipient_query, fetched_at);
+
+            CREATE TABLE IF NOT EXISTS fetch_awards (
+                fetch_key TEXT NOT NULL,
+                generated_internal_id TEXT NOT NULL,
+                PRIMARY KEY (fetch_key, generated_internal_id)
+            );
+        """)
+        self._conn.commit()
+
+    def upsert_awards(self, rows):
+        """Insert or update award rows keyed by spending_by_award field names. Returns the row count."""
+        return len(self._upsert(rows))
+
+    def _upsert(self, rows):
+        """Upsert rows and return their award keys."""
+        now = time.time()
+        columns = list(COLUMN_FIELDS)
+        records = []
+        for row in rows:
+            key = row.get('generated_internal_id') or row.get('Award ID')
+            if not key:
+                continue
+            record = {column: row.get(field) for field, column in FIELD_COLUMNS.items()}
+            record['generated_internal_id'] = key
+            for column in ('recipient_name', 'start_date', 'end_date', 'description',
+                           'awarding_agency', 'awarding_sub_agency', 'contract_award_type', 'award_id'):
+                # Blank CSV cells and NaN become NULL so they don't overwrite known values
+                if record[column] is not None and (pd.isna(record[column]) or record[column] == ''):
+                    record[column] = None
+            try:
+                record['award_amount'] = float(record['award_amount']) if record['award_amount'] not in (None, '') else None
+            except (TypeError, ValueError):
+                record['award_amount'] = None
+            records.append(tuple(record[c] for c in columns) + (now,))
+
+        if not records:
+            return []
+
+        # Columns missing from a partial payload keep their stored value
+        updates = ', '.join(
+            f"{c} = COALESCE(excluded.{c}, awards.{c})" for c in columns if c != 'generated_internal_id'
+        )
+        sql = (
+            f"INSERT INTO awards ({', '.join(columns)}, updated_at) "
+            f"VALUES ({', '.join('?' for _ in columns)}, ?) "
+            f"ON CONFLICT(generated_internal_id) DO UPDATE SET {updates}, updated_at = excluded.updated_at"
+        )
+        with self._lock:
+            self._conn.executemany(sql, records)
+            self._conn.commit()
+        return [record[0] for record in records]
+
+    def _iter_csv_keys(self, csv_path, batch_size):
+        with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+            batch = []
+            for row in csv.DictReader(f):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    yield from self._upsert(batch)
+                    batch = []
+            yield from self._upsert(batch)
+
+    def upsert_csv(self, csv_path, batch_size=5000):
+        """Upsert every row of a spending_by_award CSV in batches. Returns the row count."""
+        return sum(1 for _ in self._iter_csv_keys(csv_path, batch_size))
+
+    def ingest_fetch(self, csv_path, recipient, start_date, end_date, award_types=CONTRACT_AWARD_TYPES,
+                     batch_size=5000):
+        """
+        Upsert the CSV of a complete spending_by_award search and record it in the fetch log
+        with the awards it returned. Returns the row count.
+        """
+        keys = list(self._iter_csv_keys(csv_path, batch_size))
+        self.record_fetch(recipient, start_date, end_date, keys, award_types)
+        return len(keys)
+
+    def record_fetch(self, recipient, start_date, end_date, award_ids, award_types=CONTRACT_AWARD_TYPES):
+        """
+        Remember that the search for recipient/award_types in [start_date, end_date] returned award_ids.
+        Only call this after a complete fetch, or the missing awards are never refetched.
+        """
+        key = fetch_key(recipient, start_date, end_date, award_types)
+        with self._lock:
+            self._conn.execute("DELETE FROM fetch_awards WHERE fetch_key = ?", (key,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO fetch_awards (fetch_key, generated_internal_id) VALUES (?, ?)",
+                [(key, str(award_id)) for award_id in award_ids]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fetches (fetch_key, recipient_query, fetched_at) VALUES (?, ?, ?)",
+                (key, recipient.strip().lower(), time.time())
+            )
+            self._conn.commit()
+
+    def is_covered(self, recipient, start_date, end_date, award_types=CONTRACT_AWARD_TYPES,
+                   max_age=DEFAULT_MAX_FETCH_AGE):
+        """True if the same search was fetched completely within max_age seconds."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM fetches WHERE fetch_key = ? AND fetched_at >= ?",
+                (fetch_key(recipient, start_date, end_date, award_types), time.time() - max_age)
+            ).fetchone()
+        return row is not None
+
+    def fetched_awards(self, recipient, start_date, end_date, award_types=CONTRACT_AWARD_TYPES,
+                       max_age=DEFAULT_MAX_FETCH_AGE, limit=None):
+        """
+        The awards a recent fetch of this exact search returned, as a DataFrame ordered by
+        amount (largest first), or None if the search is not covered.
+        """
+        if not self.is_covered(recipient, start_date, end_date, award_types, max_age):
+            return None
+        return self._fetch_rows(fetch_key(recipient, start_date, end_date, award_types), limit)
+
+    def latest_fetched_awards(self, recipient):
+        """The awards returned by the most recent fetch for recipient (any dates or age), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetch_key FROM fetches WHERE recipient_query = ? ORDER BY fetched_at DESC LIMIT 1",
+                (recipient.strip().lower(),)
+            ).fetchone()
+        return self._fetch_rows(row[0]) if row else None
+
+    def _fetch_rows(self, key, limit=None):
+        sql = (
+            f"SELECT {', '.join('awards.' + column for column in COLUMN_FIELDS)} FROM fetch_awards "
+            "JOIN awards ON awards.generated_internal_id = fetch_awards.generated_internal_id "
+            "WHERE fetch_awards.fetch_key = ? ORDER BY awards.award_amount DESC"
+        )
+        params = [key]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            df = pd.read_sql_query(sql, self._conn, params=params)
+        return df.rename(columns=COLUMN_FIELDS)
+
+    def query_awards(self, recipient=None, start_date=None, end_date=None, agency=None,
+                     min_amount=None, max_amount=None, limit=None):
+        """
+        Query stored awards and return a DataFrame with spending_by_award column names.
+        Date filters select awards whose period of performance overlaps [start_date, end_date];
+        a missing start or end date counts as open-ended.
+        Results are ordered by award amount, largest first.
+        """
+        clauses, params = [], []
+        if recipient:
+            clauses.append("recipient_name LIKE ?")
+            params.append(f"%{recipient.strip()}%")
+        if end_date:
+            clauses.append("(start_date IS NULL OR start_date <= ?)")
+            params.append(str(end_date))
+        if start_date:
+            clauses.append("(end_date IS NULL OR end_date >= ?)")
+            params.append(str(start_date))
+        if agency:
+            clauses.append("awarding_agency = ?")
+            params.append(agency)
+        if min_amount is not None:
+            clauses.append("award_amount >= ?")
+            params.append(min_amount)
+        if max_amount is not None:
+            clauses.append("award_amount <= ?")
+            params.append(max_amount)
+
+        sql = f"SELECT {', '.join(COLUMN_FIELDS)} FROM awards"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY award_amount DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        with self._lock:
+            df = pd.read_sql_query(sql, self._conn, params=params)
+        return df.rename(columns=COLUMN_FIELDS)
+
+
+_contracts_store = None
+
+
+def get_contracts_store():
+    """Return the process-wide shared ContractsStore."""
+    global _contracts_store
+    if _contracts_store is None:
+        _contracts_store = ContractsStore()
+    return _contracts_store
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+
+def _window_means(cumsum, lo, hi):
+    """Mean of rows [lo, hi) for every event, NaN where the window is empty."""
+    counts = hi - lo
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = (cumsum[hi] - cumsum[lo]) / counts
+    return np.where(counts > 0, means, np.nan)
+
+
+def _pct_change(before, after):
+    """Percentage change that yields NaN instead of inf/errors for missing or zero baselines."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change = (after - before) / before * 100
+    return np.where(np.isfinite(change), change, np.nan)
+
+
+def compute_event_windows(stock_data, event_dates, pre_window=10, post_window=10,
+                          calendar_days=False, benchmark_data=None):
+    """
+    Compute pre/post event-window statistics for many events in one pass.
+
+    stock_data is a price frame with a DatetimeIndex and 'Close'/'Volume' columns.
+    The pre window covers the rows strictly before each event date and the post
+    window starts on the event date. Window sizes are trading days by default, or
+    calendar days when calendar_days=True.
+
+    Window bounds are located with np.searchsorted on the sorted index and means
+    come from cumulative-sum arrays, so the cost is O(n + m log n) for n trading
+    days and m events.
+
+    If benchmark_data (same layout) is given, abnormal_return_pct is the stock's
+    return across the event window minus the benchmark's return over the same dates.
+
+    Returns a DataFrame aligned with event_dates.
+    """
+    event_dates = pd.to_datetime(pd.Series(event_dates), errors='coerce')
+    valid = event_dates.notna().to_numpy()
+    result_columns = [
+        'pre_price_avg', 'post_price_avg', 'pre_volume_avg', 'post_volume_avg',
+        'price_change_pct', 'volume_change_pct', 'event_return_pct', 'abnormal_return_pct'
+    ]
+
+    if stock_data is None or stock_data.empty:
+        return pd.DataFrame(np.nan, index=range(len(event_dates)), columns=result_columns)
+
+    stock_data = stock_data[['Close', 'Volume']].dropna().sort_index()
+    index = stock_data.index.values.astype('datetime64[ns]')
+    close = stock_data['Close'].to_numpy(dtype=np.float64)
+    volume = stock_data['Volume'].to_numpy(dtype=np.float64)
+    n = len(index)
+
+    # Leading zero so the sum of rows [lo, hi) is cumsum[hi] - cumsum[lo]
+    close_cumsum = np.concatenate(([0.0], np.cumsum(close)))
+    volume_cumsum = np.concatenate(([0.0], np.cumsum(volume)))
+
+    events = event_dates.to_numpy(dtype='datetime64[ns]')
+    events = np.where(valid, events, index[0])
+
+    pos = np.searchsorted(index, events, side='left')
+    if calendar_days:
+        pre_lo = np.searchsorted(index, events - np.timedelta64(pre_window, 'D'), side='left')
+        post_hi = np.searchsorted(index, events + np.timedelta64(post_window, 'D'), side='left')
+    else:
+        pre_lo = np.maximum(pos - pre_window, 0)
+        post_hi = np.minimum(pos + post_window, n)
+
+    pre_price = _window_means(close_cumsum, pre_lo, pos)
+    post_price = _window_means(close_cumsum, pos, post_hi)
+    pre_volume = _window_means(volume_cumsum, pre_lo, pos)
+    post_volume = _window_means(volume_cumsum, pos, post_hi)
+
+    # Event return runs from the last close before the event to the last close in the post window
+    has_window = (pos > 0) & (post_hi > pos)
+    start_idx = np.clip(pos - 1, 0, n - 1)
+    end_idx = np.clip(post_hi - 1, 0, n - 1)
+    event_return = np.where(has_window, _pct_change(close[start_idx], close[end_idx]), np.nan)
+
+    abnormal_return = np.full(len(events), np.nan)
+    if benchmark_data is not None and not benchmark_data.empty:
+        benchmark_close = (
+            benchmark_data['Close'].sort_index()
+            .reindex(stock_data.index, method='ffill')
+            .to_numpy(dtype=np.float64)
+        )
+        benchmark_return = _pct_change(benchmark_close[start_idx], benchmark_close[end_idx])
+        abnormal_return = np.where(has_window, event_return - benchmark_return, np.nan)
+
+    result = pd.DataFrame({
+        'pre_price_avg': pre_price,
+        'post_price_avg': post_price,
+        'pre_volume_avg': pre_volume,
+        'post_volume_avg': post_volume,
+        'price_change_pct': _pct_change(pre_price, post_price),
+        'volume_change_pct': _pct_change(pre_volume, post_volume),
+        'event_return_pct': event_return,
+        'abnormal_return_pct': abnormal_return,
+    })
+    # Unparseable event dates get no statistics at all
+    result.loc[~valid, :] = np.nan
+    return result
@@ -0,0 +1,84 @@
+import re
+from typing import Iterable, List
+
+from ticker_resolver import DEFAULT_MAPPINGS
+
+# Lines longer than this are always kept by the financial filter
+MIN_LINE_LENGTH = 20
+
+# Widely held symbols recognized in scraped text, on top of the contractor tickers
+COMMON_SYMBOLS = {
+    'AAPL', 'MSFT', 'GOOGL', 'GOOG', 'AMZN', 'META', 'NVDA', 'TSLA', 'AMD', 'INTC', 'AVGO', 'QCOM',
+    'ORCL', 'CRM', 'ADBE', 'NFLX', 'CSCO', 'IBM', 'TXN', 'MU', 'AMAT', 'ASML', 'TSM', 'SMCI', 'ARM',
+    'JPM', 'BAC', 'WFC', 'GS', 'MS', 'C', 'BRK.B', 'BRK.A', 'V', 'MA', 'PYPL', 'AXP', 'SCHW', 'BLK',
+    'XOM', 'CVX', 'COP', 'OXY', 'SLB', 'UNH', 'JNJ', 'PFE', 'MRK', 'LLY', 'ABBV', 'MRNA', 'BMY',
+    'WMT', 'COST', 'TGT', 'HD', 'LOW', 'NKE', 'SBUX', 'MCD', 'KO', 'PEP', 'PG', 'DIS', 'CMCSA',
+    'T', 'VZ', 'TMUS', 'F', 'GM', 'RIVN', 'UBER', 'ABNB', 'SHOP', 'SQ', 'COIN', 'HOOD', 'PLTR',
+    'SNOW', 'CRWD', 'PANW', 'NOW', 'BABA', 'PDD', 'NIO', 'SPY', 'QQQ', 'DIA', 'IWM', 'VOO', 'VTI',
+}
+
+# Upper-case words that are also tickers but usually mean something else in prose
+AMBIGUOUS_SYMBOLS = {
+    'A', 'C', 'F', 'T', 'V', 'IT', 'ON', 'ALL', 'NOW', 'ARE', 'CEO', 'CFO', 'USA', 'US', 'AI',
+    'SO', 'BE', 'GO', 'OR', 'AN', 'AT', 'BY', 'DO', 'IN', 'OUT', 'FOR', 'AND', 'THE', 'NEW', 'ONE',
+}
+
+KNOWN_SYMBOLS = set(COMMON_SYMBOLS) | set(DEFAULT_MAPPINGS.values())
+
+# Every non-ticker indicator in one alternation, matched against the lower-cased line
+# (lower() plus a case-sensitive pattern is much faster than re.IGNORECASE)
+_INDICATOR_PATTERN = re.compile(
+    r"\$[\da-z]"                     # dollar amounts and cashtags
+    r"|\d(?:\.\d\d|\s*shares)"        # two-decimal numbers and share quantities
+    r"|(?:m|b|tr)illion"             # large numbers
+    r"|buy|sell|trad(?:e|ing)"       # trading terms
+    r"|stock|market"                 # market terms
+)
+# Ticker candidates are case-sensitive and only count if they are known symbols
+_TICKER_PATTERN = re.compile(r"\b[A-Z]{1,5}(?:\.[A-Z])?\b")
+_CASHTAG_PATTERN = re.compile(r"\$([A-Za-z]{1,5}(?:\.[A-Za-z])?)\b")
+
+
+def add_known_symbols(symbols: Iterable[str]) -> None:
+    """Extend the set of symbols that count as ticker mentions."""
+    KNOWN_SYMBOLS.update(symbol.strip().upper() for symbol in symbols if symbol and symbol.strip())
+
+
+def _known_tickers(line: str) -> List[str]:
+    return [
+        ticker for ticker in _TICKER_PATTERN.findall(line)
+        if ticker in KNOWN_SYMBOLS and ticker not in AMBIGUOUS_SYMBOLS
+    ]
+
+
+def find_tickers(text: str) -> List[str]:
+    """Distinct known ticker symbols in text, in order of first mention; $cashtags always count."""
+    found = [tag.upper() for tag in _CASHTAG_PATTERN.findall(text)] + _known_tickers(text)
+    return list(dict.fromkeys(found))
+
+
+def financial_score(line: str) -> int:
+    """
+    Number of financial indicators in line.
+
+    Indicators are dollar amounts, cashtags, two-decimal numbers, share counts,
+    million/billion, trading and market terms (one precompiled alternation), plus upper-case ticker symbols found in KNOWN_SYMBOLS
+    (case-sensitive, ambiguous words excluded).
+    """
+    return len(_INDICATOR_PATTERN.findall(line.lower())) + len(_known_tickers(line))
+
+
+def has_financial_indicator(line: str) -> bool:
+    """True if line contains at least one indicator counted by financial_score."""
+    return _INDICATOR_PATTERN.search(line.lower()) is not None or bool(_known_tickers(line))
+
+
+def is_financial_line(line: str, min_length: int = MIN_LINE_LENGTH) -> bool:
+    """Keep substantial lines and short lines that carry any financial indicator."""
+    line = line.strip()
+    return len(line) > min_length or has_financial_indicator(line)
+
+
+def filter_financial_lines(lines: Iterable[str], min_length: int = MIN_LINE_LENGTH) -> List[str]:
+    """Lines worth keeping; blank lines are preserved as block separators."""
+    return [line for line in lines if not line.strip() or is_financial_line(line, min_length)]
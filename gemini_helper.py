@@ -1,10 +1,34 @@
 import google.generativeai as genai
-from typing import List, Dict, Union
+from typing import Iterable, Iterator, List, Dict, Union
 import base64
 from PIL import Image
 import io
+import re
+from itertools import chain
 import json
 from config import GEMINI_API_KEY
+from chunking import pack_chunks
+from markdown_tables import TableMerger, iter_lines
+from llm_cache import get_llm_cache
+from financial_text import find_tickers
+
+# Token budget for the content sent in one request (about 30,000 characters)
+CONTEXT_TOKEN_BUDGET = 7500
+
+GEMINI_MODEL_NAME = 'gemini-1.5-flash'
+
+# Keywords for the rule-based intent classifier; a query matching exactly one type skips the model
+ANALYSIS_TYPE_PATTERNS = {
+    'price': re.compile(r"\b(price[sd]?|pricing|quote[sd]?|clos(?:e|ed|ing)|open(?:ed|ing)?|high|low|"
+                        r"trading at|share price|valuation|ohlc|candles?)\b"),
+    'volume': re.compile(r"\b(volumes?|shares traded|turnover|liquidity)\b"),
+    'news': re.compile(r"\b(news|headlines?|articles?|announce(?:d|ment|ments)?|press release|reported|reports?)\b"),
+}
+TIME_PERIOD_PATTERN = re.compile(
+    r"\b(today|yesterday|this (?:week|month|quarter|year)|ytd|year to date|"
+    r"(?:last|past|previous|next) (?:\d+ )?(?:days?|weeks?|months?|quarters?|years?)|"
+    r"q[1-4](?: \d{4})?|(?:since|in|during) (?:\w+ )?\d{4}|\d{4}-\d{2}-\d{2})\b"
+)
 
 # Configure the Gemini API
 genai.configure(api_key=GEMINI_API_KEY)
@@ -15,7 +39,7 @@ def preprocess_query(query: str) -> str:
     """
     try:
         # Initialize model for preprocessing
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        model = genai.GenerativeModel(GEMINI_MODEL_NAME)
         
         preprocess_prompt = """
         You are an expert in financial analysis query processing. Your job is to:
@@ -41,98 +65,98 @@ def preprocess_query(query: str) -> str:
         USER QUERY: {query}
         """
         
-        response = model.generate_content(preprocess_prompt.format(query=query))
-        result = json.loads(response.text)
+        # replace() rather than format(): the JSON example above contains literal braces
+        full_prompt = preprocess_prompt.replace("{query}", query)
+        text = get_llm_cache().cached(
+            GEMINI_MODEL_NAME, full_prompt, lambda: model.generate_content(full_prompt).text
+        )
+        result = json.loads(text.strip().removeprefix("```json").removeprefix("```").removesuffix("```"))
         return result
         
     except Exception as e:
         print(f"Preprocessing error: {str(e)}")
         return {"processed_query": query, "analysis_type": "general", "entities": [], "time_period": None}
 
-def get_gemini_response(chunks: List[str], prompt: str, response_format: str = "text") -> Union[str, Dict]:
+def classify_query_rules(query: str) -> Union[Dict, None]:
+    """
+    Local fast path for preprocess_query: keyword and ticker rules.
+    Returns the same structure as preprocess_query, or None when the intent is not obvious.
+    """
+    text = query.lower()
+    matched = [analysis_type for analysis_type, pattern in ANALYSIS_TYPE_PATTERNS.items() if pattern.search(text)]
+    if len(matched) != 1:
+        return None
+    time_period = TIME_PERIOD_PATTERN.search(text)
+    return {
+        "processed_query": query.strip(),
+        "analysis_type": matched[0],
+        "entities": find_tickers(query),
+        "time_period": time_period.group(0) if time_period else None,
+        "classifier": "rules"
+    }
+
+
+def classify_query(query: str) -> Dict:
+    """Classify the intent of a chat query once: the rule-based fast path, else the model."""
+    processed = classify_query_rules(query)
+    if processed is None:
+        processed = preprocess_query(query)
+        processed.setdefault("classifier", "model")
+    # The model may leave out fields that the prompts rely on
+    processed.setdefault("processed_query", query)
+    processed.setdefault("analysis_type", "general")
+    processed["entities"] = processed.get("entities") or []
+    processed.setdefault("time_period", None)
+    return processed
+
+
+def get_gemini_response(chunks: List[str], prompt: str, response_format: str = "text",
+                        near_duplicate: bool = False, processed: Dict = None) -> Union[str, Dict]:
     """
     Enhanced Gemini response function with more detailed prompts.
+    Whole chunks are packed into CONTEXT_TOKEN_BUDGET-sized contexts; content that needs
+    more than one context is analyzed part by part and the results are combined.
+    Text and table answers are served from the LLM cache when the same prompt was sent
+    before; with near_duplicate=True so is a question over the same content that only
+    differs in case, punctuation, filler words or word order (see LLMCache).
+    Pass processed (from classify_query) when the query has already been classified.
     """
     try:
-        # Preprocess the query
-        processed = preprocess_query(prompt)
+        # Preprocess the query unless the caller already did
+        if processed is None:
+            processed = preprocess_query(prompt)
         
         # Initialize model
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+        cache = get_llm_cache()
         
-        # Combine chunks with reasonable length limit
-        context = "\n\n".join(chunks)[:30000]
+        def generate(full_prompt, context=None):
+            near_key = _near_key(near_duplicate, response_format, context, prompt)
+            return cache.cached(
+                GEMINI_MODEL_NAME, full_prompt, lambda: model.generate_content(full_prompt).text, near_key=near_key
+            )
         
-        # Enhanced format-specific prompts
-        if response_format == "table":
-            full_prompt = f"""
-            You are a financial analysis expert. Analyze the following content and question:
-            
-            Context: {context}
-            
-            Query: {processed['processed_query']}
-            Analysis Type: {processed['analysis_type']}
-            Entities: {', '.join(processed['entities']) if processed['entities'] else 'None specified'}
-            Time Period: {processed['time_period'] if processed['time_period'] else 'Not specified'}
-            
-            Instructions:
-            1. Extract all relevant trading activities and financial data
-            2. Format the response as a markdown table with these columns:
-               - Date/Time
-               - Trader/Entity
-               - Action (Buy/Sell)
-               - Stock/Asset
-               - Price
-               - Quantity (if available)
-               - Reason/Notes
-            3. Include a summary row if multiple trades are found
-            4. Sort by date/time if available
-            
-            Use | for columns and include a header row.
-            """
-        elif response_format == "image":
-            full_prompt = f"""
-            Context: {context}
-            
-            Create a visual representation of the financial data:
-            Query: {processed['processed_query']}
-            Type: {processed['analysis_type']}
-            
-            Generate a detailed description for a chart or visualization that shows:
-            1. Key trends and patterns
-            2. Price movements or volume changes
-            3. Important events or milestones
-            4. Color scheme: Use green for positive, red for negative changes
-            
-            Include specific details about style, layout, and data representation.
-            """
-        else:
-            full_prompt = f"""
-            You are a financial analysis expert. Analyze this content:
-            
-            Context: {context}
-            
-            Query: {processed['processed_query']}
-            Analysis Type: {processed['analysis_type']}
-            Entities: {', '.join(processed['entities']) if processed['entities'] else 'None specified'}
-            
-            Provide a detailed analysis that includes:
-            1. Key findings and insights
-            2. Relevant trading activities
-            3. Market impact and implications
-            4. Supporting data points
-            5. Any caveats or limitations
-            
-            Format the response clearly with sections and bullet points where appropriate.
-            """
+        # Pack whole chunks into as few contexts as the token budget allows
+        if isinstance(chunks, str):
+            chunks = [chunks]
+        contexts = pack_chunks(chunks, CONTEXT_TOKEN_BUDGET) or [""]
+        
+        if len(contexts) > 1 and response_format != "image":
+            # Content larger than one context: analyze every part, then combine
+            partials = [generate(_build_prompt(context, processed, response_format), context) for context in contexts]
+            if response_format == "table":
+                return merge_markdown_tables(partials)
+            return generate(_build_combine_prompt(partials, processed))
         
-        # Generate response
-        response = model.generate_content(full_prompt)
+        if response_format != "image":
+            return generate(_build_prompt(contexts[0], processed, response_format), contexts[0])
+        
+        response = model.generate_content(_build_prompt(contexts[0], processed, response_format))
         
         if response_format == "image":
             # For image generation, we need to parse the response and generate the image
             image_prompt = response.text
-            image_model = genai.GenerativeModel('gemini-1.5-flash')
+            image_model = genai.GenerativeModel(GEMINI_MODEL_NAME)
             image_response = image_model.generate_content([
                 "Generate an image based on this description: " + image_prompt
             ])
@@ -157,41 +181,221 @@ def get_gemini_response(chunks: List[str], prompt: str, response_format: str = "
     except Exception as e:
         return f"Error generating response: {str(e)}"
 
+
+def stream_gemini_response(chunks: List[str], prompt: str, response_format: str = "text",
+                           near_duplicate: bool = False, processed: Dict = None) -> Iterator[str]:
+    """
+    Streaming variant of get_gemini_response for text and table answers (stream=True).
+    Yields the answer as Gemini generates it. Multi-part table answers are merged row by
+    row as rows complete; multi-part text answers stream the combined analysis.
+    """
+    try:
+        if processed is None:
+            processed = preprocess_query(prompt)
+        model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+        
+        if isinstance(chunks, str):
+            chunks = [chunks]
+        contexts = pack_chunks(chunks, CONTEXT_TOKEN_BUDGET) or [""]
+        
+        def stream(context):
+            return _stream_text(model, _build_prompt(context, processed, response_format),
+                                _near_key(near_duplicate, response_format, context, prompt))
+        
+        if len(contexts) == 1:
+            yield from stream(contexts[0])
+        elif response_format == "table":
+            yield from _stream_merged_tables(stream(context) for context in contexts)
+        else:
+            partials = ["".join(stream(context)) for context in contexts]
+            yield from _stream_text(model, _build_combine_prompt(partials, processed))
+    
+    except Exception as e:
+        yield f"Error generating response: {str(e)}"
+
+
+def _near_key(near_duplicate: bool, response_format: str, context: Union[str, None], prompt: str):
+    """LLM cache near-duplicate key: the same content and format, a similar question."""
+    if not near_duplicate or context is None:
+        return None
+    return (f"{response_format}\n{context}", prompt)
+
+
+def _stream_text(model, full_prompt: str, near_key=None) -> Iterator[str]:
+    """Yield the response to full_prompt as it is generated, or all at once from the LLM cache."""
+    cache = get_llm_cache()
+    cached = cache.get(GEMINI_MODEL_NAME, full_prompt, near_key=near_key)
+    if cached is not None:
+        yield cached
+        return
+    parts = []
+    for chunk in model.generate_content(full_prompt, stream=True):
+        if chunk.text:
+            parts.append(chunk.text)
+            yield chunk.text
+    cache.put(GEMINI_MODEL_NAME, full_prompt, "".join(parts), near_key=near_key)
+
+
+def _stream_merged_tables(streams: Iterable[Iterator[str]]) -> Iterator[str]:
+    """Merge the tables of several streamed responses, yielding each new row once it is complete."""
+    merger = TableMerger()
+    responses = []
+    for stream in streams:
+        lines = []
+        for line in iter_lines(stream):
+            lines.append(line)
+            rows = merger.add_line(line)
+            if rows and len(merger) == len(rows):
+                yield merger.render_header()
+            for row in rows:
+                yield "\n" + merger.render_row(row)
+        merger.add_line("")
+        responses.append("\n".join(lines))
+    if not len(merger):
+        # Same fallback as merge_markdown_tables when no response contained a table row
+        yield "\n\n".join(responses)
+
+
+def _build_prompt(context: str, processed: Dict, response_format: str) -> str:
+    """Format-specific analysis prompt for one context."""
+    # Enhanced format-specific prompts
+    if response_format == "table":
+        full_prompt = f"""
+        You are a financial analysis expert. Analyze the following content and question:
+        
+        Context: {context}
+        
+        Query: {processed['processed_query']}
+        Analysis Type: {processed['analysis_type']}
+        Entities: {', '.join(processed['entities']) if processed['entities'] else 'None specified'}
+        Time Period: {processed['time_period'] if processed['time_period'] else 'Not specified'}
+        
+        Instructions:
+        1. Extract all relevant trading activities and financial data
+        2. Format the response as a markdown table with these columns:
+           - Date/Time
+           - Trader/Entity
+           - Action (Buy/Sell)
+           - Stock/Asset
+           - Price
+           - Quantity (if available)
+           - Reason/Notes
+        3. Include a summary row if multiple trades are found
+        4. Sort by date/time if available
+        
+        Use | for columns and include a header row.
+        """
+    elif response_format == "image":
+        full_prompt = f"""
+        Context: {context}
+        
+        Create a visual representation of the financial data:
+        Query: {processed['processed_query']}
+        Type: {processed['analysis_type']}
+        
+        Generate a detailed description for a chart or visualization that shows:
+        1. Key trends and patterns
+        2. Price movements or volume changes
+        3. Important events or milestones
+        4. Color scheme: Use green for positive, red for negative changes
+        
+        Include specific details about style, layout, and data representation.
+        """
+    else:
+        full_prompt = f"""
+        You are a financial analysis expert. Analyze this content:
+        
+        Context: {context}
+        
+        Query: {processed['processed_query']}
+        Analysis Type: {processed['analysis_type']}
+        Entities: {', '.join(processed['entities']) if processed['entities'] else 'None specified'}
+        
+        Provide a detailed analysis that includes:
+        1. Key findings and insights
+        2. Relevant trading activities
+        3. Market impact and implications
+        4. Supporting data points
+        5. Any caveats or limitations
+        
+        Format the response clearly with sections and bullet points where appropriate.
+        """
+    return full_prompt
+
+
+def _build_combine_prompt(partials: List[str], processed: Dict) -> str:
+    """Prompt that merges analyses of consecutive parts of the content into one answer."""
+    parts = "\n\n".join(f"Part {i}:\n{text}" for i, text in enumerate(partials, 1))
+    return f"""
+    You are a financial analysis expert. The content was too long to analyze at once, so each
+    part was analyzed separately. Combine these partial analyses into a single answer.
+    
+    Query: {processed['processed_query']}
+    
+    {parts}
+    
+    Merge overlapping findings, keep every distinct data point, and format the response
+    clearly with sections and bullet points where appropriate.
+    """
+
+
+def merge_markdown_tables(responses: List[str]) -> str:
+    """Combine markdown tables from several responses into one, dropping duplicate rows."""
+    merger = TableMerger()
+    for response in responses:
+        merger.add(response)
+    return merger.render() or "\n\n".join(responses)
+
+
 def format_table_response(text: str) -> str:
     """
     Ensures table response is properly formatted in Markdown with consistent spacing.
     """
     if not text:
         return "No trading activities found in the content."
-        
+    return "".join(iter_format_table_response([text]))
+
+
+def iter_format_table_response(pieces: Iterable[str]) -> Iterator[str]:
+    """
+    Incremental format_table_response for a streamed answer: each line is formatted
+    and yielded as soon as it is complete, so table rows appear one by one.
+    """
+    lines = iter_lines(pieces)
+    first_line = next(lines, None)
+    if first_line is None:
+        yield "No trading activities found in the content."
+        return
+    
     # Add title if not present
-    if not text.startswith("#"):
-        text = "### Stock Trading Activities\n\n" + text
-        
+    head = [first_line] if first_line.startswith("#") else ["### Stock Trading Activities", "", first_line]
+    lines = chain(head, lines)
+    
     # Clean up the table formatting
-    lines = text.split('\n')
-    table_lines = []
+    emitted = 0
     in_table = False
     
+    def emit(line):
+        nonlocal emitted
+        emitted += 1
+        return line if emitted == 1 else "\n" + line
+    
     for line in lines:
         if '|' in line:
             if not in_table:
                 in_table = True
             # Clean up cell spacing
             cells = [cell.strip() for cell in line.split('|')]
-            table_lines.append('| ' + ' | '.join(cells[1:-1]) + ' |')
+            yield emit('| ' + ' | '.join(cells[1:-1]) + ' |')
             
             # Add separator line if it's the header
-            if len(table_lines) == 1:
-                separator = '|' + '|'.join(['-' * (len(cell) + 2) for cell in cells[1:-1]]) + '|'
-                table_lines.append(separator)
+            if emitted == 1:
+                yield emit('|' + '|'.join(['-' * (len(cell) + 2) for cell in cells[1:-1]]) + '|')
         else:
             if in_table:
-                table_lines.append('')  # Add spacing after table
+                yield emit('')  # Add spacing after table
                 in_table = False
-            table_lines.append(line)
-            
-    return '\n'.join(table_lines)
+            yield emit(line)
 
 
 def process_image_response(response: Dict) -> str:
@@ -0,0 +1,77 @@
+import importlib.util
+from bs4 import BeautifulSoup
+
+# BeautifulSoup tree builders in order of preference; html.parser ships with Python
+PARSER_PREFERENCE = ['lxml', 'html.parser']
+
+# Module that has to be importable for each builder
+_PARSER_MODULES = {
+    'lxml': 'lxml',
+    'html5lib': 'html5lib',
+    'html.parser': None,
+}
+
+
+def available_parsers():
+    """Tree builders that can be used in this environment, fastest first."""
+    return [
+        name for name in PARSER_PREFERENCE + ['html5lib']
+        if _PARSER_MODULES[name] is None or importlib.util.find_spec(_PARSER_MODULES[name]) is not None
+    ]
+
+
+# Resolved once at import so call sites don't pay for the check
+DEFAULT_PARSER = available_parsers()[0]
+
+
+def make_soup(markup, parser=None):
+    """Parse HTML with the fastest available backend (lxml when installed, else html.parser)."""
+    return BeautifulSoup(markup, parser or DEFAULT_PARSER)
+
+
+def remove_elements(soup, tags):
+    """Drop every element with one of the given tag names, in place."""
+    for element in soup(tags):
+        element.decompose()
+    return soup
+
+
+def select_first(soup, selectors):
+    """Return the first element matched by any of the CSS selectors, tried in order."""
+    if isinstance(selectors, str):
+        selectors = [selectors]
+    for selector in selectors:
+        element = soup.select_one(selector)
+        if element is not None:
+            return element
+    return None
+
+
+def element_text(element, separator=' ', strip=True):
+    """Text content of an element, or an empty string for None."""
+    if element is None:
+        return ''
+    return element.get_text(separator=separator, strip=strip)
+
+
+def paragraph_text(element, separator=' '):
+    """Join the text of every <p> inside element."""
+    if element is None:
+        return ''
+    return separator.join(p.get_text() for p in element.find_all('p'))
+
+
+def select_text(soup, selector, separator=' '):
+    """Join the text of every element matched by a CSS selector."""
+    return separator.join(element_text(element) for element in soup.select(selector))
+
+
+def body_text(markup, separator='\n'):
+    """Visible text of the <body>, one text node per line; returns markup unchanged if it has no body."""
+    # Plain text never gets parsed (lxml would otherwise wrap it in a synthetic body)
+    if '<body' not in markup[:200000].lower():
+        return markup
+    soup = make_soup(markup)
+    if soup.body:
+        return soup.body.get_text(separator=separator, strip=True)
+    return markup
@@ -0,0 +1,212 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from retrieval import tokenize
+
+LLM_CACHE_PATH = os.path.join('data', 'llm_cache.sqlite')
+LLM_CACHE_MAX_BYTES = 100 * 1024 * 1024
+LLM_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Questions whose 64-bit simhashes differ in at most this many bits count as near duplicates
+NEAR_DUPLICATE_MAX_DISTANCE = 3
+
+_WORD = re.compile(r"\w+")
+_POSSESSIVE = re.compile(r"['\u2019]s\b")
+
+
+def simhash(text, shingle_size=3):
+    """64-bit simhash of the word shingles in text, as a signed integer for SQLite."""
+    words = _WORD.findall(text.lower())
+    shingles = [' '.join(words[i:i + shingle_size]) for i in range(max(len(words) - shingle_size + 1, 1))]
+    weights = [0] * 64
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    value = sum(1 << bit for bit in range(64) if weights[bit] > 0)
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def normalize_question(text):
+    """
+    Wording-insensitive form of a question: its content words (stop words dropped, simple
+    plurals folded), de-duplicated and sorted, so case, punctuation, filler words and word
+    order do not matter.
+    """
+    words = {word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+             for word in tokenize(_POSSESSIVE.sub('', text))}
+    return ' '.join(sorted(words))
+
+
+def _bands(signed_hash):
+    """Four 16-bit bands; any two hashes within 3 bits share at least one band."""
+    value = signed_hash & ((1 << 64) - 1)
+    return [(value >> (16 * i)) & 0xFFFF for i in range(4)]
+
+
+class LLMCache:
+    """
+    Persistent cache of LLM responses keyed by sha256 of (model, generation config, prompt).
+
+    Entries expire after a TTL and the total size is kept under max_bytes by evicting
+    the least recently used entries.
+
+    Callers can also pass near_key=(anchor, text): on an exact miss, the closest entry
+    with the same model, config and anchor (e.g. the scraped context) whose text
+    (e.g. the user's question) has a simhash within NEAR_DUPLICATE_MAX_DISTANCE bits
+    is returned. The simhash is taken over normalize_question(text), so this is a
+    "same wording" cache: it catches a re-asked question that differs in case,
+    punctuation, filler words, word order or plurals, but not a question that swaps
+    a content word (those differ in well over 3 bits).
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_BYTES, ttl=LLM_CACHE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                scope TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                simhash INTEGER NOT NULL,
+                band0 INTEGER NOT NULL,
+                band1 INTEGER NOT NULL,
+                band2 INTEGER NOT NULL,
+                band3 INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_completions_accessed ON completions (accessed_at);
+            CREATE INDEX IF NOT EXISTS idx_completions_band0 ON completions (scope, band0);
+            CREATE INDEX IF NOT EXISTS idx_completions_band1 ON completions (scope, band1);
+            CREATE INDEX IF NOT EXISTS idx_completions_band2 ON completions (scope, band2);
+            CREATE INDEX IF NOT EXISTS idx_completions_band3 ON completions (scope, band3);
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def _scope(model, config, anchor=''):
+        canonical = json.dumps(config, sort_keys=True, separators=(',', ':'), default=str) if config else ''
+        return hashlib.sha256(f"{model}\n{canonical}\n{anchor}".encode('utf-8')).hexdigest()
+
+    @classmethod
+    def make_key(cls, model, prompt, config=None):
+        return hashlib.sha256(f"{cls._scope(model, config)}\n{prompt}".encode('utf-8')).hexdigest()
+
+    def get(self, model, prompt, config=None, near_key=None):
+        """Cached response for the prompt, or None."""
+        key = self.make_key(model, prompt, config)
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT key, response FROM completions WHERE key = ? AND stored_at >= ?", (key, cutoff)
+            ).fetchone()
+            if row is None and near_key is not None:
+                anchor, text = near_key
+                row = self._nearest(self._scope(model, config, anchor), simhash(normalize_question(text), 1), cutoff)
+                if row is not None:
+                    self.near_hits += 1
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (time.time(), row[0]))
+            self._conn.commit()
+        return row[1]
+
+    def _nearest(self, scope, prompt_hash, cutoff):
+        bands = _bands(prompt_hash)
+        candidates = self._conn.execute(
+            "SELECT key, response, simhash FROM completions WHERE scope = ? AND stored_at >= ? "
+            "AND (band0 = ? OR band1 = ? OR band2 = ? OR band3 = ?)",
+            (scope, cutoff, *bands)
+        ).fetchall()
+        best, best_distance = None, NEAR_DUPLICATE_MAX_DISTANCE + 1
+        for key, response, candidate_hash in candidates:
+            distance = bin((candidate_hash ^ prompt_hash) & ((1 << 64) - 1)).count('1')
+            if distance < best_distance:
+                best, best_distance = (key, response), distance
+        return best
+
+    def put(self, model, prompt, response, config=None, near_key=None):
+        if not isinstance(response, str) or not response:
+            return
+        key = self.make_key(model, prompt, config)
+        if near_key is not None:
+            anchor, text = near_key
+            prompt_hash = simhash(normalize_question(text), 1)
+        else:
+            anchor, prompt_hash = '', simhash(prompt)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions "
+                "(key, scope, response, size, simhash, band0, band1, band2, band3, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, self._scope(model, config, anchor), response, len(response.encode('utf-8')),
+                 prompt_hash, *_bands(prompt_hash), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def cached(self, model, prompt, generate, config=None, near_key=None):
+        """Return the cached response for prompt, or call generate() and cache its result."""
+        response = self.get(model, prompt, config, near_key)
+        if response is None:
+            response = generate()
+            self.put(model, prompt, response, config, near_key)
+        return response
+
+    def _evict(self):
+        self._conn.execute("DELETE FROM completions WHERE stored_at < ?", (time.time() - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM completions ORDER BY accessed_at").fetchall():
+            self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions"
+            ).fetchone()
+        return {
+            'hits': self.hits,
+            'near_hits': self.near_hits,
+            'misses': self.misses,
+            'entries': entries,
+            'bytes': size,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM completions")
+            self._conn.commit()
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Return the process-wide shared LLMCache."""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache()
+    return _llm_cache
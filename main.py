@@ -1,21 +1,29 @@
 import streamlit as st
 from scrape import (
     scrape_website, 
+    crawl_website,
     split_dom_content, 
     clean_body_content, 
     extract_body_content,
 )
-from gemini_helper import get_gemini_response, format_table_response, process_image_response, preprocess_query
-from parse import scrape_x, scrape_instagram, scrape_government
+from gemini_helper import (
+    get_gemini_response, stream_gemini_response, format_table_response, iter_format_table_response,
+    process_image_response, classify_query
+)
+from parse import scrape_x, scrape_instagram, scrape_government, iter_parse_with_ollama
 from datetime import datetime, timedelta
 import os
 import pandas as pd
 from main_collector import collect_politician_trades
 from politician_trades import PoliticianTradesApp
 from config import GEMINI_API_KEY
-from tiingo_helper import fetch_stock_news, search_tickers, get_news_statistics, save_news_data, fetch_politician_trading_news
+from tiingo_helper import (
+    fetch_stock_news, search_tickers, get_news_statistics, fetch_politician_trading_news,
+    ingest_stock_news, store_news_articles
+)
 import requests
 from Federal_Contracts import render_federal_contracts_tab
+from retrieval import BM25Index
 
 # Set page config
 st.set_page_config(
@@ -289,6 +297,33 @@ st.markdown("""
 # Main title with custom styling
 st.markdown("<h1 class='main-title'>AI Web Scraper & Analyzer</h1>", unsafe_allow_html=True)
 
+def add_scraped_content(source, content):
+    """Store a scrape for the session and index it for chat retrieval."""
+    if 'all_scraped_data' not in st.session_state:
+        st.session_state.all_scraped_data = []
+    if 'retrieval_index' not in st.session_state:
+        st.session_state.retrieval_index = BM25Index()
+        # Index anything scraped before the index existed
+        for item in st.session_state.all_scraped_data:
+            st.session_state.retrieval_index.add_document(item['source'], item['content'])
+    st.session_state.all_scraped_data.append({
+        "source": source,
+        "content": content,
+        "timestamp": datetime.now().isoformat()
+    })
+    st.session_state.retrieval_index.add_document(source, content)
+
+def news_progress(container):
+    """on_article callback that lists articles in container as their full content arrives."""
+    progress = container.progress(0.0)
+    def on_article(article, completed, total):
+        progress.progress(completed / total, text=f"Fetched {completed} of {total} articles")
+        container.markdown(
+            f"📰 **{article.get('title') or 'Untitled Article'}** — {article.get('source', 'Unknown Source')} "
+            f"({article.get('full_content_length', 0):,} characters)"
+        )
+    return on_article
+
 # Create tabs for different scraping methods
 tab1, tab2, tab3, tab4, tab5 = st.tabs([
     "🌐 Web Scraping", 
@@ -311,18 +346,8 @@ with tab1:
             body_content = extract_body_content(result)
             clean_content = clean_body_content(body_content)
             
-            # Initialize storage if not exists
-            if 'all_scraped_data' not in st.session_state:
-                st.session_state.all_scraped_data = []
-                st.session_state.dom_content = ""
-            
-            # Append new data and update combined content
-            st.session_state.all_scraped_data.append({
-                "source": url,
-                "content": clean_content,
-                "timestamp": datetime.now().isoformat()
-            })
-            st.session_state.dom_content = "\n\n".join([item['content'] for item in st.session_state.all_scraped_data])
+            # Store and index the new content
+            add_scraped_content(url, clean_content)
             st.success("✅ Successfully scraped website!")
             # Automatically analyze stock trading information
             with st.spinner("Analyzing trading information..."):
@@ -339,24 +364,54 @@ with tab1:
                     })
                     st.rerun()
 
+        with st.expander("🕸️ Crawl Mode"):
+            seed_text = st.text_area(
+                "Seed URLs (one per line):",
+                placeholder="https://example.com/markets\nhttps://example.com/news",
+                key="crawl_seeds"
+            )
+            crawl_col1, crawl_col2 = st.columns(2)
+            with crawl_col1:
+                crawl_depth = st.slider("Link depth", 0, 5, 1, key="crawl_depth")
+                crawl_max_pages = st.number_input("Max pages", 1, 2000, 50, step=10, key="crawl_max_pages")
+            with crawl_col2:
+                crawl_per_host = st.slider("Concurrent requests per host", 1, 16, 4, key="crawl_per_host")
+                crawl_sitemap = st.checkbox("Include sitemap URLs", value=False, key="crawl_sitemap")
+
+            if st.button("🕸️ Crawl Site", key="crawl_site"):
+                seeds = [line.strip() for line in seed_text.splitlines() if line.strip()]
+                if not seeds:
+                    st.error("Please enter at least one seed URL")
+                else:
+                    progress = st.progress(0.0)
+                    status = st.empty()
+                    crawled, failed = 0, 0
+                    # Pages stream in as they are fetched
+                    for page in crawl_website(
+                        seeds,
+                        max_depth=crawl_depth,
+                        max_pages=int(crawl_max_pages),
+                        per_host_limit=crawl_per_host,
+                        use_sitemap=crawl_sitemap
+                    ):
+                        if page['error'] or not page['content']:
+                            failed += 1
+                        else:
+                            crawled += 1
+                            add_scraped_content(page['url'], clean_body_content(page['content']))
+                        progress.progress(min((crawled + failed) / crawl_max_pages, 1.0))
+                        status.write(f"Crawled {crawled} pages ({failed} skipped) — latest: {page['url']}")
+
+                    st.success(f"✅ Crawled {crawled} pages!")
+
     with col2:
         st.markdown("<h3 class='section-title'>Quick Scrape</h3>", unsafe_allow_html=True)
         if st.button("🐦 X (Twitter)", key="scrape_x", help="Scrape from X/Twitter"):
             with st.spinner("Scraping X..."):
                 result = scrape_x()
                 if result:
-                    # Initialize storage if not exists
-                    if 'all_scraped_data' not in st.session_state:
-                        st.session_state.all_scraped_data = []
-                        st.session_state.dom_content = ""
-                    
-                    # Append new data and update combined content
-                    st.session_state.all_scraped_data.append({
-                        "source": "X (Twitter)",
-                        "content": result,
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    st.session_state.dom_content = "\n\n".join([item['content'] for item in st.session_state.all_scraped_data])
+                    # Store and index the new content
+                    add_scraped_content("X (Twitter)", result)
                     st.success("✅ Successfully scraped X!")
                     
                     # Automatically analyze stock trading information
@@ -391,13 +446,7 @@ with tab1:
                 result = scrape_instagram()
                 if result:
                     cleaned_content = clean_body_content(extract_body_content(result))
-                    # Append to storage
-                    st.session_state.all_scraped_data.append({
-                        "source": "Instagram",
-                        "content": cleaned_content,
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    st.session_state.dom_content = "\n\n".join([item['content'] for item in st.session_state.all_scraped_data])
+                    add_scraped_content("Instagram", cleaned_content)
                     st.success("✅ Successfully scraped Instagram!")
                     
                     # Automatically analyze stock trading information
@@ -430,13 +479,7 @@ with tab1:
                 result = scrape_government()
                 if result:
                     cleaned_content = clean_body_content(extract_body_content(result))
-                    # Append to storage
-                    st.session_state.all_scraped_data.append({
-                        "source": "Government",
-                        "content": cleaned_content,
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    st.session_state.dom_content = "\n\n".join([item['content'] for item in st.session_state.all_scraped_data])
+                    add_scraped_content("Government", cleaned_content)
                     st.success("✅ Successfully scraped Government site!")
                     
                     # Automatically analyze stock trading information
@@ -473,6 +516,33 @@ with tab2:
             for idx, data in enumerate(st.session_state.all_scraped_data, 1):
                 st.markdown(f"**Scrape #{idx} ({data['source']}) - {data['timestamp']}**")
                 st.text_area(f"Content #{idx}", data['content'], height=200, key=f"scraped_{idx}")
+        
+        # Map-reduce extraction over every chunk, with the merged trade table shown as chunks finish
+        with st.expander("🔎 Extract Trades From All Content", expanded=False):
+            parse_description = st.text_input(
+                "What should be extracted?",
+                value="List every trade with date, trader, action, stock, price and quantity",
+                key="parse_description"
+            )
+            if st.button("Extract", key="parse_all_content"):
+                index = st.session_state.get('retrieval_index')
+                dom_chunks = [chunk['text'] for chunk in index.chunks] if index is not None else []
+                progress = st.progress(0.0, text=f"Analyzing {len(dom_chunks)} chunks...")
+                live_table = st.empty()
+                table = ""
+                for result in iter_parse_with_ollama(dom_chunks, parse_description):
+                    progress.progress(result["completed"] / result["total"],
+                                      text=f"Analyzed {result['completed']} of {result['total']} chunks")
+                    if result["table"]:
+                        table = result["table"]
+                        live_table.markdown(table)
+                progress.empty()
+                if table:
+                    st.session_state.parsed_trades = table
+                else:
+                    live_table.info("No trading activity found in the scraped content")
+            elif st.session_state.get('parsed_trades'):
+                st.markdown(st.session_state.parsed_trades)
     
     # Initialize chat history if not present
     if "chat_history" not in st.session_state:
@@ -499,16 +569,18 @@ with tab2:
             st.session_state.chat_history.append({"role": "user", "content": prompt})
             
             with st.spinner("Processing..."):
-                # Preprocess the query
-                processed_query = preprocess_query(prompt)
-                
-                # Show processing details in debug mode
-                if st.session_state.get('debug_mode', False):
-                    st.write("Processed Query:", processed_query)
-                
-                context = st.session_state.get('dom_content', '')
-                if context:
-                    dom_chunks = split_dom_content(context)
+                index = st.session_state.get('retrieval_index')
+                if index is not None and len(index):
+                    # Classify the query once; obvious price/volume/news questions skip the model
+                    processed_query = classify_query(prompt)
+                    
+                    # Show processing details in debug mode
+                    if st.session_state.get('debug_mode', False):
+                        st.write("Processed Query:", processed_query)
+                    
+                    # Only the chunks most relevant to the question (and its tickers) are sent
+                    search_text = " ".join([prompt, processed_query['processed_query'], *processed_query['entities']])
+                    dom_chunks = index.top_chunks(search_text)
                     chat_context = "\n".join([
                         f"{msg['role']}: {msg['content']}" 
                         for msg in st.session_state.chat_history[-3:]
@@ -521,21 +593,35 @@ with tab2:
                     elif "visualize" in processed_query['processed_query'].lower():
                         response_format = "image"
                     
-                    # Get response using processed query
-                    response = get_gemini_response(
-                        dom_chunks,
-                        processed_query['processed_query'],
-                        response_format=response_format
-                    )
-                    
-                    # Format response based on type
-                    if isinstance(response, dict) and response.get('type') == 'image':
-                        formatted_response = process_image_response(response)
-                    elif response_format == "table":
-                        formatted_response = format_table_response(response)
+                    if response_format == "image":
+                        # Get response using the already classified query
+                        response = get_gemini_response(
+                            dom_chunks,
+                            prompt,
+                            response_format=response_format,
+                            processed=processed_query
+                        )
+                        if isinstance(response, dict) and response.get('type') == 'image':
+                            formatted_response = process_image_response(response)
+                        else:
+                            formatted_response = response
                     else:
-                        formatted_response = response
-                        
+                        # Stream text and table answers as they are generated; a re-asked
+                        # question with the same content words is answered from the LLM cache
+                        response = stream_gemini_response(
+                            dom_chunks,
+                            prompt,
+                            response_format=response_format,
+                            near_duplicate=True,
+                            processed=processed_query
+                        )
+                        if response_format == "table":
+                            response = iter_format_table_response(response)
+                        with st.chat_message("user"):
+                            st.markdown(prompt)
+                        with st.chat_message("assistant"):
+                            formatted_response = st.write_stream(response)
+
                     st.session_state.chat_history.append({
                         "role": "assistant", 
                         "content": formatted_response
@@ -743,11 +829,15 @@ with tab4:
         # Add fetch button
         if st.button("🔍 Fetch News", key="fetch_stock_news"):
             with st.spinner("Fetching latest stock market news..."):
+                # Articles are listed as their content is fetched, then replaced by the full view
+                live_news = st.empty()
                 news_articles = fetch_stock_news(
                     tickers=selected_ticker_symbols if 'selected_ticker_symbols' in locals() else None,
                     start_date=start_date,
-                    limit=article_limit
+                    limit=article_limit,
+                    on_article=news_progress(live_news.container())
                 )
+                live_news.empty()
                 
                 if news_articles:
                     st.session_state.stock_news = news_articles
@@ -755,6 +845,26 @@ with tab4:
                 else:
                     st.error("Unable to fetch news articles")
         
+        # Incremental polling: only articles published since the last ingest of this query
+        if st.button("⏩ Ingest New Articles", key="ingest_stock_news",
+                     help="Fetch only articles newer than the last ingest of these tickers into the news store"):
+            with st.spinner("Ingesting new articles..."):
+                live_news = st.empty()
+                new_articles = ingest_stock_news(
+                    tickers=selected_ticker_symbols if 'selected_ticker_symbols' in locals() else None,
+                    start_date=start_date,
+                    on_article=news_progress(live_news.container())
+                )
+                live_news.empty()
+                
+                if new_articles is None:
+                    st.error("Unable to fetch news articles")
+                elif new_articles:
+                    st.session_state.stock_news = new_articles
+                    st.success(f"✅ Stored {len(new_articles)} new articles in the news store!")
+                else:
+                    st.info("No new articles since the last ingest")
+        
         # Display stock market news
         if 'stock_news' in st.session_state and st.session_state.stock_news:
             for article in st.session_state.stock_news:
@@ -826,21 +936,24 @@ with tab4:
             # Add save data button
             if st.button("💾 Save News Data", key="save_stock_news"):
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f"data/stock_news_{timestamp}.csv"
                 
-                saved_file = save_news_data(st.session_state.stock_news, filename)
-                if saved_file:
-                    st.success(f"✅ Successfully saved news data to {saved_file}")
-                    
-                    # Add download button
-                    df = pd.DataFrame(st.session_state.stock_news)
-                    csv = df.to_csv(index=False)
-                    st.download_button(
-                        label="📥 Download News Data",
-                        data=csv,
-                        file_name=f"stock_news_{timestamp}.csv",
-                        mime="text/csv"
-                    )
+                # Articles are deduplicated by id into the news store
+                added = store_news_articles(st.session_state.stock_news)
+                if added:
+                    st.success(f"✅ Saved {added} new articles to the news store "
+                               f"({len(st.session_state.stock_news) - added} already stored)")
+                else:
+                    st.info("All of these articles are already in the news store")
+                
+                # Add download button
+                df = pd.DataFrame(st.session_state.stock_news)
+                csv = df.to_csv(index=False)
+                st.download_button(
+                    label="📥 Download News Data",
+                    data=csv,
+                    file_name=f"stock_news_{timestamp}.csv",
+                    mime="text/csv"
+                )
     
     with news_tab2:
         st.markdown("### Politician Trading News")
@@ -867,10 +980,13 @@ with tab4:
         
         if st.button("🔍 Fetch Trading News", key="fetch_politician_news"):
             with st.spinner("Fetching news about politician trading..."):
+                live_news = st.empty()
                 news_articles = fetch_politician_trading_news(
                     politician_name=politician_news_name,
-                    limit=news_limit
+                    limit=news_limit,
+                    on_article=news_progress(live_news.container())
                 )
+                live_news.empty()
                 
                 if news_articles:
                     st.session_state.politician_news = news_articles
@@ -916,21 +1032,24 @@ with tab4:
             # Add save data button for politician news
             if st.button("💾 Save News Data", key="save_politician_news"):
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f"data/politician_trading_news_{timestamp}.csv"
                 
-                saved_file = save_news_data(st.session_state.politician_news, filename)
-                if saved_file:
-                    st.success(f"✅ Successfully saved news data to {saved_file}")
-                    
-                    # Add download button
-                    df = pd.DataFrame(st.session_state.politician_news)
-                    csv = df.to_csv(index=False)
-                    st.download_button(
-                        label="📥 Download News Data",
-                        data=csv,
-                        file_name=f"politician_trading_news_{timestamp}.csv",
-                        mime="text/csv"
-                    )
+                # Articles are deduplicated by id into the news store
+                added = store_news_articles(st.session_state.politician_news)
+                if added:
+                    st.success(f"✅ Saved {added} new articles to the news store "
+                               f"({len(st.session_state.politician_news) - added} already stored)")
+                else:
+                    st.info("All of these articles are already in the news store")
+                
+                # Add download button
+                df = pd.DataFrame(st.session_state.politician_news)
+                csv = df.to_csv(index=False)
+                st.download_button(
+                    label="📥 Download News Data",
+                    data=csv,
+                    file_name=f"politician_trading_news_{timestamp}.csv",
+                    mime="text/csv"
+                )
 
 # Replace the entire USA Spending tab section with:
 with tab5:
@@ -0,0 +1,138 @@
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+_SEPARATOR_CELL = re.compile(r':?-{2,}:?')
+
+
+def _split_row(line: str) -> List[str]:
+    return [cell.strip() for cell in line.strip().strip('|').split('|')]
+
+
+def _is_separator(cells: List[str]) -> bool:
+    return all(_SEPARATOR_CELL.fullmatch(cell) for cell in cells if cell) and any(cells)
+
+
+def iter_lines(pieces: Iterable[str]) -> Iterator[str]:
+    """
+    Complete lines from a stream of text pieces, as text.split('\n') would return them
+    for the concatenated text. Nothing is yielded for an empty stream.
+    """
+    buffer, seen = '', False
+    for piece in pieces:
+        if not piece:
+            continue
+        seen = True
+        buffer += piece
+        *complete, buffer = buffer.split('\n')
+        yield from complete
+    if seen:
+        yield buffer
+
+
+def split_tables(text: str) -> Tuple[List[List[List[str]]], str]:
+    """
+    Separate markdown tables from the rest of a response.
+    Returns (tables, remaining_text) where each table is a list of rows of cells
+    with the separator row removed; the first row is the header.
+    """
+    tables, current, other = [], [], []
+    for line in text.split('\n'):
+        if line.strip().startswith('|'):
+            cells = _split_row(line)
+            if not _is_separator(cells):
+                current.append(cells)
+            continue
+        if current:
+            tables.append(current)
+            current = []
+        other.append(line)
+    if current:
+        tables.append(current)
+    return tables, re.sub(r'\n{3,}', '\n\n', '\n'.join(other)).strip()
+
+
+class TableMerger:
+    """
+    Incrementally merges markdown tables from many LLM responses into one table.
+
+    The first header seen defines the columns; tables with other headers are
+    mapped onto it by column name where possible. Rows are deduplicated
+    case-insensitively, ignoring whitespace.
+
+    Whole responses are merged with add(); streamed responses can be fed one line
+    at a time with add_line(), which returns the rows each line contributes.
+    """
+
+    def __init__(self):
+        self.header: Optional[List[str]] = None
+        self.rows: List[List[str]] = []
+        self._seen = set()
+        self._open_header: Optional[List[str]] = None
+
+    def add(self, text: str) -> str:
+        """Merge the tables in text and return the text that is not part of a table."""
+        tables, remaining = split_tables(text)
+        for table in tables:
+            self._add_rows(table[0], table[1:])
+        return remaining
+
+    def add_line(self, line: str) -> List[List[str]]:
+        """Merge one line of a streamed response and return the rows it added."""
+        if not line.strip().startswith('|'):
+            # Any other line ends the table being streamed
+            self._open_header = None
+            return []
+        cells = _split_row(line)
+        if _is_separator(cells):
+            return []
+        if self._open_header is None:
+            self._open_header = cells
+            return self._add_rows(cells, [])
+        return self._add_rows(self._open_header, [cells])
+
+    def _add_rows(self, header: List[str], rows: List[List[str]]) -> List[List[str]]:
+        if self.header is None:
+            self.header = header
+        index = self._column_index(header)
+        added = []
+        for cells in rows:
+            if [c.lower() for c in cells] == [h.lower() for h in header]:
+                continue
+            row = self._align(cells, index)
+            key = tuple(' '.join(cell.lower().split()) for cell in row)
+            if any(key) and key not in self._seen:
+                self._seen.add(key)
+                self.rows.append(row)
+                added.append(row)
+        return added
+
+    def _column_index(self, header: List[str]) -> Optional[List[int]]:
+        """Position of each of our columns in header, or None if the layouts already match."""
+        ours = [h.lower() for h in self.header]
+        theirs = [h.lower() for h in header]
+        if ours == theirs or not set(ours) & set(theirs):
+            return None
+        return [theirs.index(h) if h in theirs else -1 for h in ours]
+
+    def _align(self, cells: List[str], index: Optional[List[int]]) -> List[str]:
+        if index is not None:
+            cells = [cells[i] if 0 <= i < len(cells) else '' for i in index]
+        width = len(self.header)
+        return (cells + [''] * width)[:width]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def render_header(self) -> str:
+        """Header and separator lines of the merged table."""
+        return '| ' + ' | '.join(self.header) + ' |\n|' + '|'.join('---' for _ in self.header) + '|'
+
+    @staticmethod
+    def render_row(row: List[str]) -> str:
+        return '| ' + ' | '.join(row) + ' |'
+
+    def render(self) -> str:
+        """The merged table as markdown, or an empty string if no table was seen."""
+        if self.header is None:
+            return ''
+        return '\n'.join([self.render_header()] + [self.render_row(row) for row in self.rows])
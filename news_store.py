@@ -0,0 +1,259 @@
+import os
+import ast
+import glob
+import json
+import threading
+from datetime import datetime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+NEWS_STORE_DIR = os.path.join('data', 'news_store')
+
+# Column layout of every part file; list columns keep tickers and tags as real lists
+NEWS_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('title', pa.string()),
+    ('description', pa.string()),
+    ('full_content', pa.string()),
+    ('source', pa.string()),
+    ('url', pa.string()),
+    ('tickers', pa.list_(pa.string())),
+    ('tags', pa.list_(pa.string())),
+    ('published_date', pa.string()),
+    ('crawled_date', pa.string()),
+    ('published_at', pa.string()),
+    ('ticker_count', pa.int64()),
+    ('tag_count', pa.int64()),
+    ('title_length', pa.int64()),
+    ('description_length', pa.int64()),
+    ('full_content_length', pa.int64()),
+])
+
+
+def news_query_key(tickers=None, tags=None):
+    """Canonical name of a news query, used to keep one cursor per query."""
+    parts = []
+    if tickers:
+        parts.append('tickers=' + ','.join(sorted({t.strip().lower() for t in tickers if t})))
+    if tags:
+        parts.append('tags=' + ','.join(sorted({t.strip().lower() for t in tags if t})))
+    return '|'.join(parts) or 'all'
+
+
+def _as_list(value):
+    if isinstance(value, (list, tuple)):
+        return [str(v) for v in value]
+    if isinstance(value, str) and value.startswith('['):
+        try:
+            return [str(v) for v in ast.literal_eval(value)]
+        except (ValueError, SyntaxError):
+            return []
+    return []
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class NewsStore:
+    """
+    Append-only, deduplicated store of news articles.
+
+    Articles are written as Parquet part files under root and deduplicated by Tiingo id
+    (the ids already stored are read once from the id column and kept in memory). A
+    cursors file keeps each query's high-water mark, the newest (published_at, id) seen,
+    so polling only needs to fetch and enrich articles newer than it. A poll that stops
+    before reaching the mark leaves a resume point for the next one.
+    """
+
+    def __init__(self, root=NEWS_STORE_DIR):
+        self.root = root
+        self._parts_dir = os.path.join(root, 'parts')
+        self._cursors_file = os.path.join(root, 'cursors.json')
+        self._lock = threading.Lock()
+        self._ids = None
+        os.makedirs(self._parts_dir, exist_ok=True)
+        try:
+            with open(self._cursors_file, 'r') as f:
+                self._cursors = json.load(f)
+        except (OSError, ValueError):
+            self._cursors = {}
+
+    def _part_files(self):
+        return sorted(glob.glob(os.path.join(self._parts_dir, '*.parquet')))
+
+    def _known_ids(self):
+        """Ids already stored, loaded from the id column of every part (once per process)."""
+        if self._ids is None:
+            ids = set()
+            for path in self._part_files():
+                try:
+                    ids.update(pq.read_table(path, columns=['id']).column('id').to_pylist())
+                except Exception as e:
+                    print(f"Error reading news store part {path}: {e}")
+            self._ids = ids
+        return self._ids
+
+    def contains(self, article_id):
+        article_id = _as_int(article_id)
+        with self._lock:
+            return article_id is not None and article_id in self._known_ids()
+
+    def new_ids(self, article_ids):
+        """The ids in article_ids that are not stored yet."""
+        with self._lock:
+            known = self._known_ids()
+            return {i for i in map(_as_int, article_ids) if i is not None and i not in known}
+
+    def append(self, articles):
+        """Store the articles whose id is new; returns how many were written."""
+        rows = []
+        with self._lock:
+            known = self._known_ids()
+            for article in articles:
+                article_id = _as_int(article.get('id'))
+                if article_id is None or article_id in known:
+                    continue
+                known.add(article_id)
+                rows.append(self._row(article, article_id))
+            if not rows:
+                return 0
+            table = pa.Table.from_pylist(rows, schema=NEWS_SCHEMA)
+            name = f"part-{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{len(self._part_files()):05d}.parquet"
+            pq.write_table(table, os.path.join(self._parts_dir, name))
+        return len(rows)
+
+    @staticmethod
+    def _row(article, article_id):
+        row = {field.name: article.get(field.name) for field in NEWS_SCHEMA}
+        row['id'] = article_id
+        row['tickers'] = _as_list(article.get('tickers'))
+        row['tags'] = _as_list(article.get('tags'))
+        for name in ('title', 'description', 'full_content', 'source', 'url',
+                     'published_date', 'crawled_date', 'published_at'):
+            value = row[name]
+            row[name] = '' if value is None or (isinstance(value, float) and pd.isna(value)) else str(value)
+        row['published_at'] = row['published_at'] or row['published_date']
+        row['ticker_count'] = len(row['tickers'])
+        row['tag_count'] = len(row['tags'])
+        row['title_length'] = len(row['title'])
+        row['description_length'] = len(row['description'])
+        row['full_content_length'] = len(row['full_content'])
+        return row
+
+    def read(self, columns=None, tickers=None, since=None):
+        """
+        Stored articles as a DataFrame, newest first.
+        tickers keeps articles mentioning any of them; since is a YYYY-MM-DD lower bound.
+        """
+        parts = self._part_files()
+        if not parts:
+            return pd.DataFrame(columns=columns or NEWS_SCHEMA.names)
+        read_columns = None if columns is None else list(dict.fromkeys(list(columns) + ['tickers', 'published_at']))
+        df = pd.concat([pd.read_parquet(path, columns=read_columns) for path in parts], ignore_index=True)
+        if tickers:
+            wanted = {t.lower() for t in tickers}
+            df = df[df['tickers'].apply(lambda values: bool(wanted & {v.lower() for v in values}))]
+        if since:
+            df = df[df['published_at'].str[:10] >= since]
+        df = df.sort_values('published_at', ascending=False, ignore_index=True)
+        return df if columns is None else df[list(columns)]
+
+    def compact(self):
+        """Rewrite all parts as a single file (ids stay unique, so nothing is dropped)."""
+        with self._lock:
+            parts = self._part_files()
+            if len(parts) < 2:
+                return
+            table = pa.concat_tables([pq.read_table(path).cast(NEWS_SCHEMA) for path in parts])
+            target = os.path.join(self._parts_dir, f"part-{datetime.now().strftime('%Y%m%d%H%M%S%f')}-compact.parquet")
+            pq.write_table(table, target)
+            for path in parts:
+                os.remove(path)
+
+    def get_cursor(self, query_key):
+        """High-water mark of a query as {'published_at', 'id'}, or None if it was never ingested."""
+        cursor = self._cursors.get(query_key)
+        return cursor if cursor and cursor.get('published_at') else None
+
+    def set_cursor(self, query_key, published_at, article_id):
+        """Advance the query's high-water mark and drop its resume point; the mark never moves backwards."""
+        with self._lock:
+            current = self._cursors.get(query_key) or {}
+            if current.get('published_at') and (current['published_at'], current['id']) >= (published_at, article_id):
+                published_at, article_id = current['published_at'], current['id']
+            self._cursors[query_key] = {
+                'published_at': published_at,
+                'id': article_id,
+                'updated': datetime.now().isoformat()
+            }
+            self._save_cursors()
+
+    def get_resume(self, query_key):
+        """
+        Where a truncated pass over a query stopped, as {'offset', 'start_date', 'published_at', 'id'}
+        (the offset to continue from, the startDate the offsets were counted with and the
+        newest article that pass saw), or None.
+        """
+        return (self._cursors.get(query_key) or {}).get('resume')
+
+    def set_resume(self, query_key, offset, start_date, published_at, article_id):
+        """Record that a pass stopped before reaching the mark, so the next poll continues from offset."""
+        with self._lock:
+            cursor = self._cursors.setdefault(query_key, {'published_at': None, 'id': None})
+            cursor['resume'] = {
+                'offset': offset,
+                'start_date': start_date,
+                'published_at': published_at,
+                'id': article_id
+            }
+            cursor['updated'] = datetime.now().isoformat()
+            self._save_cursors()
+
+    def _save_cursors(self):
+        try:
+            tmp_path = f"{self._cursors_file}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self._cursors, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self._cursors_file)
+        except OSError as e:
+            print(f"Error saving news cursors: {e}")
+
+    def import_csv(self, paths):
+        """Load news CSVs written by the old save_news_data into the store; returns rows added."""
+        added = 0
+        for path in paths:
+            try:
+                df = pd.read_csv(path)
+            except Exception as e:
+                print(f"Error reading {path}: {e}")
+                continue
+            records = df.astype(object).where(df.notna(), None).to_dict('records')
+            added += self.append(records)
+        return added
+
+
+_news_store = None
+_news_store_lock = threading.Lock()
+
+
+def get_news_store():
+    """Return the process-wide shared NewsStore."""
+    global _news_store
+    with _news_store_lock:
+        if _news_store is None:
+            _news_store = NewsStore()
+    return _news_store
+
+
+if __name__ == '__main__':
+    # One-off migration of the timestamped CSVs written by earlier versions
+    store = get_news_store()
+    paths = sorted(glob.glob(os.path.join('data', '*news*.csv')))
+    added = store.import_csv(paths)
+    store.compact()
+    print(f"Imported {added} unique articles from {len(paths)} CSV files into {store.root}")
@@ -2,12 +2,19 @@ import os
 import time
 from langchain_openai import AzureChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
+from openai import RateLimitError
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from config import AZURE_API_KEY, AZURE_OPENAI_CONFIG, X_USERNAME, X_PASSWORD
+from markdown_tables import TableMerger
+from llm_cache import get_llm_cache
+
+# Chunks analyzed concurrently, and attempts per chunk when the API rate-limits us
+MAX_CONCURRENCY = 8
+MAX_RETRIES = 5
 
 template = """You are an AI financial analyst processing web content. Focus on extracting trading activities, stock prices, and market movements.
 
@@ -65,6 +72,9 @@ model = AzureChatOpenAI(
     api_version=AZURE_OPENAI_CONFIG['api_version']
 )
 
+# Identifies the Azure deployment in the LLM cache key
+CACHE_MODEL_NAME = f"azure/{AZURE_OPENAI_CONFIG['deployment_name']}@{AZURE_OPENAI_CONFIG['api_version']}"
+
 class WebScraper:
     def __init__(self):
         self.driver = webdriver.Chrome()
@@ -412,32 +422,88 @@ class WebScraper:
             print(f"Error scraping government site: {e}")
             return None
 
-def parse_with_ollama(dom_chunks, parse_description):
+def _analysis_chain():
+    """Prompt | model chain that retries rate-limited (429) calls with exponential backoff."""
     prompt = ChatPromptTemplate.from_template(template)
-    chain = prompt | model
-    
-    parsed_results = []
-    
-    for chunk in dom_chunks:
-        try:
-            response = chain.invoke({
-                "dom_content": chunk,
-                "parse_description": parse_description
-            })
-            
-            # Extract and validate financial data
-            parsed_content = response.content
-            
-            # Add validation for financial data
-            if any(financial_term in parsed_content.lower() 
-                  for financial_term in ['stock', 'trade', 'price', '$']):
-                parsed_results.append(parsed_content)
-                
-        except Exception as e:
-            print(f"Error parsing chunk: {e}")
+    return prompt | model.with_retry(
+        retry_if_exception_type=(RateLimitError,),
+        wait_exponential_jitter=True,
+        stop_after_attempt=MAX_RETRIES
+    )
+
+
+def _is_financial_result(parsed_content):
+    return any(financial_term in parsed_content.lower()
+               for financial_term in ['stock', 'trade', 'price', '$'])
+
+
+def iter_parse_with_ollama(dom_chunks, parse_description, max_concurrency=MAX_CONCURRENCY):
+    """
+    Map-reduce analysis of dom_chunks that yields partial results as chunks complete.
+
+    Chunks whose exact prompt was answered before come from the LLM cache; the rest are
+    sent concurrently (at most max_concurrency in flight) and each finished response is
+    merged into one deduplicated trade table. Every yielded dict carries the chunk index,
+    progress counts, that chunk's response and the merged table so far.
+    """
+    dom_chunks = list(dom_chunks)
+    chain = _analysis_chain()
+    cache = get_llm_cache()
+    prompt_template = ChatPromptTemplate.from_template(template)
+    merger = TableMerger()
+
+    prompts = [prompt_template.format(dom_content=chunk, parse_description=parse_description) for chunk in dom_chunks]
+    cached = {index: cache.get(CACHE_MODEL_NAME, prompt) for index, prompt in enumerate(prompts)}
+    pending = [index for index, response in cached.items() if response is None]
+
+    def results():
+        for index, response in cached.items():
+            if response is not None:
+                yield index, response
+        inputs = [{"dom_content": dom_chunks[index], "parse_description": parse_description} for index in pending]
+        for position, response in chain.batch_as_completed(
+            inputs, config={"max_concurrency": max_concurrency}, return_exceptions=True
+        ):
+            index = pending[position]
+            if isinstance(response, Exception):
+                print(f"Error parsing chunk {index}: {response}")
+                yield index, None
+                continue
+            cache.put(CACHE_MODEL_NAME, prompts[index], response.content)
+            yield index, response.content
+
+    completed = 0
+    for index, parsed_content in results():
+        completed += 1
+
+        # Extract and validate financial data
+        if parsed_content is None or not _is_financial_result(parsed_content):
             continue
-    
-    return "\n".join(parsed_results)
+
+        notes = merger.add(parsed_content)
+        yield {
+            "chunk": index,
+            "completed": completed,
+            "total": len(prompts),
+            "content": parsed_content,
+            "notes": notes,
+            "table": merger.render()
+        }
+
+
+def parse_with_ollama(dom_chunks, parse_description, max_concurrency=MAX_CONCURRENCY):
+    """Analyze every chunk concurrently and return the merged trade table followed by the remaining notes."""
+    table = ""
+    notes = {}
+    for result in iter_parse_with_ollama(dom_chunks, parse_description, max_concurrency):
+        table = result["table"]
+        if result["notes"]:
+            notes[result["chunk"]] = result["notes"]
+
+    # Notes stay in document order even though chunks finish out of order
+    parts = [table] if table else []
+    parts.extend(notes[index] for index in sorted(notes))
+    return "\n\n".join(parts)
 
 # Create wrapper functions for the scraping methods
 def scrape_x():
@@ -5,10 +5,12 @@ from gemini_helper import get_gemini_response
 import matplotlib.pyplot as plt
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
 import networkx as nx
-import yfinance as yf
+from price_store import get_price_store
+from event_study import compute_event_windows
+from usaspending import stream_awards_to_csv
+from contracts_store import get_contracts_store
 from datetime import datetime, timedelta
 import numpy as np
-import requests
 import json
 
 def load_csv_files(directory="data"):
@@ -78,15 +80,16 @@ def run_data_analysis(combined_data_text):
     )
     
     # Call the analytic AI model (assumed to be implemented via get_gemini_response)
-    response = get_gemini_response(combined_data_text, query)
+    response = get_gemini_response([combined_data_text], query)
     return response
 
 class ContractAnalysis:
     """Terminal-based federal contract analysis component"""
     
-    def __init__(self, symbol='LMT', company='Lockheed Martin'):
+    def __init__(self, symbol='LMT', company='Lockheed Martin', benchmark_symbol='SPY'):
         self.symbol = symbol
         self.company = company
+        self.benchmark_symbol = benchmark_symbol
         self.data_dir = 'data'
         
         # Create data directory if it doesn't exist
@@ -94,34 +97,35 @@ class ContractAnalysis:
             os.makedirs(self.data_dir)
     
     def fetch_stock_data(self, start_date='2020-01-01'):
-        """Fetch stock data from yfinance"""
+        """Fetch stock data from the local price store"""
         print(f"Fetching stock data for {self.symbol} from {start_date}...")
-        try:
-            ticker = yf.Ticker(self.symbol)
-            df = ticker.history(start=start_date)
-            
-            if df.empty:
-                print(f"No data available for {self.symbol} from {start_date}")
-                df = ticker.history(period="max")
-            
-            return df
-        except Exception as e:
-            print(f"Error fetching stock data: {e}")
-            return ticker.history(period="1y")
+        price_store = get_price_store()
+        df = price_store.get_history(self.symbol, start=start_date)
+        
+        if df.empty:
+            print(f"No data available for {self.symbol} from {start_date}")
+            df = price_store.get_history(self.symbol)
+        
+        return df
     
-    def fetch_contract_data(self, company_name=None, start_date='2020-01-01', end_date=None):
-        """Fetch contract data from USA Spending API"""
+    def fetch_contract_data(self, company_name=None, start_date='2020-01-01', end_date=None, refresh=False):
+        """Fetch contract data from the local award store, falling back to the USA Spending API"""
         if company_name is None:
             company_name = self.company
         
         if end_date is None:
             end_date = datetime.now().strftime("%Y-%m-%d")
+        
+        store = get_contracts_store()
+        df = None if refresh else store.fetched_awards(company_name, start_date, end_date)
+        if df is not None:
+            # The same search was fetched recently: answer with exactly the rows it returned
+            print(f"Loading contract data for {company_name} from {start_date} to {end_date} from the local store...")
+            return df if not df.empty else None
             
         print(f"Fetching contract data for {company_name} from {start_date} to {end_date}...")
         
         try:
-            base_url = "https://api.usaspending.gov/api/v2/search/spending_by_award/"
-            
             payload = {
                 "filters": {
                     "award_type_codes": ["A", "B", "C", "D"],
@@ -142,7 +146,8 @@ class ContractAnalysis:
                     "Description",
                     "Awarding Agency",
                     "Awarding Sub Agency",
-                    "Contract Award Type"
+                    "Contract Award Type",
+                    "generated_internal_id"
                 ],
                 "page": 1,
                 "limit": 100,
@@ -150,36 +155,39 @@ class ContractAnalysis:
                 "order": "desc"
             }
             
-            response = requests.post(base_url, json=payload)
+            # Follow every page and stream the rows to CSV as they arrive
+            output_file = os.path.join(self.data_dir, 'federal_contracts_latest.csv')
+            row_count = stream_awards_to_csv(payload, output_file)
             
-            if response.status_code == 200:
-                contracts_data = response.json()
-                
-                if 'results' in contracts_data and contracts_data['results']:
-                    # Save to CSV
-                    df = pd.DataFrame(contracts_data['results'])
-                    output_file = os.path.join(self.data_dir, 'federal_contracts_latest.csv')
-                    df.to_csv(output_file, index=False)
-                    print(f"Saved {len(df)} contracts to {output_file}")
-                    return df
-                else:
-                    print("No contract data found")
-                    return None
+            if row_count:
+                # Upsert into the award store and remember which awards this search returned,
+                # so repeating it stays local
+                store.ingest_fetch(output_file, company_name, start_date, end_date,
+                                   award_types=payload['filters']['award_type_codes'])
+                return pd.read_csv(output_file).sort_values('Award Amount', ascending=False, ignore_index=True)
             else:
-                print(f"Error fetching contract data: {response.status_code} - {response.text}")
+                print("No contract data found")
                 return None
                 
         except Exception as e:
             print(f"Exception fetching contract data: {e}")
             return None
     
+    def _stored_contracts(self):
+        """Awards of the latest complete fetch for this company, else the latest contracts CSV, else None."""
+        contracts_df = get_contracts_store().latest_fetched_awards(self.company)
+        if contracts_df is not None and not contracts_df.empty:
+            return contracts_df
+        contracts_file = os.path.join(self.data_dir, 'federal_contracts_latest.csv')
+        if os.path.exists(contracts_file):
+            return pd.read_csv(contracts_file)
+        return None
+    
     def analyze_market_impact(self, contracts_df=None):
         """Analyze stock market impact for each contract"""
         if contracts_df is None:
-            contracts_file = os.path.join(self.data_dir, 'federal_contracts_latest.csv')
-            if os.path.exists(contracts_file):
-                contracts_df = pd.read_csv(contracts_file)
-            else:
+            contracts_df = self._stored_contracts()
+            if contracts_df is None:
                 print("No contract data available for analysis")
                 return None
         
@@ -189,50 +197,26 @@ class ContractAnalysis:
             print("No stock data available for analysis")
             return None
         
-        # Create analysis results for each contract
-        analysis_results = []
-        
-        for _, contract in contracts_df.iterrows():
-            try:
-                award_date = pd.to_datetime(contract['Start Date'])
-                
-                # Get stock data around the contract date
-                pre_window = 10  # 10 trading days before
-                post_window = 10  # 10 trading days after
-                
-                # Find data around award date
-                pre_award_data = stock_data.loc[stock_data.index < award_date].tail(pre_window)
-                post_award_data = stock_data.loc[stock_data.index >= award_date].head(post_window)
-                
-                # Calculate impact metrics
-                impact = {
-                    'contract_id': contract['Award ID'],
-                    'award_amount': contract['Award Amount'],
-                    'award_date': award_date,
-                    'pre_price_avg': pre_award_data['Close'].mean() if not pre_award_data.empty else None,
-                    'post_price_avg': post_award_data['Close'].mean() if not post_award_data.empty else None,
-                    'pre_volume_avg': pre_award_data['Volume'].mean() if not pre_award_data.empty else None,
-                    'post_volume_avg': post_award_data['Volume'].mean() if not post_award_data.empty else None
-                }
-                
-                # Calculate percentage changes
-                if impact['pre_price_avg'] and impact['post_price_avg']:
-                    impact['price_change_pct'] = ((impact['post_price_avg'] - impact['pre_price_avg']) / impact['pre_price_avg']) * 100
-                else:
-                    impact['price_change_pct'] = None
-                
-                if impact['pre_volume_avg'] and impact['post_volume_avg']:
-                    impact['volume_change_pct'] = ((impact['post_volume_avg'] - impact['pre_volume_avg']) / impact['pre_volume_avg']) * 100
-                else:
-                    impact['volume_change_pct'] = None
-                
-                analysis_results.append(impact)
-            except Exception as e:
-                print(f"Error analyzing contract {contract.get('Award ID', 'unknown')}: {e}")
-                continue
+        # Market benchmark for abnormal returns (shares the price store cache)
+        benchmark_data = get_price_store().get_history(self.benchmark_symbol, start=stock_data.index.min())
+        
+        # Compute every contract's 10-trading-day pre/post windows in one vectorized pass
+        windows = compute_event_windows(
+            stock_data,
+            contracts_df['Start Date'],
+            pre_window=10,
+            post_window=10,
+            benchmark_data=benchmark_data
+        )
+        
+        analysis_df = pd.DataFrame({
+            'contract_id': contracts_df['Award ID'].to_numpy(),
+            'award_amount': contracts_df['Award Amount'].to_numpy(),
+            'award_date': pd.to_datetime(contracts_df['Start Date'], errors='coerce').to_numpy()
+        })
+        analysis_df = pd.concat([analysis_df, windows], axis=1)
         
         # Save analysis results
-        analysis_df = pd.DataFrame(analysis_results)
         output_file = os.path.join(self.data_dir, 'contract_market_impact.csv')
         analysis_df.to_csv(output_file, index=False)
         print(f"Saved market impact analysis to {output_file}")
@@ -278,10 +262,8 @@ class ContractAnalysis:
     def analyze_with_gemini(self, contracts_df=None, impact_df=None):
         """Use Gemini to analyze contracts and their market impact"""
         if contracts_df is None:
-            contracts_file = os.path.join(self.data_dir, 'federal_contracts_latest.csv')
-            if os.path.exists(contracts_file):
-                contracts_df = pd.read_csv(contracts_file)
-            else:
+            contracts_df = self._stored_contracts()
+            if contracts_df is None:
                 print("No contract data available for analysis")
                 return None
         
@@ -316,7 +298,7 @@ class ContractAnalysis:
         
         # Get the analysis from Gemini
         print("Generating AI analysis of contracts...")
-        analysis = get_gemini_response(prompt, "")
+        analysis = get_gemini_response([prompt], "")
         
         # Save the analysis
         output_file = os.path.join(self.data_dir, 'contract_ai_analysis.txt')
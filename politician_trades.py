@@ -2,7 +2,6 @@ import sys
 import os
 import requests
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+PRICE_STORE_DIR = os.path.join('data', 'price_store')
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+# Requests starting at or before this date download the full available history
+EARLIEST_DATE = pd.Timestamp('1900-01-01')
+# A range ending today (never counted as covered) is downloaded again at most this often
+PRICE_RECHECK_SECONDS = 15 * 60
+
+
+class PriceStore:
+    """
+    Persistent OHLCV store keyed by symbol.
+
+    Each symbol lives in its own directory as one memory-mapped NumPy array per
+    column plus an int64 date index. Coverage only grows by ranges that actually
+    returned data and never includes the current day, whose bar is still changing;
+    a range reaching today is re-downloaded at most every PRICE_RECHECK_SECONDS, so
+    reruns within that window stay off the network.
+    """
+
+    def __init__(self, root=PRICE_STORE_DIR):
+        self.root = root
+        self._frames = {}
+        self._coverage = {}
+        self._last_checked = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _symbol_dir(self, symbol):
+        return os.path.join(self.root, symbol.upper().replace('/', '_').replace('^', '_'))
+
+    def _load(self, symbol):
+        """Load a symbol from disk into memory (once per process)."""
+        if symbol in self._frames:
+            return self._frames[symbol]
+
+        symbol_dir = self._symbol_dir(symbol)
+        meta_file = os.path.join(symbol_dir, 'meta.json')
+        df = pd.DataFrame(columns=PRICE_COLUMNS, index=pd.DatetimeIndex([]))
+        coverage = None
+
+        if os.path.exists(meta_file):
+            try:
+                with open(meta_file, 'r') as f:
+                    meta = json.load(f)
+                index = np.load(os.path.join(symbol_dir, 'index.npy'), mmap_mode='r')
+                columns = {
+                    col: np.load(os.path.join(symbol_dir, f"{col}.npy"), mmap_mode='r')
+                    for col in PRICE_COLUMNS
+                }
+                df = pd.DataFrame(columns, index=pd.to_datetime(np.asarray(index)))
+                coverage = (pd.Timestamp(meta['start']), pd.Timestamp(meta['end']))
+                if 'updated' in meta:
+                    # The bar of the day the store was written may have been partial
+                    last_complete = pd.Timestamp(meta['updated']).normalize() - timedelta(days=1)
+                    coverage = (coverage[0], min(coverage[1], last_complete))
+                if coverage[0] > coverage[1]:
+                    coverage = None
+            except Exception as e:
+                print(f"Error loading price store for {symbol}: {e}")
+
+        self._frames[symbol] = df
+        self._coverage[symbol] = coverage
+        return df
+
+    def _save(self, symbol, df, coverage):
+        """Write a symbol's columns and coverage metadata to disk."""
+        symbol_dir = self._symbol_dir(symbol)
+        os.makedirs(symbol_dir, exist_ok=True)
+        try:
+            np.save(os.path.join(symbol_dir, 'index.npy'), df.index.values.astype('datetime64[ns]').astype(np.int64))
+            for col in PRICE_COLUMNS:
+                np.save(os.path.join(symbol_dir, f"{col}.npy"), df[col].to_numpy(dtype=np.float64))
+            with open(os.path.join(symbol_dir, 'meta.json'), 'w') as f:
+                json.dump({
+                    'start': coverage[0].strftime('%Y-%m-%d'),
+                    'end': coverage[1].strftime('%Y-%m-%d'),
+                    'updated': datetime.now().isoformat()
+                }, f)
+        except Exception as e:
+            print(f"Error saving price store for {symbol}: {e}")
+
+    def _download(self, symbol, start, end):
+        """Download a date range from yfinance, using the full history for the earliest start."""
+        ticker = yf.Ticker(symbol)
+        if start <= EARLIEST_DATE:
+            df = ticker.history(period="max")
+        else:
+            # yfinance treats `end` as exclusive
+            df = ticker.history(
+                start=start.strftime('%Y-%m-%d'),
+                end=(end + timedelta(days=1)).strftime('%Y-%m-%d')
+            )
+        if df.empty:
+            return df
+        df = df.reindex(columns=PRICE_COLUMNS).astype(np.float64)
+        # Store plain trading dates so callers can compare against naive award dates
+        if df.index.tz is not None:
+            df.index = df.index.tz_localize(None)
+        df.index = df.index.normalize()
+        return df
+
+    def _ensure(self, symbol, start, end):
+        """Fetch only the parts of [start, end] not already covered for this symbol."""
+        df = self._load(symbol)
+        coverage = self._coverage.get(symbol)
+
+        if coverage is None:
+            missing = [(start, end)]
+        else:
+            missing = []
+            if start < coverage[0]:
+                missing.append((start, coverage[0] - timedelta(days=1)))
+            if end > coverage[1]:
+                missing.append((coverage[1] + timedelta(days=1), end))
+
+        # Skip a recent re-download of the same stretch up to today
+        today = pd.Timestamp(datetime.now().date())
+        checked = self._last_checked.get(symbol)
+        if checked and time.time() - checked[0] < PRICE_RECHECK_SECONDS:
+            missing = [(s, e) for s, e in missing if not (e >= today and s >= checked[1])]
+
+        if not missing:
+            return df
+
+        pieces = [df] if not df.empty else []
+        covered = coverage
+        for missing_start, missing_end in missing:
+            try:
+                print(f"Downloading {symbol} prices {missing_start.date()} to {missing_end.date()}")
+                downloaded = self._download(symbol, missing_start, missing_end)
+            except Exception as e:
+                print(f"Error downloading stock data for {symbol}: {e}")
+                break
+            if missing_end >= today:
+                self._last_checked[symbol] = (time.time(), missing_start)
+            # yfinance usually signals a failure with an empty frame, so only ranges
+            # that returned data count as covered
+            if downloaded.empty:
+                continue
+            pieces.append(downloaded)
+            if covered is None:
+                covered = (missing_start, missing_end)
+            elif missing_end < covered[0]:
+                covered = (missing_start, covered[1])
+            else:
+                covered = (covered[0], missing_end)
+
+        if len(pieces) > (0 if df.empty else 1):
+            df = pd.concat(pieces)
+            df = df[~df.index.duplicated(keep='last')].sort_index()
+            self._frames[symbol] = df
+
+        # Today's bar is still changing, so coverage stops at yesterday
+        if covered is not None:
+            last_complete = today - timedelta(days=1)
+            covered = (covered[0], min(covered[1], last_complete))
+            if covered[0] > covered[1]:
+                covered = None
+        if covered is not None and covered != coverage:
+            self._coverage[symbol] = covered
+            self._save(symbol, df, covered)
+        return df
+
+    def get_history(self, symbol, start=None, end=None):
+        """
+        Return daily OHLCV rows for symbol between start and end (inclusive).
+        start=None means the full available history; end=None means today.
+        """
+        symbol = symbol.upper()
+        start = pd.Timestamp(start).normalize() if start is not None else EARLIEST_DATE
+        end = pd.Timestamp(end).normalize() if end is not None else pd.Timestamp(datetime.now().date())
+
+        with self._lock:
+            df = self._ensure(symbol, start, end)
+
+        if df.empty:
+            return df.copy()
+
+        # Window by binary search on the sorted index instead of boolean masks
+        lo = df.index.searchsorted(start, side='left')
+        hi = df.index.searchsorted(end, side='right')
+        return df.iloc[lo:hi].copy()
+
+    def get_close(self, symbol, date):
+        """Return the closing price on an exact trading date, or None."""
+        date = pd.Timestamp(date).normalize()
+        history = self.get_history(symbol, date, date)
+        if history.empty:
+            return None
+        return float(history['Close'].iloc[0])
+
+
+_price_store = None
+
+
+def get_price_store():
+    """Return the process-wide shared PriceStore."""
+    global _price_store
+    if _price_store is None:
+        _price_store = PriceStore()
+    return _price_store
@@ -0,0 +1,91 @@
+import re
+import math
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from chunking import DEFAULT_CHUNK_TOKENS, iter_dom_chunks
+
+# Chunks sent to the model per question (12 x 250 tokens fits in one Gemini context)
+TOP_K_CHUNKS = 12
+
+# Okapi BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9$][a-z0-9.$%]*[a-z0-9%]|[a-z0-9$]")
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'did', 'do', 'does', 'for', 'from', 'has',
+    'have', 'how', 'i', 'in', 'is', 'it', 'its', 'me', 'of', 'on', 'or', 'show', 'tell', 'that',
+    'the', 'their', 'there', 'this', 'to', 'was', 'were', 'what', 'when', 'which', 'who', 'why',
+    'with', 'about', 'any', 'all', 'give', 'list', 'please', 'content',
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens; prices, percentages and $tickers stay whole."""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+class BM25Index:
+    """
+    In-memory BM25 index over chunks of scraped content.
+
+    Documents are chunked with chunking.iter_dom_chunks and added incrementally, so a
+    new scrape only indexes its own chunks. search() only visits the postings of the
+    query terms.
+    """
+
+    def __init__(self, max_tokens: int = DEFAULT_CHUNK_TOKENS, k1: float = BM25_K1, b: float = BM25_B):
+        self.max_tokens = max_tokens
+        self.k1 = k1
+        self.b = b
+        self.chunks: List[Dict] = []
+        self._lengths: List[int] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def add_document(self, source: str, content: str) -> int:
+        """Chunk and index one scraped document; returns the number of chunks added."""
+        added = 0
+        for text in iter_dom_chunks(content or '', self.max_tokens):
+            chunk_id = len(self.chunks)
+            terms = Counter(tokenize(text))
+            self.chunks.append({'source': source, 'text': text})
+            self._lengths.append(sum(terms.values()))
+            self._total_length += self._lengths[-1]
+            for term, freq in terms.items():
+                self._postings.setdefault(term, []).append((chunk_id, freq))
+            added += 1
+        return added
+
+    def search(self, query: str, k: int = TOP_K_CHUNKS) -> List[Tuple[float, Dict]]:
+        """The k best matching chunks as (score, chunk), best first."""
+        return [(score, self.chunks[chunk_id]) for chunk_id, score in self._rank(query, k)]
+
+    def _rank(self, query: str, k: int) -> List[Tuple[int, float]]:
+        if not self.chunks:
+            return []
+        count = len(self.chunks)
+        average_length = self._total_length / count or 1
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, freq in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / average_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def top_chunks(self, query: str, k: int = TOP_K_CHUNKS) -> List[str]:
+        """
+        Context for a question: the k most relevant chunks in reading order, each tagged
+        with its source. Falls back to the most recent chunks when no query term matches.
+        """
+        ids = sorted(chunk_id for chunk_id, _ in self._rank(query, k))
+        selected = [self.chunks[chunk_id] for chunk_id in ids] if ids else self.chunks[-k:]
+        return [f"Source: {chunk['source']}\n{chunk['text']}" for chunk in selected]
@@ -1,6 +1,10 @@
 from selenium.webdriver import Remote, ChromeOptions
 from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+from html_parsing import body_text
+from chunking import iter_dom_chunks, DEFAULT_CHUNK_TOKENS
+from financial_text import filter_financial_lines
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
@@ -8,8 +12,13 @@ import time
 from dotenv import load_dotenv
 import os
 import requests
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin, urlparse, urldefrag
+import urllib.robotparser
 import re
+import html
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 import selenium.webdriver as webdriver
 from selenium.webdriver.chrome.service import Service
@@ -19,176 +28,436 @@ from selenium.webdriver.chrome.service import Service
 # SBR_WEBDRIVER = os.getenv("SBR_WEBDRIVER")
 
 
+# Browser-like headers shared by every page request
+SCRAPE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+SCRAPE_TIMEOUT = 15
+
+# Crawler defaults
+CRAWL_MAX_WORKERS = 16
+CRAWL_PER_HOST_LIMIT = 4
+CRAWL_USER_AGENT = 'WebScrapeAI'
+# The crawler identifies itself with the same token its robots.txt rules are evaluated for
+CRAWL_HEADERS = {
+    'User-Agent': f"Mozilla/5.0 (compatible; {CRAWL_USER_AGENT}/1.0; +https://github.com/YangLin14/Web-Scrape-AI)"
+}
+
+# Links to these file types are never fetched by the crawler
+SKIPPED_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.ico', '.css', '.js',
+    '.zip', '.gz', '.mp3', '.mp4', '.avi', '.mov', '.xls', '.xlsx', '.doc', '.docx', '.ppt', '.pptx'
+)
+
+_HTML_PARSER = lxml.html.HTMLParser(remove_comments=True)
+
+_scrape_session = None
+_crawl_session = None
+_scrape_session_lock = threading.Lock()
+
+
+def _make_session(headers):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=64, pool_maxsize=CRAWL_MAX_WORKERS)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(headers)
+    return session
+
+
+def get_scrape_session():
+    """Shared requests session so page fetches reuse pooled TCP/TLS connections."""
+    global _scrape_session
+    with _scrape_session_lock:
+        if _scrape_session is None:
+            _scrape_session = _make_session(SCRAPE_HEADERS)
+    return _scrape_session
+
+
+def get_crawl_session():
+    """Pooled session used by the crawler, sending the WebScrapeAI User-Agent that robots.txt is checked for."""
+    global _crawl_session
+    with _scrape_session_lock:
+        if _crawl_session is None:
+            _crawl_session = _make_session(CRAWL_HEADERS)
+    return _crawl_session
+
+
+def normalize_url(url):
+    """Add a scheme if missing and drop the fragment."""
+    url = url.strip()
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return urldefrag(url)[0]
+
+
+def fetch_page(url, session=None):
+    """Fetch a page and return (final_url, response)."""
+    session = session or get_scrape_session()
+    response = session.get(url, timeout=SCRAPE_TIMEOUT)
+    response.raise_for_status()
+    return response.url, response
+
+
 def scrape_website(url):
     """
     Comprehensively scrape a website including all text content, links, and nested content.
     """
     try:
-        # Add headers to mimic a browser request
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
         # Validate and clean URL
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
-            
-        # Make request
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        # Parse with BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Remove unwanted elements
-        for script in soup(["script", "style", "meta", "noscript", "header", "footer"]):
-            script.decompose()
+        url = normalize_url(url)
             
-        # Extract all text content
-        content = []
+        # Make request over the pooled session
+        url, response = fetch_page(url)
         
-        # Get title
-        if soup.title:
-            content.append(f"Title: {soup.title.string}")
-            
-        # Get meta description
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        if meta_desc:
-            content.append(f"Description: {meta_desc.get('content', '')}")
-            
-        # Get all headings
-        for heading in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-            content.append(f"Heading: {heading.get_text(strip=True)}")
-            
-        # Get all paragraphs
-        for p in soup.find_all('p'):
-            text = p.get_text(strip=True)
-            if text:  # Only add non-empty paragraphs
-                content.append(f"Paragraph: {text}")
-                
-        # Get all list items
-        for li in soup.find_all('li'):
-            text = li.get_text(strip=True)
-            if text:
-                content.append(f"List item: {text}")
-                
-        # Get all links with their text
-        for a in soup.find_all('a', href=True):
-            href = a['href']
-            if href.startswith('/'):  # Convert relative URLs to absolute
-                href = urljoin(url, href)
-            text = a.get_text(strip=True)
-            if text:
-                content.append(f"Link: {text} -> {href}")
-                
-        # Get all table content
-        for table in soup.find_all('table'):
-            content.append("Table content:")
-            for row in table.find_all('tr'):
-                cells = [cell.get_text(strip=True) for cell in row.find_all(['td', 'th'])]
-                if cells:
-                    content.append(" | ".join(cells))
-                    
-        # Get all div content
-        for div in soup.find_all('div'):
-            text = div.get_text(strip=True)
-            if text and len(text) > 50:  # Only get substantial div content
-                content.append(f"Content: {text}")
-                
-        # Get all article content
-        for article in soup.find_all('article'):
-            text = article.get_text(strip=True)
-            if text:
-                content.append(f"Article: {text}")
-                
-        # Get all section content
-        for section in soup.find_all('section'):
-            text = section.get_text(strip=True)
-            if text:
-                content.append(f"Section: {text}")
-                
-        # Get all image alt text and sources
-        for img in soup.find_all('img', alt=True):
-            alt = img.get('alt', '').strip()
-            src = img.get('src', '')
-            if alt and src:
-                if src.startswith('/'):
-                    src = urljoin(url, src)
-                content.append(f"Image: {alt} -> {src}")
-        
-        # Clean and join content
-        cleaned_content = []
-        seen = set()  # For deduplication
-        for item in content:
-            # Remove extra whitespace and normalize
-            cleaned = ' '.join(item.split())
-            # Only add if not seen and not empty
-            if cleaned and cleaned not in seen:
-                cleaned_content.append(cleaned)
-                seen.add(cleaned)
-        
-        return '\n\n'.join(cleaned_content)
+        return extract_page_content(response.content, url)
         
     except Exception as e:
         return f"Error scraping website: {str(e)}"
 
 
+# Elements whose text is dropped (their links are still collected for crawling)
+SKIPPED_TAGS = {'script', 'style', 'meta', 'noscript', 'header', 'footer', 'template', 'svg'}
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+# Elements whose loose text is reported under a container label
+CONTAINER_LABELS = {'div': 'Content', 'article': 'Article', 'section': 'Section', 'body': 'Content'}
+# Minimum length for loose text under a generic div/body
+MIN_CONTENT_LENGTH = 50
+
+
+class _Block:
+    """Text collected for one structural element during the walk."""
+    __slots__ = ('label', 'parts', 'href')
+
+    def __init__(self, label, href=None):
+        self.label = label
+        self.parts = []
+        self.href = href
+
+    def text(self):
+        return ' '.join(''.join(self.parts).split())
+
+
+def parse_page(html_content, url):
+    """
+    Extract a page's content and outgoing links in a single pass over the DOM.
+
+    Every text node is attributed once, to the innermost structural element that owns
+    it: title, heading, paragraph, list item or table cell. Link text is also kept in
+    its enclosing block. Other text is reported under its nearest div/article/section
+    container, so nested containers never repeat their children's text.
+
+    Returns (content, links) where content uses the Title:/Heading:/Paragraph:/...
+    line format and links are absolute http(s) URLs without fragments.
+    """
+    if isinstance(html_content, str):
+        # lxml rejects str input that still carries an XML encoding declaration
+        html_content = html_content.encode('utf-8')
+    root = lxml.html.fromstring(html_content, parser=_HTML_PARSER)
+    if root is None:
+        return '', []
+
+    lines = []
+    links = []
+    blocks = []          # open title/heading/paragraph/list item/cell collectors
+    containers = []      # open (label, loose text parts) for div/article/section/body
+    rows = []            # open table rows, each a list of cell texts
+    anchors = []         # open link collectors
+    skip_depth = 0
+
+    def add_text(text):
+        if not text or skip_depth:
+            return
+        if anchors:
+            anchors[-1].parts.append(text)
+        block = next((b for b in reversed(blocks) if b is not None), None)
+        if block is not None:
+            block.parts.append(text)
+        elif containers and not anchors:
+            # Bare link text is already reported on its Link: line
+            containers[-1][1].append(text)
+
+    def flush_container():
+        """Emit loose container text gathered so far, keeping document order."""
+        if not containers or not containers[-1][1]:
+            return
+        label, parts = containers[-1]
+        text = ' '.join(''.join(parts).split())
+        parts.clear()
+        if text and (label != 'Content' or len(text) > MIN_CONTENT_LENGTH):
+            lines.append(f"{label}: {text}")
+
+    for event, element in etree.iterwalk(root, events=('start', 'end')):
+        tag = element.tag if isinstance(element.tag, str) else None
+
+        if event == 'start':
+            if tag is None:
+                continue
+            tag = tag.lower()
+            if tag == 'a' and element.get('href'):
+                href = element.get('href').strip()
+                absolute = urldefrag(urljoin(url, href))[0]
+                if urlparse(absolute).scheme in ('http', 'https'):
+                    links.append(absolute)
+                if not skip_depth:
+                    anchors.append(_Block('Link', urljoin(url, href) if href.startswith('/') else href))
+            if tag in SKIPPED_TAGS or skip_depth:
+                if tag == 'meta' and (element.get('name') or '').lower() == 'description':
+                    lines.append(f"Description: {element.get('content', '')}")
+                skip_depth += 1
+                continue
+
+            if tag == 'title':
+                blocks.append(_Block('Title'))
+            elif tag in HEADING_TAGS or tag in ('p', 'li', 'td', 'th'):
+                # Paragraphs and headings nested in another block stay part of it
+                if tag in ('li', 'td', 'th') or not any(b is not None for b in blocks):
+                    flush_container()
+                    label = 'Heading' if tag in HEADING_TAGS else {'p': 'Paragraph', 'li': 'List item'}.get(tag, 'Cell')
+                    blocks.append(_Block(label))
+                else:
+                    blocks.append(None)
+            elif tag in CONTAINER_LABELS:
+                flush_container()
+                containers.append((CONTAINER_LABELS[tag], []))
+            elif tag == 'table':
+                flush_container()
+                lines.append("Table content:")
+            elif tag == 'tr':
+                rows.append([])
+            elif tag == 'br':
+                add_text(' ')
+            elif tag == 'img' and element.get('alt', '').strip() and element.get('src'):
+                src = element.get('src')
+                if src.startswith('/'):
+                    src = urljoin(url, src)
+                lines.append(f"Image: {element.get('alt').strip()} -> {src}")
+
+            add_text(element.text)
+            continue
+
+        # end event
+        if tag is not None:
+            tag = tag.lower()
+            if skip_depth:
+                skip_depth -= 1
+            else:
+                if tag == 'a' and anchors and element.get('href'):
+                    anchor = anchors.pop()
+                    text = anchor.text()
+                    if text:
+                        lines.append(f"Link: {text} -> {anchor.href}")
+                elif tag == 'title' or tag in HEADING_TAGS or tag in ('p', 'li', 'td', 'th'):
+                    block = blocks.pop() if blocks else None
+                    if block is not None:
+                        text = block.text()
+                        if block.label == 'Cell':
+                            if rows:
+                                rows[-1].append(text)
+                        elif text:
+                            lines.append(f"{block.label}: {text}")
+                elif tag in CONTAINER_LABELS and containers:
+                    flush_container()
+                    containers.pop()
+                elif tag == 'tr' and rows:
+                    cells = rows.pop()
+                    if any(cells):
+                        lines.append(" | ".join(cells))
+        # Tail text belongs to the parent element
+        add_text(element.tail)
+
+    # Clean and join content
+    cleaned_content = []
+    seen = set()  # For deduplication
+    for item in lines:
+        # Remove extra whitespace and normalize
+        cleaned = ' '.join(item.split())
+        # Only add if not seen and not empty
+        if cleaned and cleaned not in seen:
+            cleaned_content.append(cleaned)
+            seen.add(cleaned)
+
+    return '\n\n'.join(cleaned_content), links
+
+
+def extract_page_content(html_content, url):
+    """Turn a page's HTML into the Title:/Heading:/Paragraph:/... line format."""
+    return parse_page(html_content, url)[0]
+
+
+def _host_key(url):
+    """Hostname without a leading www. so example.com and www.example.com count as one site."""
+    host = (urlparse(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class _HostPolicy:
+    """Per-host robots.txt rules, crawl delay and concurrency limit."""
+
+    def __init__(self, origin, session, per_host_limit, respect_robots, min_delay):
+        self.semaphore = threading.BoundedSemaphore(per_host_limit)
+        self.robots = None
+        self.delay = min_delay
+        self._last_request = 0.0
+        self._lock = threading.Lock()
+        if respect_robots:
+            self.robots = urllib.robotparser.RobotFileParser(urljoin(origin, '/robots.txt'))
+            try:
+                response = session.get(self.robots.url, timeout=SCRAPE_TIMEOUT)
+                if response.status_code in (401, 403):
+                    self.robots.disallow_all = True
+                elif response.ok:
+                    self.robots.parse(response.text.splitlines())
+                else:
+                    self.robots.allow_all = True
+            except requests.RequestException:
+                self.robots.allow_all = True
+            self.delay = max(min_delay, self.robots.crawl_delay(CRAWL_USER_AGENT) or 0)
+
+    def allowed(self, url):
+        return self.robots is None or self.robots.can_fetch(CRAWL_USER_AGENT, url)
+
+    def sitemaps(self):
+        return (self.robots.site_maps() if self.robots else None) or []
+
+    def wait_turn(self):
+        """Sleep until this host's crawl delay has passed since the previous request."""
+        if not self.delay:
+            return
+        with self._lock:
+            remaining = self._last_request + self.delay - time.monotonic()
+            self._last_request = max(time.monotonic(), self._last_request + self.delay)
+        if remaining > 0:
+            time.sleep(remaining)
+
+
+def fetch_sitemap_urls(sitemap_url, session=None, max_urls=10000):
+    """Page URLs listed in a sitemap, following one level of sitemap indexes."""
+    session = session or get_scrape_session()
+    urls = []
+    pending = [sitemap_url]
+    visited = set()
+    while pending and len(urls) < max_urls:
+        current = pending.pop(0)
+        if current in visited:
+            continue
+        visited.add(current)
+        try:
+            response = session.get(current, timeout=SCRAPE_TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"Error fetching sitemap {current}: {e}")
+            continue
+        locs = re.findall(r'<loc>\s*(.*?)\s*</loc>', response.text, flags=re.IGNORECASE | re.DOTALL)
+        if '<sitemapindex' in response.text[:2000].lower():
+            pending.extend(html.unescape(loc) for loc in locs)
+        else:
+            urls.extend(html.unescape(loc) for loc in locs)
+    return urls[:max_urls]
+
+
+def crawl_website(seeds, max_depth=1, max_pages=100, max_workers=CRAWL_MAX_WORKERS,
+                  per_host_limit=CRAWL_PER_HOST_LIMIT, same_domain=True, respect_robots=True,
+                  use_sitemap=False, min_delay=0.0):
+    """
+    Crawl from one or more seed URLs and yield each page's extracted content as it is fetched.
+
+    Pages are fetched concurrently over the pooled crawl session, at most per_host_limit at a
+    time per host, honouring robots.txt rules and crawl delays. Links are followed up to
+    max_depth hops from the seeds (only on the seeds' sites when same_domain is set), and
+    with use_sitemap the sites' sitemaps are added to the seeds.
+
+    Yields dicts with url, depth, content and error keys, in completion order.
+    """
+    if isinstance(seeds, str):
+        seeds = [seeds]
+    session = get_crawl_session()
+    seeds = [normalize_url(seed) for seed in seeds if seed and seed.strip()]
+    allowed_hosts = {_host_key(seed) for seed in seeds}
+    policies = {}
+
+    def policy_for(url):
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        if origin not in policies:
+            policies[origin] = _HostPolicy(origin, session, per_host_limit, respect_robots, min_delay)
+        return policies[origin]
+
+    def wanted(url):
+        path = urlparse(url).path.lower()
+        if path.endswith(SKIPPED_EXTENSIONS):
+            return False
+        return not same_domain or _host_key(url) in allowed_hosts
+
+    frontier = deque((seed, 0) for seed in seeds)
+    if use_sitemap:
+        for seed in seeds:
+            sitemap_urls = policy_for(seed).sitemaps() or [urljoin(seed, '/sitemap.xml')]
+            for sitemap_url in sitemap_urls:
+                frontier.extend((url, 0) for url in fetch_sitemap_urls(sitemap_url, session, max_pages))
+
+    def crawl_one(url, depth, policy):
+        with policy.semaphore:
+            policy.wait_turn()
+            try:
+                final_url, response = fetch_page(url, session)
+                if 'html' not in response.headers.get('Content-Type', 'text/html'):
+                    return {'url': final_url, 'depth': depth, 'content': '', 'error': 'not an HTML page'}, []
+                content, links = parse_page(response.content, final_url)
+                return {'url': final_url, 'depth': depth, 'content': content, 'error': None}, links if depth < max_depth else []
+            except Exception as e:
+                return {'url': url, 'depth': depth, 'content': '', 'error': str(e)}, []
+
+    seen = set()
+    submitted = 0
+    futures = set()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while frontier or futures:
+            # Keep the pool busy while there is work left and the page budget allows it
+            while frontier and len(futures) < max_workers * 2 and submitted < max_pages:
+                url, depth = frontier.popleft()
+                if url in seen or not wanted(url):
+                    continue
+                seen.add(url)
+                policy = policy_for(url)
+                if not policy.allowed(url):
+                    continue
+                futures.add(executor.submit(crawl_one, url, depth, policy))
+                submitted += 1
+
+            if not futures:
+                break
+
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                page, links = future.result()
+                seen.add(page['url'])
+                frontier.extend((link, page['depth'] + 1) for link in links if link not in seen)
+                yield page
+
+
 def extract_body_content(html_content):
     """Extract content from body tag."""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    if soup.body:
-        return soup.body.get_text(separator='\n', strip=True)
-    return html_content
+    return body_text(html_content)
 
 
 def clean_body_content(content):
     """Enhanced cleaning for financial content."""
-    # Keep existing cleaning code
-    content = re.sub(r'\n\s*\n', '\n\n', content)
-    content = re.sub(r'\s+', ' ', content)
-    
-    # Additional financial data cleaning
-    def is_financial_line(line):
-        # Keep lines with financial indicators
-        financial_indicators = [
-            r'\$\d+',           # Dollar amounts
-            r'\d+\.\d{2}',      # Decimal numbers
-            r'[A-Z]{2,5}',      # Stock symbols
-            r'(buy|sell|trade)', # Trading terms
-            r'(million|billion)', # Large numbers
-            r'(\d+\s*shares)',   # Share quantities
-            r'(stock|market|trading)' # Market terms
-        ]
-        return (
-            len(line.strip()) > 20 or
-            any(re.search(pattern, line.lower()) for pattern in financial_indicators)
-        )
+    # Collapse runs of spaces within lines and runs of blank lines, keeping line structure
+    content = re.sub(r'[ \t\r\f\v]+', ' ', content)
+    content = re.sub(r' *\n *', '\n', content)
+    content = re.sub(r'\n{3,}', '\n\n', content)
     
-    lines = [line for line in content.split('\n') 
-            if is_financial_line(line.strip())]
+    # Keep substantial lines and short lines with financial indicators;
+    # blank lines are kept as block separators for the chunker
+    lines = filter_financial_lines(content.split('\n'))
     
-    return '\n'.join(lines)
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
 
 
-def split_dom_content(content, max_chunk_size=1000):
-    """Split content into manageable chunks."""
-    chunks = []
-    current_chunk = []
-    current_size = 0
-    
-    for line in content.split('\n'):
-        line_size = len(line)
-        if current_size + line_size > max_chunk_size and current_chunk:
-            chunks.append('\n'.join(current_chunk))
-            current_chunk = []
-            current_size = 0
-        current_chunk.append(line)
-        current_size += line_size
-    
-    if current_chunk:
-        chunks.append('\n'.join(current_chunk))
-    
-    return chunks
+def split_dom_content(content, max_tokens=DEFAULT_CHUNK_TOKENS, overlap_tokens=0):
+    """Split content into token-budgeted chunks that keep headings, tables and paragraphs intact."""
+    return list(iter_dom_chunks(content, max_tokens=max_tokens, overlap_tokens=overlap_tokens))
 
     # print("Connecting to Scraping Browser...")
     # sbr_connection = ChromiumRemoteConnection(SBR_WEBDRIVER, "goog", "chrome")
@@ -0,0 +1,83 @@
+import io
+import json
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import bulk_download
+
+CSV_HEADER = "contract_transaction_unique_key,action_date,federal_action_obligation\n"
+
+
+def make_zip(rows):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('PrimeTransactions_1.csv', CSV_HEADER + ''.join(rows))
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def usaspending_server(monkeypatch):
+    """Local stand-in for /download/awards/, /download/status/ and the generated file."""
+    files = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def _json(self, data):
+            body = json.dumps(data).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            name = f"download_{len(files)}.zip"
+            files[name] = server.next_file
+            self._json({'file_name': name, 'file_url': f"{base}/files/{name}"})
+
+        def do_GET(self):
+            if self.path.startswith('/api/v2/download/status/'):
+                self._json({'status': 'finished'})
+                return
+            body = files[self.path.rsplit('/', 1)[-1]]
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    base = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(bulk_download, 'USASPENDING_BASE_URL', f"{base}/api/v2")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+def run_job(tmp_path, server, rows):
+    server.next_file = make_zip(rows)
+    job = bulk_download.BulkDownloadJob({'filters': {}}, download_dir=str(tmp_path / 'downloads'),
+                                        store_dir=str(tmp_path / 'store'), poll_interval=0)
+    job.run()
+    assert job.status == 'finished', job.message
+    return job
+
+
+def test_overlapping_downloads_are_read_back_once(tmp_path, usaspending_server):
+    run_job(tmp_path, usaspending_server, ["T1,2023-11-01,10\n", "T2,2024-02-01,20\n"])
+    job = run_job(tmp_path, usaspending_server, ["T2,2024-02-01,25\n", "T3,2024-03-01,30\n"])
+    assert job.fiscal_years == {2024}
+
+    df = bulk_download.load_award_store(store_dir=str(tmp_path / 'store'))
+    assert sorted(df['contract_transaction_unique_key']) == ['T1', 'T2', 'T3']
+    # The latest download wins
+    assert df.set_index('contract_transaction_unique_key').loc['T2', 'federal_action_obligation'] == '25'
+
+    amounts = bulk_download.load_award_store(store_dir=str(tmp_path / 'store'), columns=['federal_action_obligation'])
+    assert list(amounts.columns) == ['federal_action_obligation']
+    assert len(amounts) == 3
@@ -0,0 +1,55 @@
+import csv
+
+from contracts_store import ContractsStore
+
+FIELDS = ['generated_internal_id', 'Award ID', 'Recipient Name', 'Start Date', 'End Date', 'Award Amount']
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+def test_covered_search_returns_exactly_the_fetched_rows(tmp_path):
+    store = ContractsStore(str(tmp_path / 'contracts.sqlite'))
+    # A grant of the same recipient stored by another search must not leak in
+    store.upsert_awards([{'generated_internal_id': 'GRANT_1', 'Award ID': 'G1',
+                          'Recipient Name': 'LOCKHEED MARTIN CORPORATION', 'Start Date': '2023-05-01',
+                          'Award Amount': 5}])
+    fetched = [
+        {'generated_internal_id': 'CONT_1', 'Award ID': 'C1', 'Recipient Name': 'LOCKHEED MARTIN CORPORATION',
+         'Start Date': '2023-02-01', 'End Date': '2024-01-01', 'Award Amount': 100},
+        # No start date: a period-overlap filter would drop it
+        {'generated_internal_id': 'CONT_2', 'Award ID': 'C2', 'Recipient Name': 'LOCKHEED MARTIN CORPORATION',
+         'Start Date': '', 'End Date': '', 'Award Amount': 200},
+    ]
+    csv_path = write_csv(tmp_path / 'fetch.csv', fetched)
+
+    assert not store.is_covered('Lockheed Martin Corp.', '2023-01-01', '2023-12-31')
+    assert store.fetched_awards('Lockheed Martin Corp.', '2023-01-01', '2023-12-31') is None
+
+    assert store.ingest_fetch(csv_path, 'Lockheed Martin Corp.', '2023-01-01', '2023-12-31',
+                              award_types=['A', 'B', 'C', 'D']) == 2
+    assert store.is_covered(' lockheed martin corp. ', '2023-01-01', '2023-12-31', award_types=['D', 'C', 'B', 'A'])
+
+    df = store.fetched_awards('Lockheed Martin Corp.', '2023-01-01', '2023-12-31')
+    assert list(df['generated_internal_id']) == ['CONT_2', 'CONT_1']
+    assert list(store.fetched_awards('Lockheed Martin Corp.', '2023-01-01', '2023-12-31', limit=1)['Award ID']) == ['C2']
+
+    # A different search is not covered by this one
+    assert store.fetched_awards('Lockheed Martin Corp.', '2023-01-01', '2024-12-31') is None
+    assert store.fetched_awards('Lockheed Martin Corp.', '2023-01-01', '2023-12-31', award_types=['02']) is None
+    assert sorted(store.latest_fetched_awards('Lockheed Martin Corp.')['Award ID']) == ['C1', 'C2']
+
+
+def test_refetch_replaces_the_recorded_rows(tmp_path):
+    store = ContractsStore(str(tmp_path / 'contracts.sqlite'))
+    row = {'Recipient Name': 'ACME', 'Start Date': '2023-02-01', 'End Date': '', 'Award Amount': 1}
+    store.ingest_fetch(write_csv(tmp_path / 'a.csv', [dict(row, generated_internal_id='X', **{'Award ID': 'X'})]),
+                       'acme', '2023-01-01', '2023-12-31')
+    store.ingest_fetch(write_csv(tmp_path / 'b.csv', [dict(row, generated_internal_id='Y', **{'Award ID': 'Y'})]),
+                       'acme', '2023-01-01', '2023-12-31')
+    assert list(store.fetched_awards('acme', '2023-01-01', '2023-12-31')['Award ID']) == ['Y']
@@ -0,0 +1,94 @@
+import tiingo_helper
+from news_store import NewsStore
+
+
+def make_articles(count):
+    """Tiingo-style articles, newest first (higher id = published later)."""
+    return [
+        {'id': i, 'title': f'Article {i}', 'url': f'https://example.com/{i}',
+         'publishedDate': f'2025-01-01T00:{i // 60:02d}:{i % 60:02d}Z', 'tickers': ['aapl'], 'tags': []}
+        for i in range(count, 0, -1)
+    ]
+
+
+class FakeNewsApi:
+    def __init__(self, articles):
+        self.articles = articles
+        self.offsets = []
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.offsets.append(params['offset'])
+        page = self.articles[params['offset']:params['offset'] + params['limit']]
+        return type('Response', (), {'status_code': 200, 'json': lambda self: page})()
+
+
+def setup(monkeypatch, tmp_path, articles):
+    api = FakeNewsApi(articles)
+    store = NewsStore(str(tmp_path))
+    monkeypatch.setattr(tiingo_helper.requests, 'get', api.get)
+    monkeypatch.setattr(tiingo_helper, 'get_news_store', lambda: store)
+    monkeypatch.setattr(tiingo_helper, 'enrich_articles', lambda articles, on_article=None: list(articles))
+    return api, store
+
+
+def ids(articles):
+    return [article['id'] for article in articles]
+
+
+def test_ingest_stops_at_high_water_mark(monkeypatch, tmp_path):
+    api, store = setup(monkeypatch, tmp_path, make_articles(7))
+    assert ids(tiingo_helper.ingest_stock_news(tickers=['AAPL'], page_size=3)) == [7, 6, 5, 4, 3, 2, 1]
+    assert store.get_cursor('tickers=aapl')['id'] == 7
+
+    api.articles = make_articles(8)
+    api.offsets.clear()
+    assert ids(tiingo_helper.ingest_stock_news(tickers=['AAPL'], page_size=3)) == [8]
+    assert api.offsets == [0]
+    assert store.get_cursor('tickers=aapl')['id'] == 8
+
+
+def test_truncated_pass_resumes_on_next_poll(monkeypatch, tmp_path):
+    api, store = setup(monkeypatch, tmp_path, make_articles(25))
+
+    first = tiingo_helper.ingest_stock_news(tickers=['AAPL'], page_size=5, max_pages=2)
+    assert ids(first) == list(range(25, 15, -1))
+    assert store.get_cursor('tickers=aapl') is None
+    assert store.get_resume('tickers=aapl')['offset'] == 10
+
+    # Two articles published between polls shift the older pages down
+    api.articles = make_articles(27)
+    api.offsets.clear()
+    second = tiingo_helper.ingest_stock_news(tickers=['AAPL'], page_size=5, max_pages=2)
+    assert api.offsets == [10, 15]
+    assert ids(second) == list(range(15, 7, -1))
+
+    api.offsets.clear()
+    third = tiingo_helper.ingest_stock_news(tickers=['AAPL'], page_size=5, max_pages=2)
+    assert api.offsets == [20, 25]
+    assert ids(third) == list(range(7, 0, -1))
+    assert store.get_resume('tickers=aapl') is None
+    assert store.get_cursor('tickers=aapl')['id'] == 25
+
+    # The articles published during the catch-up are picked up from the mark
+    api.offsets.clear()
+    assert ids(tiingo_helper.ingest_stock_news(tickers=['AAPL'], page_size=5, max_pages=2)) == [27, 26]
+    assert len(store.read()) == 27
+
+
+def test_resume_point_is_dropped_when_start_date_changes(monkeypatch, tmp_path):
+    api, store = setup(monkeypatch, tmp_path, make_articles(25))
+    tiingo_helper.ingest_stock_news(tickers=['AAPL'], start_date='2025-01-01', page_size=5, max_pages=2)
+    assert store.get_resume('tickers=aapl')['start_date'] == '2025-01-01'
+
+    api.offsets.clear()
+    tiingo_helper.ingest_stock_news(tickers=['AAPL'], start_date='2024-12-01', page_size=5, max_pages=2)
+    assert api.offsets == [0, 5]
+
+
+def test_articles_without_integer_id_are_skipped(monkeypatch, tmp_path):
+    articles = make_articles(4)
+    articles[1]['id'] = None
+    articles[2]['id'] = 'abc'
+    api, store = setup(monkeypatch, tmp_path, articles)
+    assert ids(tiingo_helper.ingest_stock_news(tickers=['AAPL'], page_size=10)) == [4, 1]
+    assert store.get_cursor('tickers=aapl')['id'] == 4
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+import price_store
+from price_store import PriceStore, PRICE_COLUMNS
+
+
+def fake_download(calls, empty=False):
+    def download(self, symbol, start, end):
+        calls.append((start, end))
+        if empty:
+            return pd.DataFrame()
+        index = pd.bdate_range(start, end)
+        return pd.DataFrame({col: np.arange(len(index), dtype=float) for col in PRICE_COLUMNS}, index=index)
+    return download
+
+
+def test_empty_download_is_not_cached_as_covered(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(PriceStore, '_download', fake_download(calls, empty=True))
+    store = PriceStore(str(tmp_path))
+    assert store.get_history('X', '2024-01-01', '2024-01-31').empty
+    assert store.get_history('X', '2024-01-01', '2024-01-31').empty
+    assert len(calls) == 2
+
+
+def test_range_ending_today_is_rechecked_after_ttl(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(PriceStore, '_download', fake_download(calls))
+    store = PriceStore(str(tmp_path))
+    start = pd.Timestamp.now().normalize() - pd.Timedelta(days=30)
+
+    store.get_history('X', start)
+    store.get_history('X', start)
+    assert len(calls) == 1
+
+    monkeypatch.setattr(price_store, 'PRICE_RECHECK_SECONDS', 0)
+    store.get_history('X', start)
+    assert len(calls) == 2
+    # Only today is downloaded again
+    assert calls[1][0] == pd.Timestamp.now().normalize()
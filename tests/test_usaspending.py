@@ -0,0 +1,98 @@
+import os
+
+import pyarrow.parquet as pq
+import pytest
+
+import usaspending
+
+
+def fake_pages(total_pages, failing_page=None):
+    def fetch(session, payload, page):
+        if page == failing_page:
+            raise ConnectionError("boom")
+        if page > total_pages:
+            return {'results': [], 'page_metadata': {'hasNext': False}}
+        return {'results': [{'Award ID': f'A{page}-{i}'} for i in range(2)],
+                'page_metadata': {'hasNext': page < total_pages}}
+    return fetch
+
+
+def test_iter_award_pages_yields_every_page(monkeypatch):
+    monkeypatch.setattr(usaspending, '_fetch_award_page', fake_pages(6))
+    pages = sorted(page for page, _ in usaspending.iter_award_pages({'limit': 2}, session=object()))
+    assert pages == [1, 2, 3, 4, 5, 6]
+
+
+def test_failed_page_raises_and_keeps_previous_output(monkeypatch, tmp_path):
+    output = tmp_path / 'awards.csv'
+    output.write_text('previous\n')
+    monkeypatch.setattr(usaspending, '_fetch_award_page', fake_pages(6, failing_page=3))
+    monkeypatch.setattr(usaspending, 'get_session', lambda: object())
+
+    with pytest.raises(usaspending.AwardFetchError):
+        usaspending.stream_awards_to_csv({'limit': 2}, str(output))
+    assert output.read_text() == 'previous\n'
+    assert not os.path.exists(f"{output}.part")
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._data = data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise usaspending.requests.HTTPError(str(self.status_code))
+
+    def json(self):
+        return self._data
+
+
+class FakeSession:
+    """Answers award detail/account requests, throttling the first request for each award once."""
+
+    def __init__(self):
+        self.calls = []
+        self.throttled = set()
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append(('GET', url))
+        if url.endswith('/awards/last_updated/'):
+            return FakeResponse(200, {'last_updated': '10/16/2026'})
+        award_id = url.rstrip('/').rsplit('/', 1)[-1]
+        if award_id not in self.throttled:
+            self.throttled.add(award_id)
+            return FakeResponse(429, headers={'Retry-After': '0'})
+        return FakeResponse(200, {'id': 1, 'generated_unique_award_id': award_id,
+                                  'total_obligation': '1000.5', 'recipient': {'recipient_name': 'ACME'}})
+
+    def post(self, url, json=None, timeout=None):
+        self.calls.append(('POST', url))
+        return FakeResponse(200, {'results': [{'federal_account': '097-0100'}], 'page_metadata': {'count': 1}})
+
+
+def test_fetch_award_details_bulk_retries_and_flushes(monkeypatch, tmp_path):
+    cache = usaspending.ResponseCache(str(tmp_path / 'cache.sqlite'))
+    monkeypatch.setattr(usaspending, 'get_response_cache', lambda: cache)
+    monkeypatch.setattr(usaspending.random, 'uniform', lambda a, b: 0)
+    session = FakeSession()
+    output = tmp_path / 'details.parquet'
+
+    award_ids = [f'CONT_AWD_{i}' for i in range(5)]
+    rows = usaspending.fetch_award_details_bulk(award_ids + ['CONT_AWD_0'], output_path=str(output),
+                                                max_workers=2, requests_per_second=1000,
+                                                flush_every=2, session=session)
+
+    assert len(rows) == 5
+    # Each award was throttled once and retried; freshness was looked up once for the batch
+    assert sum(1 for method, url in session.calls if method == 'GET' and 'CONT_AWD_' in url) == 10
+    assert sum(1 for _, url in session.calls if url.endswith('/awards/last_updated/')) == 1
+    parquet = pq.ParquetFile(str(output))
+    assert parquet.metadata.num_rows == 5
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read().to_pandas()
+    assert sorted(table['generated_unique_award_id']) == award_ids
+    assert table['total_obligation'].tolist() == [1000.5] * 5
+    assert set(table['last_updated']) == {'10/16/2026'}
+    assert not os.path.exists(f"{output}.part")
@@ -0,0 +1,195 @@
+import os
+import re
+import csv
+from collections import Counter, defaultdict, namedtuple
+from functools import lru_cache
+
+# Optional CSV of extra mappings with "name" and "symbol" columns (one row per alias)
+RECIPIENT_TICKERS_PATH = os.path.join('data', 'recipient_tickers.csv')
+
+# Results below this confidence are reported as unresolved
+DEFAULT_MIN_CONFIDENCE = 0.6
+
+# Trigram similarity needed for a fuzzy match
+TRIGRAM_THRESHOLD = 0.5
+
+# Legal-form and filler tokens dropped from the ends of names before matching
+NAME_SUFFIXES = {
+    'corp', 'corporation', 'inc', 'incorporated', 'co', 'company', 'companies',
+    'llc', 'ltd', 'limited', 'plc', 'lp', 'llp', 'group', 'holdings', 'the'
+}
+
+DEFAULT_MAPPINGS = {
+    'Lockheed Martin': 'LMT',
+    'Sikorsky Aircraft': 'LMT',
+    'Boeing': 'BA',
+    'Raytheon': 'RTX',
+    'Raytheon Technologies': 'RTX',
+    'RTX': 'RTX',
+    'Pratt & Whitney': 'RTX',
+    'Collins Aerospace': 'RTX',
+    'Northrop Grumman': 'NOC',
+    'General Dynamics': 'GD',
+    'Electric Boat': 'GD',
+    'Gulfstream Aerospace': 'GD',
+    'L3Harris Technologies': 'LHX',
+    'L3Harris': 'LHX',
+    'Huntington Ingalls Industries': 'HII',
+    'Huntington Ingalls': 'HII',
+    'Leidos': 'LDOS',
+    'CACI International': 'CACI',
+    'CACI': 'CACI',
+    'Booz Allen Hamilton': 'BAH',
+    'Science Applications International': 'SAIC',
+    'TransDigm': 'TDG',
+    'Textron': 'TXT',
+    'Bell Textron': 'TXT',
+    'Spirit AeroSystems': 'SPR',
+    'Howmet Aerospace': 'HWM',
+    'Curtiss-Wright': 'CW',
+    'Hexcel': 'HXL',
+    'Kratos Defense & Security Solutions': 'KTOS',
+    'Kratos Defense & Security': 'KTOS',
+    'Aerojet Rocketdyne': 'AJRD',
+    'Mercury Systems': 'MRCY',
+    'General Electric': 'GE',
+    'Honeywell International': 'HON',
+    'BWX Technologies': 'BWXT',
+    'Parsons': 'PSN',
+    'KBR': 'KBR',
+    'Jacobs Engineering': 'J',
+    'Oshkosh': 'OSK',
+    'AeroVironment': 'AVAV',
+    'Palantir Technologies': 'PLTR',
+}
+
+Resolution = namedtuple('Resolution', ['symbol', 'confidence', 'matched_name', 'method'])
+UNRESOLVED = Resolution(None, 0.0, None, 'unresolved')
+
+
+def normalize_name(name):
+    """Lowercase, unify '&'/punctuation and strip legal suffixes from a company name."""
+    name = str(name).lower().replace('&', ' and ')
+    tokens = re.sub(r"[^a-z0-9]+", ' ', name.replace("'", '')).split()
+    while tokens and tokens[-1] in NAME_SUFFIXES:
+        tokens.pop()
+    while tokens and tokens[0] in NAME_SUFFIXES:
+        tokens.pop(0)
+    return ' '.join(tokens)
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TickerResolver:
+    """
+    Resolves USAspending recipient names to stock tickers.
+
+    Known names are normalized into a dict, so a lookup tries, in order: the whole
+    normalized name, then the longest known token phrase contained in it (a
+    token-level multi-pattern match bounded by the longest known name), and
+    finally a character-trigram similarity search over an inverted index.
+    Results are memoized per raw name, so batch resolution costs one dict hit
+    for repeated recipients.
+    """
+
+    def __init__(self, mappings=None, min_confidence=DEFAULT_MIN_CONFIDENCE):
+        self.min_confidence = min_confidence
+        self._names = {}
+        self._trigram_index = defaultdict(set)
+        self._trigram_counts = {}
+        self._max_tokens = 1
+        self.add_mappings(DEFAULT_MAPPINGS if mappings is None else mappings)
+
+    def add_mappings(self, mappings):
+        """Add {company name: symbol} entries to the index."""
+        for name, symbol in mappings.items():
+            key = normalize_name(name)
+            if not key or not symbol:
+                continue
+            self._names[key] = (symbol.strip().upper(), name)
+            self._max_tokens = max(self._max_tokens, len(key.split()))
+            grams = _trigrams(key)
+            self._trigram_counts[key] = len(grams)
+            for gram in grams:
+                self._trigram_index[gram].add(key)
+        self.resolve.cache_clear()
+
+    def load_csv(self, path=RECIPIENT_TICKERS_PATH):
+        """Load extra mappings from a CSV with name and symbol columns, if it exists."""
+        if not os.path.exists(path):
+            return 0
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            mappings = {row['name']: row['symbol'] for row in csv.DictReader(f) if row.get('name')}
+        self.add_mappings(mappings)
+        return len(mappings)
+
+    def __len__(self):
+        return len(self._names)
+
+    @lru_cache(maxsize=65536)
+    def resolve(self, company_name):
+        """Return a Resolution for company_name, or UNRESOLVED if no confident match exists."""
+        if not company_name or not isinstance(company_name, str):
+            return UNRESOLVED
+        key = normalize_name(company_name)
+        if not key:
+            return UNRESOLVED
+
+        if key in self._names:
+            symbol, matched = self._names[key]
+            return Resolution(symbol, 1.0, matched, 'exact')
+
+        result = self._match_phrase(key) or self._match_trigrams(key)
+        if result is None or result.confidence < self.min_confidence:
+            return UNRESOLVED
+        return result
+
+    def resolve_many(self, names):
+        """Resolve an iterable of names, returning {name: Resolution} for the distinct values."""
+        return {name: self.resolve(name) for name in set(names)}
+
+    def _match_phrase(self, key):
+        """Longest known name appearing as a contiguous token run, preferring the earliest position."""
+        tokens = key.split()
+        for length in range(min(self._max_tokens, len(tokens)), 0, -1):
+            for start in range(len(tokens) - length + 1):
+                phrase = ' '.join(tokens[start:start + length])
+                if phrase in self._names:
+                    symbol, matched = self._names[phrase]
+                    coverage = length / len(tokens)
+                    # Names that lead with the known phrase are usually subsidiaries or divisions
+                    confidence = 0.5 + 0.45 * coverage if start == 0 else 0.4 + 0.45 * coverage
+                    return Resolution(symbol, round(confidence, 3), matched, 'phrase')
+        return None
+
+    def _match_trigrams(self, key):
+        """Best Jaccard match over character trigrams, for misspellings and run-together names."""
+        grams = _trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            for candidate in self._trigram_index.get(gram, ()):
+                shared[candidate] += 1
+        best, best_score = None, 0.0
+        for candidate, count in shared.items():
+            score = count / (len(grams) + self._trigram_counts[candidate] - count)
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is None or best_score < TRIGRAM_THRESHOLD:
+            return None
+        symbol, matched = self._names[best]
+        return Resolution(symbol, round(0.9 * best_score, 3), matched, 'trigram')
+
+
+_ticker_resolver = None
+
+
+def get_ticker_resolver():
+    """Return the process-wide shared TickerResolver, including any mappings from RECIPIENT_TICKERS_PATH."""
+    global _ticker_resolver
+    if _ticker_resolver is None:
+        _ticker_resolver = TickerResolver()
+        _ticker_resolver.load_csv()
+    return _ticker_resolver
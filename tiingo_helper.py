@@ -5,8 +5,27 @@ import re
 from typing import List, Dict, Any
 from config import TIINGO_API_KEY
 import os
-import importlib.util
+import time
 import random
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from article_cache import get_article_cache
+from article_extractors import extract_article, decode_html, EXTRACTOR_CAPABILITIES
+from news_store import get_news_store, news_query_key
+
+# Article enrichment: concurrent downloads, per-domain politeness and an overall time limit
+ENRICH_MAX_WORKERS = 16
+ENRICH_PER_DOMAIN_LIMIT = 2
+ENRICH_DEADLINE = 30
+
+TIINGO_NEWS_URL = "https://api.tiingo.com/tiingo/news"
+# Incremental ingestion pages through at most NEWS_MAX_PAGES pages of NEWS_PAGE_SIZE articles per poll
+NEWS_PAGE_SIZE = 100
+NEWS_MAX_PAGES = 10
+
+_article_session = None
+_article_session_lock = threading.Lock()
 
 def get_tiingo_headers():
     """Get headers for Tiingo API requests"""
@@ -47,7 +66,10 @@ def preprocess_article(article: Dict[str, Any]) -> Dict[str, Any]:
     """Clean and preprocess a single news article"""
     if not article:
         return {}
-    
+    return enrich_article(clean_article(article))
+
+def clean_article(article: Dict[str, Any]) -> Dict[str, Any]:
+    """Clean the fields of a Tiingo article without fetching its page"""
     # Handle potential None values with safe defaults
     cleaned = {
         'id': article.get('id', ''),
@@ -60,8 +82,12 @@ def preprocess_article(article: Dict[str, Any]) -> Dict[str, Any]:
         'tags': article.get('tags', []) or [],
         'published_date': format_date(article.get('publishedDate', '')),
         'crawled_date': format_date(article.get('crawlDate', '')),
+        'published_at': article.get('publishedDate', '') or '',
     }
-    
+    return add_article_features(cleaned)
+
+def enrich_article(cleaned: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace the Tiingo content with the full article text when the page has more"""
     # Always try to fetch full content if URL is available
     if cleaned['url']:
         try:
@@ -72,8 +98,10 @@ def preprocess_article(article: Dict[str, Any]) -> Dict[str, Any]:
                     cleaned['full_content'] = full_content
         except Exception:
             pass  # Silently continue if content fetching fails
-    
-    # Add derived features with safe calculations
+    return add_article_features(cleaned)
+
+def add_article_features(cleaned: Dict[str, Any]) -> Dict[str, Any]:
+    """Add derived features with safe calculations"""
     cleaned['ticker_count'] = len(cleaned['tickers'])
     cleaned['tag_count'] = len(cleaned['tags'])
     cleaned['title_length'] = len(cleaned['title'])
@@ -83,8 +111,8 @@ def preprocess_article(article: Dict[str, Any]) -> Dict[str, Any]:
     return cleaned
 
 def has_trafilatura():
-    """Check if trafilatura is installed"""
-    return importlib.util.find_spec("trafilatura") is not None
+    """Check if trafilatura is installed (resolved once when article_extractors is imported)"""
+    return EXTRACTOR_CAPABILITIES['trafilatura']
 
 def get_random_user_agent():
     """Return a random user agent string"""
@@ -114,112 +142,123 @@ def get_request_headers():
         'Cache-Control': 'max-age=0'
     }
 
+def get_article_session():
+    """Shared requests session so article downloads reuse pooled TCP/TLS connections."""
+    global _article_session
+    with _article_session_lock:
+        if _article_session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=64, pool_maxsize=ENRICH_MAX_WORKERS)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _article_session = session
+    return _article_session
+
 def fetch_article_content(url: str) -> str:
-    """Fetch full article content from URL using multiple methods"""
+    """
+    Fetch full article content from URL using multiple methods.
+    The page is downloaded once over the pooled session and the extractors run on the
+    in-memory HTML, the domain's last successful extractor first. Extracted text is cached
+    by URL; stale entries are revalidated with ETag/Last-Modified so unchanged articles
+    are not downloaded and extracted again.
+    """
     if not url:
         return ""
-        
-    content = ""
-    headers = get_request_headers()
-    
-    # Special handling for known paywalled sites
-    domain = url.split('/')[2] if len(url.split('/')) > 2 else ''
     
-    if 'reuters.com' in domain:
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(response.text, 'html.parser')
-                article_body = soup.find('div', {'class': ['article-body', 'article-text', 'paywall']})
-                if article_body:
-                    paragraphs = article_body.find_all('p')
-                    content = ' '.join([p.get_text() for p in paragraphs])
-        except Exception:
-            pass  # Silently continue to next method
+    cache = get_article_cache()
+    headers = get_request_headers()
     
-    # If content is still empty, try standard methods
-    if not content:
-        # Method 1: Try trafilatura
-        if not has_trafilatura():
-            try:
-                import subprocess
-                subprocess.check_call(["pip", "install", "trafilatura"], 
-                                   stdout=subprocess.DEVNULL, 
-                                   stderr=subprocess.DEVNULL)
-            except Exception:
-                pass
-        
-        try:
-            import trafilatura
-            downloaded = trafilatura.fetch_url(url)  # Removed headers argument
-            if downloaded:
-                content = trafilatura.extract(downloaded,
-                                            include_comments=False,
-                                            include_tables=True,
-                                            include_links=True,
-                                            include_images=False)
-        except Exception:
-            pass  # Silently continue to next method
+    entry = cache.get(url)
+    if entry is not None:
+        if cache.is_fresh(entry):
+            return entry.content
+        headers.update(cache.validators(entry))
     
-    # Method 2: Try newspaper3k
-    if not content:
-        try:
-            from newspaper import Article, Config
-            config = Config()
-            config.browser_user_agent = headers['User-Agent']
-            config.request_timeout = 10
-            config.fetch_images = False
-            
-            article = Article(url, config=config)
-            article.download()
-            article.parse()
-            content = article.text
-        except Exception:
-            pass  # Silently continue to next method
-    
-    # Method 3: Try requests + BeautifulSoup as fallback
-    if not content:
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Remove unwanted elements
-                for element in soup(['script', 'style', 'nav', 'header', 'footer', 'iframe', 'aside']):
-                    element.decompose()
-                
-                # Try to find the main content
-                main_content = None
-                content_selectors = [
-                    'article', 'main', '.article-content', '.post-content',
-                    '#article-content', '#main-content', '.story-content',
-                    '[role="main"]', '.entry-content', '.content-body',
-                    '.article-body', '.article__body', '.story__body',
-                    '.post__content', '.post-body', '.entry__content',
-                    '[data-testid="article-body"]'
-                ]
-                
-                for selector in content_selectors:
-                    main_content = soup.select_one(selector)
-                    if main_content:
-                        break
-                
-                if main_content:
-                    paragraphs = main_content.find_all('p')
-                    content = ' '.join([p.get_text() for p in paragraphs])
-                else:
-                    content = ' '.join([p.get_text() for p in soup.find_all('p')])
-        except Exception:
-            pass  # Silently continue
+    try:
+        response = get_article_session().get(url, headers=headers, timeout=10)
+    except Exception:
+        return entry.content if entry is not None else ""
+    if response.status_code == 304 and entry is not None:
+        cache.touch(url)
+        return entry.content
     
-    # Clean and return the content
-    if content:
-        return clean_html(content)
-    return ""
+    content, method = "", None
+    if response.status_code == 200:
+        content, method = extract_article(decode_html(response), url)
+    content = clean_html(content) if content else ""
+    # An error page (403, 429, 503...) or a failed extraction never replaces text we already have
+    if not content and entry is not None:
+        return entry.content
+    cache.put(
+        url, content, method,
+        etag=response.headers.get('ETag'),
+        last_modified=response.headers.get('Last-Modified')
+    )
+    return content
+
+def _article_domain(article: Dict[str, Any]) -> str:
+    return urllib.parse.urlsplit(article.get('url') or '').netloc.lower()
 
-def fetch_stock_news(tickers=None, tags=None, start_date=None, limit=10) -> List[Dict[str, Any]]:
+def iter_enriched_articles(articles: List[Dict[str, Any]], max_workers: int = ENRICH_MAX_WORKERS,
+                           per_domain_limit: int = ENRICH_PER_DOMAIN_LIMIT, deadline: float = ENRICH_DEADLINE):
+    """
+    Clean raw Tiingo articles and fetch their full content concurrently.
+
+    Yields (index, article) pairs as downloads complete, index being the position in
+    articles. At most per_domain_limit downloads run against one domain at a time.
+    Articles still pending when the deadline (seconds) passes are yielded with the
+    content Tiingo returned.
+    """
+    pending = [(index, clean_article(article)) for index, article in enumerate(articles) if article]
+    active = {}
+    in_flight = {}
+    end_time = time.monotonic() + deadline
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while pending or in_flight:
+            # Start every article whose domain has a free slot, in the original order
+            for item in list(pending):
+                if len(in_flight) >= max_workers:
+                    break
+                domain = _article_domain(item[1])
+                if active.get(domain, 0) < per_domain_limit:
+                    pending.remove(item)
+                    active[domain] = active.get(domain, 0) + 1
+                    in_flight[executor.submit(enrich_article, dict(item[1]))] = item
+
+            remaining = end_time - time.monotonic()
+            done = wait(in_flight, timeout=max(remaining, 0), return_when=FIRST_COMPLETED)[0] if remaining > 0 else set()
+            if not done:
+                print(f"Article enrichment deadline reached, {len(pending) + len(in_flight)} articles not enriched")
+                for index, article in sorted(pending + list(in_flight.values())):
+                    yield index, article
+                return
+
+            for future in done:
+                index, article = in_flight.pop(future)
+                active[_article_domain(article)] -= 1
+                try:
+                    yield index, future.result()
+                except Exception:
+                    yield index, article
+    finally:
+        # Downloads past the deadline finish in the background and are discarded
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def enrich_articles(articles: List[Dict[str, Any]], on_article=None) -> List[Dict[str, Any]]:
+    """
+    Clean and enrich articles concurrently, keeping the original (relevance) order.
+    on_article(article, completed, total) is called as each article becomes ready.
+    """
+    total = len([article for article in articles if article])
+    results = {}
+    for index, article in iter_enriched_articles(articles):
+        results[index] = article
+        if on_article:
+            on_article(article, len(results), total)
+    return [results[index] for index in sorted(results)]
+
+def fetch_stock_news(tickers=None, tags=None, start_date=None, limit=10, on_article=None) -> List[Dict[str, Any]]:
     """
     Fetch and clean news articles from Tiingo API with full content
     """
@@ -246,13 +285,8 @@ def fetch_stock_news(tickers=None, tags=None, start_date=None, limit=10) -> List
         
         if response.status_code == 200:
             articles = response.json()
-            # Clean and preprocess articles with progress indicator
-            cleaned_articles = []
-            for article in articles:
-                cleaned = preprocess_article(article)
-                if cleaned:
-                    cleaned_articles.append(cleaned)
-            return cleaned_articles
+            # Clean and preprocess articles, fetching their full content concurrently
+            return enrich_articles(articles, on_article)
         else:
             print(f"Error fetching news: {response.status_code}")
             return None
@@ -261,6 +295,109 @@ def fetch_stock_news(tickers=None, tags=None, start_date=None, limit=10) -> List
         print(f"Error: {str(e)}")
         return None
 
+def _article_mark(article: Dict[str, Any]):
+    """Position of a raw Tiingo article in (publishedDate, id) order, or None if it has no integer id."""
+    try:
+        article_id = int(article.get('id'))
+    except (TypeError, ValueError):
+        return None
+    return (article.get('publishedDate') or '', article_id)
+
+def ingest_stock_news(tickers=None, tags=None, start_date=None, page_size=NEWS_PAGE_SIZE,
+                      max_pages=NEWS_MAX_PAGES, on_article=None) -> List[Dict[str, Any]]:
+    """
+    Incrementally ingest Tiingo news for a query into the news store.
+    
+    Pages through the query's articles newest first, starting from its high-water mark
+    (or start_date the first time), and stops at the first page that reaches the mark.
+    Only articles whose id is not stored yet are enriched and appended. The mark is
+    advanced once a pass reaches it; a pass cut short by max_pages records where it
+    stopped and the next poll continues from there. Returns the new articles, or None
+    if the API request failed.
+    """
+    store = get_news_store()
+    query_key = news_query_key(tickers, tags)
+    cursor = store.get_cursor(query_key)
+    mark = (cursor['published_at'], cursor['id']) if cursor else None
+    
+    params = {'limit': page_size, 'sortBy': 'publishedDate'}
+    if tickers:
+        params['tickers'] = ','.join(tickers)
+    if tags:
+        params['tags'] = ','.join(tags)
+    if mark:
+        params['startDate'] = mark[0][:10]
+    elif start_date:
+        params['startDate'] = start_date
+    
+    # Articles published meanwhile only push older pages further down, so resuming at the
+    # saved offset re-reads a few articles (skipped as duplicates) but never misses any
+    resume = store.get_resume(query_key)
+    if resume and resume.get('start_date') != params.get('startDate'):
+        # Offsets only make sense within the result set they were counted in
+        print(f"News ingestion for {query_key}: start date changed, restarting from the newest articles")
+        resume = None
+    start_offset = resume['offset'] if resume else 0
+    newest = (resume['published_at'], resume['id']) if resume else None
+    if mark and (newest is None or mark > newest):
+        newest = mark
+    
+    candidates = {}
+    complete = False
+    failed = False
+    offset = start_offset
+    for page in range(max_pages):
+        params['offset'] = offset
+        try:
+            response = requests.get(TIINGO_NEWS_URL, headers=get_tiingo_headers(), params=params, timeout=30)
+        except Exception as e:
+            print(f"Error: {str(e)}")
+            failed = True
+            break
+        if response.status_code != 200:
+            print(f"Error fetching news: {response.status_code}")
+            failed = True
+            break
+        articles = response.json()
+        offset += page_size
+        
+        reached_mark = False
+        for article in articles:
+            position = _article_mark(article)
+            if position is None:
+                print(f"Skipping news article without an integer id: {article.get('id')!r}")
+                continue
+            newest = max(newest, position) if newest else position
+            if mark and position <= mark:
+                reached_mark = True
+                continue
+            candidates.setdefault(position[1], article)
+        if reached_mark or len(articles) < page_size:
+            complete = True
+            break
+    
+    if failed and offset == start_offset:
+        return None
+    
+    # Only genuinely new articles are enriched (their pages downloaded) and stored
+    new_ids = store.new_ids(candidates)
+    new_articles = enrich_articles([article for article_id, article in candidates.items() if article_id in new_ids],
+                                   on_article)
+    store.append(new_articles)
+    if complete:
+        if newest:
+            store.set_cursor(query_key, *newest)
+    elif not failed and newest:
+        print(f"News ingestion for {query_key} stopped after {max_pages} pages; the next poll continues at offset {offset}")
+        store.set_resume(query_key, offset, params.get('startDate'), *newest)
+    return new_articles
+
+def store_news_articles(articles: List[Dict[str, Any]]) -> int:
+    """Add articles to the deduplicated news store; returns how many were new."""
+    if not articles:
+        return 0
+    return get_news_store().append(articles)
+
 def search_tickers(query: str) -> List[Dict[str, Any]]:
     """Search for stock tickers/companies"""
     try:
@@ -371,13 +508,14 @@ def get_news_statistics(articles: List[Dict[str, Any]]) -> Dict[str, Any]:
             'top_tags': {}
         }
 
-def fetch_politician_trading_news(politician_name=None, limit=10) -> List[Dict[str, Any]]:
+def fetch_politician_trading_news(politician_name=None, limit=10, on_article=None) -> List[Dict[str, Any]]:
     """
     Fetch news articles about politician trading activities
     
     Args:
         politician_name: Optional name of specific politician
         limit: Maximum number of articles to return
+        on_article: Optional callback(article, completed, total) called as each article is ready
     """
     try:
         url = "https://api.tiingo.com/tiingo/news"
@@ -412,12 +550,7 @@ def fetch_politician_trading_news(politician_name=None, limit=10) -> List[Dict[s
         
         if response.status_code == 200:
             articles = response.json()
-            cleaned_articles = []
-            for article in articles:
-                cleaned = preprocess_article(article)
-                if cleaned:
-                    cleaned_articles.append(cleaned)
-            return cleaned_articles
+            return enrich_articles(articles, on_article)
         else:
             print(f"Error fetching news: {response.status_code}")
             return None
@@ -0,0 +1,520 @@
+import os
+import csv
+import json
+import time
+import sqlite3
+import hashlib
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+USASPENDING_BASE_URL = "https://api.usaspending.gov/api/v2"
+SPENDING_BY_AWARD_ENDPOINT = f"{USASPENDING_BASE_URL}/search/spending_by_award/"
+LAST_UPDATED_PATH = "/awards/last_updated/"
+
+# Maximum page size accepted by /search/spending_by_award/
+MAX_PAGE_LIMIT = 100
+DEFAULT_MAX_WORKERS = 4
+REQUEST_TIMEOUT = 60
+MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 1.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+RESPONSE_CACHE_PATH = os.path.join('data', 'usaspending_cache.sqlite')
+RESPONSE_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Seconds a cached response is served without revalidation, by endpoint path prefix.
+# The longest matching prefix wins; 0 disables caching for that endpoint.
+CACHE_TTLS = {
+    LAST_UPDATED_PATH: 60 * 60,
+    "/recipient/": 24 * 60 * 60,
+    "/agency/": 7 * 24 * 60 * 60,
+    "/awards/accounts/": 24 * 60 * 60,
+    "/awards/": 24 * 60 * 60,
+    "/search/spending_by_award/": 24 * 60 * 60,
+    "/download/": 0,
+}
+
+AWARD_DETAILS_PATH = os.path.join('data', 'USA Spending - All Award Details.parquet')
+
+# Columns of the award details file: /awards/<id>/ fields plus the merged federal accounts.
+# Nested objects are stored as JSON strings; the amount columns are numeric.
+AWARD_DETAIL_COLUMNS = [
+    'id', 'generated_unique_award_id', 'piid', 'category', 'type', 'type_description', 'description',
+    'total_obligation', 'subaward_count', 'total_subaward_amount', 'date_signed', 'base_exercised_options',
+    'base_and_all_options', 'total_account_outlay', 'total_account_obligation', 'account_outlays_by_defc',
+    'account_obligations_by_defc', 'parent_award', 'latest_transaction_contract_data', 'funding_agency',
+    'awarding_agency', 'period_of_performance', 'recipient', 'executive_details', 'place_of_performance',
+    'psc_hierarchy', 'naics_hierarchy', 'total_outlay',
+    'count_federal_account', 'federal_accounts', 'last_updated'
+]
+AWARD_DETAIL_NUMERIC_COLUMNS = {
+    'id', 'total_obligation', 'subaward_count', 'total_subaward_amount', 'base_exercised_options',
+    'base_and_all_options', 'total_account_outlay', 'total_account_obligation', 'total_outlay',
+    'count_federal_account'
+}
+AWARD_DETAILS_SCHEMA = pa.schema([
+    (column, pa.float64() if column in AWARD_DETAIL_NUMERIC_COLUMNS else pa.string())
+    for column in AWARD_DETAIL_COLUMNS
+])
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class AwardFetchError(Exception):
+    """A page of a spending_by_award search could not be fetched, so the results are incomplete."""
+
+
+def get_session():
+    """Return a shared requests.Session with a connection pool sized for concurrent page fetches."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
+
+
+def _relative_path(url):
+    """Strip the API base URL so cache keys and TTL lookups use paths like /awards/accounts/."""
+    return url[len(USASPENDING_BASE_URL):] if url.startswith(USASPENDING_BASE_URL) else url
+
+
+def _ttl_for(path):
+    matches = [prefix for prefix in CACHE_TTLS if path.startswith(prefix)]
+    return CACHE_TTLS[max(matches, key=len)] if matches else 0
+
+
+class ResponseCache:
+    """
+    On-disk cache of USAspending JSON responses keyed by method, endpoint and
+    canonicalized JSON payload.
+
+    Entries older than their endpoint TTL are revalidated against
+    /awards/last_updated/: if the award data has not been refreshed since the
+    entry was stored it is served again without refetching. Total size is kept
+    under max_bytes by evicting the least recently used entries.
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                body TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                data_version TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(method, path, payload=None):
+        canonical = json.dumps(payload, sort_keys=True, separators=(',', ':')) if payload is not None else ''
+        return hashlib.sha256(f"{method.upper()} {path}\n{canonical}".encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return (data, stored_at, data_version) for a key, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, stored_at, data_version FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(row[0]), row[1], row[2]
+
+    def put(self, key, endpoint, data, data_version=None):
+        body = json.dumps(data)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, body, size, data_version, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, body, len(body), data_version, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, key):
+        """Mark an expired entry as revalidated."""
+        with self._lock:
+            now = time.time()
+            self._conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+
+_response_cache = None
+
+
+def get_response_cache():
+    """Return the process-wide shared ResponseCache."""
+    global _response_cache
+    with _session_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+    return _response_cache
+
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls at most `rate` per second across all threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _send(method, url, payload=None, session=None, rate_limiter=None):
+    """Send a request, retrying throttled/5xx responses and connection errors with exponential backoff."""
+    session = session or get_session()
+    for attempt in range(MAX_RETRIES + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            if method.upper() == 'GET':
+                response = session.get(url, params=payload, timeout=REQUEST_TIMEOUT)
+            else:
+                response = session.post(url, json=payload, timeout=REQUEST_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == MAX_RETRIES:
+                raise
+            time.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt + random.uniform(0, 0.5))
+            continue
+
+        if response.status_code in RETRY_STATUS_CODES and attempt < MAX_RETRIES:
+            retry_after = response.headers.get('Retry-After')
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else RETRY_BACKOFF_SECONDS * 2 ** attempt
+            time.sleep(delay + random.uniform(0, 0.5))
+            continue
+
+        response.raise_for_status()
+        return response.json()
+
+
+def get_last_updated(session=None):
+    """Return the /awards/last_updated/ value, cached for its own TTL."""
+    try:
+        data = usaspending_request('GET', f"{USASPENDING_BASE_URL}{LAST_UPDATED_PATH}", session=session)
+        return data.get('last_updated')
+    except Exception as e:
+        print(f"Error fetching last updated info: {e}")
+        return None
+
+
+def usaspending_request(method, url, payload=None, session=None, use_cache=True, rate_limiter=None,
+                        data_version=None):
+    """
+    Send a USAspending API request through the response cache and return the decoded JSON.
+    Raises requests.HTTPError for non-2xx responses (which are never cached).
+    Batches pass the /awards/last_updated/ value they fetched once as data_version, so
+    their requests don't each look it up.
+    """
+    path = _relative_path(url)
+    ttl = _ttl_for(path)
+    if not use_cache or ttl <= 0:
+        return _send(method, url, payload, session, rate_limiter)
+
+    cache = get_response_cache()
+    key = ResponseCache.make_key(method, path, payload)
+    is_last_updated = path.startswith(LAST_UPDATED_PATH)
+
+    def current_version():
+        return data_version if data_version is not None else get_last_updated(session)
+
+    cached = cache.get(key)
+    if cached is not None:
+        data, stored_at, stored_version = cached
+        if time.time() - stored_at < ttl:
+            return data
+        # Expired: reuse the entry if USAspending has not refreshed its award data since
+        if not is_last_updated and stored_version is not None and current_version() == stored_version:
+            cache.touch(key)
+            return data
+
+    data = _send(method, url, payload, session, rate_limiter)
+    cache.put(key, path, data, None if is_last_updated else current_version())
+    return data
+
+
+def _fetch_award_page(session, payload, page):
+    """POST a single page of /search/spending_by_award/ and return the decoded JSON."""
+    return usaspending_request('POST', SPENDING_BY_AWARD_ENDPOINT, dict(payload, page=page), session=session)
+
+
+def iter_award_pages(payload, max_workers=DEFAULT_MAX_WORKERS, max_pages=None, session=None):
+    """
+    Yield (page_number, results) for every page of a spending_by_award search.
+
+    The first page is fetched on its own; after that up to max_workers pages are
+    kept in flight over a pooled session. No further pages are scheduled once any
+    response reports page_metadata.hasNext == False. Pages are yielded as they
+    complete, so they may arrive out of order.
+
+    If any page fails, nothing more is yielded: the pages still in flight are drained
+    and AwardFetchError is raised, so callers never mistake a partial result for a
+    complete one.
+    """
+    session = session or get_session()
+    payload = dict(payload)
+    payload['limit'] = min(int(payload.get('limit', MAX_PAGE_LIMIT)), MAX_PAGE_LIMIT)
+    first_page = int(payload.get('page', 1))
+    last_page = first_page + max_pages - 1 if max_pages else None
+
+    try:
+        data = _fetch_award_page(session, payload, first_page)
+    except Exception as e:
+        raise AwardFetchError(f"Error fetching award page {first_page}: {e}") from e
+
+    results = data.get('results') or []
+    if results:
+        yield first_page, results
+    if not results or not data.get('page_metadata', {}).get('hasNext'):
+        return
+
+    next_page = first_page + 1
+    has_more = True
+    error = None
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = {}
+
+        def schedule():
+            nonlocal next_page
+            while has_more and len(in_flight) < max_workers and (last_page is None or next_page <= last_page):
+                future = executor.submit(_fetch_award_page, session, payload, next_page)
+                in_flight[future] = next_page
+                next_page += 1
+
+        schedule()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                page = in_flight.pop(future)
+                try:
+                    data = future.result()
+                except Exception as e:
+                    if error is None:
+                        error = AwardFetchError(f"Error fetching award page {page}: {e}")
+                        error.__cause__ = e
+                    has_more = False
+                    continue
+                if error is not None:
+                    continue  # Draining after a failure
+
+                results = data.get('results') or []
+                if results:
+                    yield page, results
+                if not results or not data.get('page_metadata', {}).get('hasNext'):
+                    has_more = False
+            schedule()
+
+    if error is not None:
+        raise error
+
+
+class AwardCsvWriter:
+    """
+    Append award rows to a CSV as pages arrive.
+    Rows are written to a temporary file that replaces output_path on close, so
+    readers never see a half-written file.
+    """
+
+    def __init__(self, output_path, fieldnames=None):
+        self.output_path = output_path
+        self.fieldnames = list(fieldnames) if fieldnames else None
+        self.row_count = 0
+        self._tmp_path = f"{output_path}.part"
+        self._file = None
+        self._writer = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.output_path) or '.', exist_ok=True)
+        self._file = open(self._tmp_path, 'w', newline='', encoding='utf-8')
+        return self
+
+    def write_rows(self, rows):
+        if not rows:
+            return
+        if self._writer is None:
+            fieldnames = list(self.fieldnames or [])
+            for key in rows[0].keys():
+                if key not in fieldnames:
+                    fieldnames.append(key)
+            self._writer = csv.DictWriter(self._file, fieldnames=fieldnames, extrasaction='ignore', restval='')
+            self._writer.writeheader()
+        self._writer.writerows(rows)
+        self._file.flush()
+        self.row_count += len(rows)
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.close()
+        if exc_type is None and self.row_count:
+            os.replace(self._tmp_path, self.output_path)
+        else:
+            os.remove(self._tmp_path)
+        return False
+
+
+def stream_awards_to_csv(payload, output_path, max_workers=DEFAULT_MAX_WORKERS, max_pages=None):
+    """
+    Fetch every page of a spending_by_award search and stream the rows to output_path.
+    Returns the number of rows written (0 leaves any existing file untouched).
+    Raises AwardFetchError if a page fails; output_path is then left untouched too.
+    """
+    with AwardCsvWriter(output_path, fieldnames=payload.get('fields')) as writer:
+        for page, results in iter_award_pages(payload, max_workers=max_workers, max_pages=max_pages):
+            writer.write_rows(results)
+    if writer.row_count:
+        print(f"Saved {writer.row_count} awards to {output_path}")
+    return writer.row_count
+
+
+class AwardDetailsWriter:
+    """
+    Write enriched award rows to a Parquet file, one row group per flush.
+    Like AwardCsvWriter, rows go to a temporary file that replaces output_path on close.
+    """
+
+    def __init__(self, output_path=AWARD_DETAILS_PATH):
+        self.output_path = output_path
+        self.row_count = 0
+        self.flushes = 0
+        self._tmp_path = f"{output_path}.part"
+        self._writer = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.output_path) or '.', exist_ok=True)
+        self._writer = pq.ParquetWriter(self._tmp_path, AWARD_DETAILS_SCHEMA)
+        return self
+
+    @staticmethod
+    def _value(column, value):
+        if value is None:
+            return None
+        if column in AWARD_DETAIL_NUMERIC_COLUMNS:
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None
+        return json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+
+    def write_rows(self, rows):
+        if not rows:
+            return
+        columns = {
+            column: [self._value(column, row.get(column)) for row in rows]
+            for column in AWARD_DETAIL_COLUMNS
+        }
+        self._writer.write_table(pa.table(columns, schema=AWARD_DETAILS_SCHEMA))
+        self.row_count += len(rows)
+        self.flushes += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        self._writer.close()
+        if exc_type is None and self.row_count:
+            os.replace(self._tmp_path, self.output_path)
+        else:
+            os.remove(self._tmp_path)
+        return False
+
+
+def _fetch_award_enrichment(award_id, session, rate_limiter, last_updated):
+    """Fetch /awards/<id>/ and /awards/accounts/ for one award and merge them into a single row."""
+    row = usaspending_request('GET', f"{USASPENDING_BASE_URL}/awards/{award_id}/", session=session,
+                              rate_limiter=rate_limiter, data_version=last_updated)
+    accounts = usaspending_request('POST', f"{USASPENDING_BASE_URL}/awards/accounts/", {
+        "award_id": award_id,
+        "limit": 100,
+        "page": 1,
+        "sort": "total_transaction_obligated_amount",
+        "order": "desc"
+    }, session=session, rate_limiter=rate_limiter, data_version=last_updated)
+    row['count_federal_account'] = accounts.get('page_metadata', {}).get('count')
+    row['federal_accounts'] = accounts.get('results', [])
+    row['last_updated'] = last_updated
+    return row
+
+
+def fetch_award_details_bulk(award_ids, output_path=AWARD_DETAILS_PATH, max_workers=8, requests_per_second=10,
+                             flush_every=25, session=None):
+    """
+    Enrich many awards (generated_internal_id values) concurrently.
+
+    /awards/last_updated/ is fetched once for the batch and used as the freshness check of
+    every cached response. Requests share a rate limiter and retry throttled or failed
+    calls with backoff, and completed rows are flushed to output_path (Parquet) every
+    flush_every awards. Returns the list of enriched rows.
+    """
+    award_ids = list(dict.fromkeys(a for a in award_ids if a))
+    if not award_ids:
+        return []
+
+    session = session or get_session()
+    last_updated = get_last_updated(session)
+    rate_limiter = RateLimiter(requests_per_second)
+    enriched = []
+    pending_rows = []
+
+    with AwardDetailsWriter(output_path) as writer, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_fetch_award_enrichment, award_id, session, rate_limiter, last_updated): award_id
+            for award_id in award_ids
+        }
+        for future in as_completed(futures):
+            award_id = futures[future]
+            try:
+                row = future.result()
+            except Exception as e:
+                print(f"Error enriching award {award_id}: {e}")
+                continue
+            enriched.append(row)
+            pending_rows.append(row)
+            if len(pending_rows) >= flush_every:
+                writer.write_rows(pending_rows)
+                pending_rows = []
+        writer.write_rows(pending_rows)
+
+    print(f"Enriched {len(enriched)} of {len(award_ids)} awards into {output_path}")
+    return enriched